@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+"""
+Render time of the reservation admin changelist on a large table.
+
+Seeds --rows reservations over --students students (one vehicle each) and 50
+lots, then renders the changelist for a few typical requests with the old
+ReservationAdmin options (no select_related, icontains search across joins,
+exact counts) and with the current ReservationAdmin.
+
+    python benchmarks/admin_changelist.py [--rows 1000000] [--students 20000]
+
+Uses a throwaway SQLite database unless DATABASE_NAME is set; point it at
+PostgreSQL (DATABASE_ENGINE etc.) to see estimated counts at work.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def seed(args):
+    from datetime import timedelta
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from parking.models import ParkingLot, Reservation, StudentProfile, Vehicle
+
+    User.objects.bulk_create((User(username=f"student{i}") for i in range(args.students)), batch_size=5000)
+    StudentProfile.objects.bulk_create((StudentProfile(user_id=user_id) for user_id in User.objects.values_list("id", flat=True)),
+                                       batch_size=5000)
+    Vehicle.objects.bulk_create(
+        (Vehicle(student_id=student_id, make="Kia", model="Rio", year=2020, license_plate=f"B {100000 + student_id}",
+                 plate_key=f"B{100000 + student_id}") for student_id in StudentProfile.objects.values_list("id", flat=True)),
+        batch_size=5000,
+    )
+    lots = ParkingLot.objects.bulk_create(
+        ParkingLot(name=f"Lot {i}", address="Bliss Street", latitude=33.9, longitude=35.48, hourly_rate=2, daily_rate=12,
+                   monthly_rate=150, total_spots=100, available_spots=100, opening_time="06:00", closing_time="22:00")
+        for i in range(50)
+    )
+    vehicles = list(Vehicle.objects.values_list("id", "student_id"))
+    now = timezone.now()
+    statuses = ["confirmed", "active", "completed", "expired", "cancelled"]
+
+    def rows():
+        for _ in range(args.rows):
+            vehicle_id, student_id = random.choice(vehicles)
+            start = now - timedelta(minutes=random.randint(0, 3 * 365 * 24 * 60))
+            yield Reservation(student_id=student_id, vehicle_id=vehicle_id, parking_lot=random.choice(lots),
+                              start_time=start, end_time=start + timedelta(hours=2), total_cost=4,
+                              status=random.choice(statuses))
+
+    Reservation.objects.bulk_create(rows(), batch_size=10000)
+    return now
+
+
+def run(args):
+    from django.contrib import admin
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.test import RequestFactory
+    from django.test.utils import CaptureQueriesContext
+    from parking.admin import ReservationAdmin
+    from parking.models import Reservation
+
+    started = time.perf_counter()
+    now = seed(args)
+    print(f"seeded {args.rows} reservations in {time.perf_counter() - started:.0f} s")
+
+    class OldReservationAdmin(admin.ModelAdmin):
+        list_display = ['student', 'vehicle', 'parking_lot', 'status', 'start_time', 'end_time', 'total_cost', 'created_at']
+        list_filter = ['status', 'created_at', 'start_time']
+        search_fields = ['student__user__username', 'vehicle__license_plate', 'parking_lot__name']
+
+    site = admin.AdminSite(name="bench")
+    superuser = User.objects.create_superuser("admin", "admin@example.com", "admin")
+    factory = RequestFactory()
+    requests = [
+        ("first page", {}),
+        ("status filter", {"status__exact": "active"}),
+        ("plate search", {"q": "B 100123"}),
+        ("username search", {"q": "student123"}),
+        ("year drill-down", {"start_time__year": str(now.year)}),
+    ]
+    print(f"{'request':<18}{'old ms':>10}{'queries':>9}{'new ms':>10}{'queries':>9}")
+    for label, params in requests:
+        timings = []
+        for model_admin in (OldReservationAdmin(Reservation, site), ReservationAdmin(Reservation, site)):
+            request = factory.get("/admin/parking/reservation/", params)
+            request.user = superuser
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                model_admin.changelist_view(request).render()
+                timings.append(((time.perf_counter() - started) * 1000, len(queries)))
+        (old_ms, old_queries), (new_ms, new_queries) = timings
+        print(f"{label:<18}{old_ms:>10.0f}{old_queries:>9}{new_ms:>10.0f}{new_queries:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--students", type=int, default=20000)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_NAME", os.path.join(tempfile.mkdtemp(), "admin_bench.sqlite3"))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unipark.settings")
+    os.environ.setdefault("DEBUG", "False")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+"""
+Login storm benchmark for the auth service.
+
+Runs the service in-process against a throwaway SQLite database, hammers
+/token with concurrent logins and samples /me latency at the same time.
+
+    python benchmarks/auth_login_storm.py [--inline] [--logins 200] [--concurrency 32]
+
+--inline verifies passwords in the request handler instead of the pool, for comparison.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "services", "auth"))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def start_server(app, port):
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="critical"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def seed(auth, hashing):
+    async with auth.engine.begin() as conn:
+        await conn.run_sync(auth.Base.metadata.create_all)
+    async with auth.SessionLocal() as db:
+        user = auth.User(username="bench", email="bench@example.com", first_name="Bench", last_name="User",
+                         hashed_password=hashing._hash("bench-password"))
+        db.add(user)
+        await db.flush()
+        db.add(auth.StudentProfile(user_id=user.id, email_verified=True))
+        await db.commit()
+    # The server runs its own event loop; don't hand it connections from this one
+    await auth.engine.dispose()
+
+
+async def sample_me(client, token, stop, latencies, failures):
+    import httpx
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            response = await client.get("/me", headers={"Authorization": f"Bearer {token}"})
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+        except httpx.HTTPError:
+            failures.append(time.perf_counter() - started)
+        await asyncio.sleep(0.02)
+
+
+async def login_storm(client, total, concurrency):
+    import httpx
+    results = {"ok": 0, "busy": 0, "other": 0}
+    remaining = iter(range(total))
+
+    async def worker():
+        for _ in remaining:
+            while True:
+                try:
+                    response = await client.post("/token", data={"username": "bench", "password": "bench-password"})
+                except httpx.HTTPError:
+                    results["other"] += 1
+                    break
+                if response.status_code != 503:
+                    results["ok" if response.status_code == 200 else "other"] += 1
+                    break
+                # Back off and retry, as a well-behaved client would on Retry-After
+                results["busy"] += 1
+                await asyncio.sleep(0.05)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+async def run(args, port):
+    import httpx
+    base_url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        response = await client.post("/token", data={"username": "bench", "password": "bench-password"})
+        token = response.json()["access_token"]
+
+        idle, storm, failures = [], [], []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_me(client, token, stop, idle, failures))
+        await asyncio.sleep(1)
+        stop.set()
+        await sampler
+
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_me(client, token, stop, storm, failures))
+        started = time.perf_counter()
+        results = await login_storm(client, args.logins, args.concurrency)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+
+    mode = "inline" if args.inline else "process pool"
+    print(f"Mode: {mode}, rounds={args.rounds}, logins={args.logins}, concurrency={args.concurrency}")
+    print(f"Logins: {results['ok']} ok, {results['other']} failed in {elapsed:.2f}s "
+          f"({results['busy']} retried after 503)")
+    print(f"Login throughput: {results['ok'] / elapsed:.1f}/s")
+    print(f"/me idle:  p50={percentile(idle, 50):.1f}ms p99={percentile(idle, 99):.1f}ms")
+    print(f"/me storm: p50={percentile(storm, 50):.1f}ms p99={percentile(storm, 99):.1f}ms "
+          f"mean={statistics.mean(storm) if storm else 0:.1f}ms failed={len(failures)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--inline", action="store_true")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8101)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "auth_bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+
+    import main as auth
+    import hashing
+    logging.disable(logging.WARNING)
+
+    if args.inline:
+        async def inline_verify_and_update(password, hashed_password):
+            return hashing._verify_and_update(password, hashed_password)
+        hashing.hash_pool.verify_and_update = inline_verify_and_update
+
+    asyncio.run(seed(auth, hashing))
+    server = start_server(auth.app, args.port)
+
+    try:
+        asyncio.run(run(args, args.port))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
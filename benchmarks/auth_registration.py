@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Registration throughput benchmark for the auth service.
+
+Creates --users accounts through POST /register one at a time, then the same
+number through POST /users/import in one NDJSON stream, and reports users per
+second for both paths. Runs against a throwaway SQLite database unless
+DATABASE_URL is set.
+
+    python benchmarks/auth_registration.py [--users 1000] [--rounds 10]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "services", "auth"))
+
+
+def user_rows(prefix, count):
+    for i in range(count):
+        yield {
+            "username": f"{prefix}{i}",
+            "email": f"{prefix}{i}@students.example.edu",
+            "first_name": "Student",
+            "last_name": str(i),
+            "password": f"password-{i}",
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'auth_bench.db')}")
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    os.environ["IMPORT_API_KEY"] = "bench"
+    os.environ["IMPORT_BATCH_SIZE"] = str(args.batch_size)
+
+    from fastapi.testclient import TestClient
+    import main as auth
+    logging.disable(logging.WARNING)
+
+    with TestClient(auth.app) as client:
+        started = time.perf_counter()
+        for row in user_rows("single", args.users):
+            response = client.post("/register", json=row)
+            assert response.status_code == 201, response.text
+        single = time.perf_counter() - started
+
+        body = "\n".join(json.dumps(row) for row in user_rows("bulk", args.users))
+        started = time.perf_counter()
+        response = client.post(
+            "/users/import",
+            content=body,
+            headers={"X-Import-Key": "bench", "Content-Type": "application/x-ndjson"},
+        )
+        bulk = time.perf_counter() - started
+        summary = response.json()
+
+    print(f"users={args.users} rounds={args.rounds} hash_workers={auth.hash_pool.workers}")
+    print(f"/register:     {args.users / single:8.1f} users/s ({single:.2f}s)")
+    print(f"/users/import: {summary['created'] / bulk:8.1f} users/s ({bulk:.2f}s, "
+          f"{summary['created']} created, {summary['skipped']} skipped)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Size of the find page, the map data and the map:update HX-Trigger header.
+
+Seeds --lots parking lots, renders the find page and fetches its map data as
+JSON and as packed typed arrays (raw and gzipped, plus a revalidation). Then
+replays HTMX filter requests the way the map makes them: without a map
+version (the full marker list), with the current version (nothing changed),
+and after a few lots' availability changed (a delta). Reports bytes and time
+per request.
+
+    python benchmarks/find_map_updates.py [--lots 300] [--changes 3]
+
+Uses a throwaway SQLite database unless DATABASE_NAME is set.
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def timed(fn, repeat=20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+def run(args):
+    import random
+    from django.test import Client
+    from parking.models import ParkingLot
+
+    ParkingLot.objects.bulk_create(
+        ParkingLot(
+            name=f"Lot {i}", address=f"{i} Bliss Street, Hamra", latitude=33.85 + random.random() * 0.1,
+            longitude=35.45 + random.random() * 0.1, hourly_rate=2, daily_rate=12, monthly_rate=150,
+            total_spots=200, available_spots=100, opening_time="06:00", closing_time="22:00",
+        )
+        for i in range(args.lots)
+    )
+    client = Client()
+    page, page_ms = timed(lambda: client.get("/find/"))
+    print(f"lots={args.lots}  find page: {len(page.content):,} bytes  {page_ms:.1f} ms")
+
+    for label, params in (("map data json", {}), ("map data bin", {"format": "bin"})):
+        data, ms = timed(lambda: client.get("/find/map-data/", params))
+        revalidated = client.get("/find/map-data/", params, headers={"If-None-Match": data["ETag"]})
+        print(f"{label:<28} {len(data.content):>8,} bytes  gzip {len(gzip.compress(data.content)):>7,} bytes  "
+              f"{ms:6.1f} ms  (If-None-Match -> {revalidated.status_code})")
+
+    def filter_request(version=None):
+        headers = {"HX-Request": "true"}
+        if version:
+            headers["X-Map-Version"] = version
+        return client.get("/find/", {"filter": "availability"}, headers=headers)
+
+    def report(label, response, ms):
+        header = response.headers.get("HX-Trigger", "")
+        print(f"{label:<28} HX-Trigger: {len(header):>8,} bytes  body: {len(response.content):>8,} bytes  {ms:6.1f} ms")
+        return json.loads(header)["map:update"] if header else None
+
+    full = report("full list (no version)", *timed(filter_request))
+    report("unchanged catalog", *timed(lambda: filter_request(full["v"])))
+    # Markers only change when a lot moves to another availability bucket
+    lot_ids = list(ParkingLot.objects.order_by("?").values_list("pk", flat=True)[: args.changes])
+    ParkingLot.objects.filter(pk__in=lot_ids).update(available_spots=10)
+    delta = report(f"{args.changes} lots almost full", *timed(lambda: filter_request(full["v"])))
+    print(f"delta: {len(delta['changed']['id'])} changed, {len(delta['removed'])} removed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lots", type=int, default=300)
+    parser.add_argument("--changes", type=int, default=3)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_NAME", os.path.join(tempfile.mkdtemp(), "find_bench.sqlite3"))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unipark.settings")
+    os.environ.setdefault("DEBUG", "False")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
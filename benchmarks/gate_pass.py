@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+"""
+Size and verification cost of the signed gate passes in reservation QR codes.
+
+Compares the QR version needed for the old check-in URL and for a signed
+pass, then times PassVerifier.verify() on a pass signed with the older of two
+keys, as a gate sees it during a key rotation.
+
+    python benchmarks/gate_pass.py [--domain unipark.example.com] [--repeat 100000]
+
+Needs only qrcode; no database.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def qr_version(data, error_correction):
+    import qrcode
+
+    qr = qrcode.QRCode(version=None, error_correction=error_correction)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.version
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--domain", default="unipark.example.com")
+    parser.add_argument("--repeat", type=int, default=100000)
+    args = parser.parse_args()
+
+    import qrcode
+    from parking.utils.passes import PassSigner, PassVerifier
+
+    keys = {1: "old-secret", 2: "new-secret"}
+    start = datetime.now(timezone.utc)
+    token = PassSigner(keys, 1).sign(1234567, 42, start, start + timedelta(hours=2), "B 123456")
+    url = f"https://{args.domain}/checkin/1234567/"
+
+    print(f"{'payload':<10}{'chars':>6}{'version H':>11}{'version M':>11}")
+    for name, data in (("url", url), ("pass", token)):
+        print(f"{name:<10}{len(data):>6}{qr_version(data, qrcode.constants.ERROR_CORRECT_H):>11}"
+              f"{qr_version(data, qrcode.constants.ERROR_CORRECT_M):>11}")
+
+    verifier = PassVerifier(keys, leeway=900)
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        verifier.verify(token, 42)
+    print(f"verify {(time.perf_counter() - started) / args.repeat * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
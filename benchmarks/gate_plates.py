@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Latency of plate-reader gate lookups.
+
+Seeds one lot with --plates vehicles that each hold a reservation open now,
+then times "plate -> open reservation at this lot" for reads that are exact
+and reads with one wrong character:
+
+- a database query joining on the indexed Vehicle.plate_key (exact only)
+- the in-memory plate index, exact
+- a fuzzy read scanning every plate of the lot with edit distance
+- a fuzzy read through the lot's deletion index
+
+    python benchmarks/gate_plates.py [--plates 2000] [--lookups 2000]
+
+Uses a throwaway SQLite database unless DATABASE_NAME is set.
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def timed(label, fn, queries):
+    started = time.perf_counter()
+    for query in queries:
+        fn(query)
+    elapsed = (time.perf_counter() - started) / len(queries)
+    print(f"{label:<28}{elapsed * 1e6:10.1f} us")
+
+
+def misread(key):
+    position = random.randrange(1, len(key))
+    return key[:position] + random.choice(string.digits.replace(key[position], "")) + key[position + 1:]
+
+
+def run(args):
+    from datetime import timedelta
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from parking.models import ParkingLot, Reservation, StudentProfile, Vehicle
+    from parking.utils import plates
+
+    student = StudentProfile.objects.create(user=User.objects.create(username="bench"))
+    lot = ParkingLot.objects.create(
+        name="Bench lot", address="Bliss Street", latitude=33.9, longitude=35.48, hourly_rate=2,
+        daily_rate=12, monthly_rate=150, total_spots=args.plates, available_spots=args.plates,
+        opening_time="06:00", closing_time="22:00",
+    )
+    numbers = random.sample(range(100000, 1000000), args.plates)
+    vehicles = Vehicle.objects.bulk_create(
+        Vehicle(student=student, make="Kia", model="Rio", year=2020, color="white",
+                license_plate=f"{random.choice('BGMNOPST')} {number}", plate_key="")
+        for number in numbers
+    )
+    for vehicle in vehicles:
+        vehicle.plate_key = plates.plate_key(vehicle.license_plate)
+    Vehicle.objects.bulk_update(vehicles, ["plate_key"])
+    now = timezone.now()
+    Reservation.objects.bulk_create(
+        Reservation(student=student, vehicle=vehicle, parking_lot=lot, start_time=now - timedelta(minutes=5),
+                    end_time=now + timedelta(hours=2), total_cost=2, status="active")
+        for vehicle in vehicles
+    )
+
+    keys = [vehicle.plate_key for vehicle in random.choices(vehicles, k=args.lookups)]
+    misreads = [misread(key) for key in keys]
+    index = plates.PlateIndex(ttl=3600)
+    lot_plates = index.lot(lot.id)
+
+    def database(key):
+        list(Reservation.objects.filter(
+            parking_lot_id=lot.id, vehicle__plate_key=key, status__in=plates.OPEN_STATUSES,
+            start_time__lte=now, end_time__gt=now,
+        ).values_list("id", "start_time", "end_time"))
+
+    def scan(key):
+        [candidate for candidate in lot_plates.by_plate if plates.edit_distance(key, candidate) <= 1]
+
+    print(f"plates={args.plates} lookups={args.lookups}")
+    timed("database, plate_key index", database, keys)
+    timed("memory, exact", lambda key: index.lookup(lot.id, key, 1, now), keys)
+    timed("fuzzy, linear scan", scan, misreads[:200])
+    timed("fuzzy, deletion index", lambda key: index.lookup(lot.id, key, 1, now), misreads)
+    found = sum(1 for key, read in zip(keys, misreads) if
+                any(entry["plate"].replace(" ", "") == key for entry in index.lookup(lot.id, read, 1, now)["reservations"]))
+    print(f"misreads matched to the right plate: {found / len(keys):.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--plates", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_NAME", os.path.join(tempfile.mkdtemp(), "gate_plates_bench.sqlite3"))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unipark.settings")
+    os.environ.setdefault("DEBUG", "False")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
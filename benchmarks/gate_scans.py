@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+Check-in throughput: one check_in request per scan versus batched gate scans.
+
+Seeds --scans reservations that are open now, then checks them all in twice:
+once through the check_in view (a logged-in request, an ORM load and a save
+per scan) and once through gate/scans/ in batches of --batch events. The
+batched run is then replayed to time duplicate handling.
+
+    python benchmarks/gate_scans.py [--scans 5000] [--batch 200]
+
+Uses a throwaway SQLite database unless DATABASE_NAME is set.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run(args):
+    from datetime import timedelta
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import Client
+    from django.utils import timezone
+    from parking.models import ParkingLot, Reservation, StudentProfile, Vehicle
+
+    user = User.objects.create(username="bench")
+    student = StudentProfile.objects.create(user=user)
+    vehicle = Vehicle.objects.create(student=student, make="Kia", model="Rio", year=2020,
+                                     license_plate="B 123456", color="white")
+    lot = ParkingLot.objects.create(
+        name="Bench lot", address="Bliss Street", latitude=33.9, longitude=35.48, hourly_rate=2,
+        daily_rate=12, monthly_rate=150, total_spots=args.scans, available_spots=args.scans,
+        opening_time="06:00", closing_time="22:00",
+    )
+    now = timezone.now()
+    reservations = Reservation.objects.bulk_create(
+        Reservation(student=student, vehicle=vehicle, parking_lot=lot, start_time=now - timedelta(minutes=5),
+                    end_time=now + timedelta(hours=2), total_cost=2, status="active")
+        for _ in range(args.scans)
+    )
+    # Fill in the FK objects so gate_pass() doesn't query for them
+    for reservation in reservations:
+        reservation.vehicle = vehicle
+    tokens = [reservation.gate_pass() for reservation in reservations]
+
+    client = Client()
+    client.force_login(user)
+    started = time.perf_counter()
+    for reservation in reservations:
+        client.get(f"/checkin/{reservation.id}/")
+    single_s = time.perf_counter() - started
+    Reservation.objects.update(checked_in=False)
+
+    events = [{"id": uuid.uuid4().hex, "pass": token, "lot": lot.id} for token in tokens]
+    bodies = [json.dumps({"events": events[i:i + args.batch]}) for i in range(0, len(events), args.batch)]
+
+    def post_all():
+        started = time.perf_counter()
+        for body in bodies:
+            response = client.post("/gate/scans/", body, content_type="application/json",
+                                   headers={"X-Gate-Key": settings.GATE_API_KEY})
+            assert response.status_code == 200, response.content
+        return time.perf_counter() - started
+
+    batched_s = post_all()
+    replay_s = post_all()
+    assert Reservation.objects.filter(checked_in=True).count() == args.scans
+
+    print(f"scans={args.scans} batch={args.batch}")
+    print(f"one request per scan  {args.scans / single_s:10.0f} scans/s")
+    print(f"batched               {args.scans / batched_s:10.0f} scans/s")
+    print(f"batched, replayed     {args.scans / replay_s:10.0f} scans/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scans", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_NAME", os.path.join(tempfile.mkdtemp(), "gate_scans_bench.sqlite3"))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unipark.settings")
+    os.environ.setdefault("DEBUG", "False")
+    os.environ.setdefault("GATE_API_KEY", "bench-gate-key")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
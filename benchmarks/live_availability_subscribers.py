@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Fan-out of the find page live availability stream to many idle subscribers.
+
+Serves the Django ASGI app with uvicorn, opens --subscribers SSE connections
+to /find/live/ over real sockets, then changes one lot's available spots
+--updates times and reports how long each change takes to reach every
+subscriber. Half the changes are saved through the ORM (post_save pokes the
+hub right away), half with QuerySet.update(), which only the poller sees.
+Also reports resident memory per connected subscriber.
+
+    python benchmarks/live_availability_subscribers.py [--subscribers 2000] [--updates 10]
+
+Clients and server share one process and one event loop, so latencies include
+the clients' own parsing and RSS covers both ends of every connection. Uses a
+throwaway SQLite database unless DATABASE_NAME is set.
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def subscriber(port, connected, arrivals):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"GET /find/live/ HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await reader.readuntil(b"\r\n\r\n")
+    try:
+        while True:
+            # uvicorn sends the stream chunked, one SSE message per chunk
+            size = int((await reader.readline()).strip(), 16)
+            message = (await reader.readexactly(size + 2)).decode()
+            if "event: snapshot" in message:
+                connected.append(time.perf_counter())
+            elif "event: delta" in message:
+                arrivals.append(time.perf_counter())
+    finally:
+        writer.close()
+
+
+async def run(args):
+    import uvicorn
+    from parking.live import hub
+    from parking.models import ParkingLot
+    from unipark.asgi import application
+
+    lot = await ParkingLot.objects.acreate(
+        name="Bench lot", address="Bliss Street", latitude=33.9, longitude=35.48, hourly_rate=2,
+        daily_rate=12, monthly_rate=150, total_spots=500, available_spots=250,
+        opening_time="06:00", closing_time="22:00",
+    )
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(application, host="127.0.0.1", port=port, lifespan="off",
+                                           log_level="warning", backlog=4096))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    baseline = rss_bytes()
+    connected, arrivals, clients = [], [], []
+    started = time.perf_counter()
+    for batch in range(0, args.subscribers, 250):
+        clients += [asyncio.create_task(subscriber(port, connected, arrivals))
+                    for _ in range(min(250, args.subscribers - batch))]
+        while len(connected) < len(clients):
+            await asyncio.sleep(0.01)
+    print(f"subscribers={len(clients)} connected in {time.perf_counter() - started:.1f}s "
+          f"(hub sees {hub.subscriber_count}), "
+          f"rss +{(rss_bytes() - baseline) / len(clients) / 1024:.1f} KiB per subscriber")
+
+    for mode in ("post_save", "update()"):
+        latencies = []
+        for update in range(args.updates // 2):
+            arrivals.clear()
+            spots = 100 + update + (50 if mode == "update()" else 0)
+            sent = time.perf_counter()
+            if mode == "post_save":
+                lot.available_spots = spots
+                await lot.asave(update_fields=["available_spots"])
+            else:
+                await ParkingLot.objects.filter(pk=lot.pk).aupdate(available_spots=spots)
+            while len(arrivals) < len(clients):
+                await asyncio.sleep(0.001)
+            latencies += [arrival - sent for arrival in arrivals]
+        print(f"{mode:<10} delivery p50 {percentile(latencies, 0.5) * 1000:7.1f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  max {max(latencies) * 1000:7.1f} ms")
+
+    for client in clients:
+        client.cancel()
+    await asyncio.gather(*clients, return_exceptions=True)
+    server.should_exit = True
+    await serving
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--subscribers", type=int, default=2000)
+    parser.add_argument("--updates", type=int, default=10)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_NAME", os.path.join(tempfile.mkdtemp(), "live_bench.sqlite3"))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unipark.settings")
+    os.environ.setdefault("DEBUG", "False")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Cost of the lot detail availability timeline.
+
+Seeds one lot with --reservations bookings spread over the next day, then
+times building a --hours timeline three ways: one overlap query per
+30-minute bucket, one query plus a sorted sweep (cold cache), and a cached
+read. Also times keeping the cache current when a reservation is added.
+
+    python benchmarks/lot_timeline.py [--reservations 2000] [--hours 12]
+
+Uses a throwaway SQLite database unless DATABASE_NAME is set.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def timed(fn, repeat=20):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def run(args):
+    from datetime import timedelta
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.db.models import Count
+    from django.utils import timezone
+    from parking.models import ParkingLot, Reservation, StudentProfile, Vehicle
+    from parking.utils import timeline
+
+    student = StudentProfile.objects.create(user=User.objects.create(username="bench"))
+    vehicle = Vehicle.objects.create(student=student, make="Kia", model="Rio", year=2020,
+                                     license_plate="B 123456", color="white")
+    lot = ParkingLot.objects.create(
+        name="Bench lot", address="Bliss Street", latitude=33.9, longitude=35.48, hourly_rate=2,
+        daily_rate=12, monthly_rate=150, total_spots=args.reservations, available_spots=args.reservations,
+        opening_time="06:00", closing_time="22:00",
+    )
+    now = timezone.now()
+    bookings = []
+    for _ in range(args.reservations):
+        start = now + timedelta(minutes=random.randint(-120, 24 * 60))
+        bookings.append(Reservation(student=student, vehicle=vehicle, parking_lot=lot, start_time=start,
+                                    end_time=start + timedelta(minutes=random.randint(30, 240)), total_cost=2,
+                                    status=random.choice(["confirmed", "active", "cancelled"])))
+    Reservation.objects.bulk_create(bookings)
+
+    def per_bucket():
+        # Count overlapping bookings per bucket, one query each (no peak within the bucket)
+        first = timeline.bucket_start(timezone.now())
+        for index in range(args.hours * 2):
+            lo = first + index * timeline.BUCKET
+            Reservation.objects.filter(parking_lot=lot, start_time__lt=lo + timeline.BUCKET, end_time__gt=lo) \
+                .exclude(status="cancelled").aggregate(Count("id"))
+
+    def cold():
+        cache.clear()
+        timeline.lot_timeline(lot.id, lot.total_spots, args.hours)
+
+    def warm():
+        timeline.lot_timeline(lot.id, lot.total_spots, args.hours)
+
+    print(f"reservations={args.reservations} buckets={args.hours * 2}")
+    print(f"query per bucket      {timed(per_bucket):8.2f} ms")
+    print(f"one query + sweep     {timed(cold):8.2f} ms")
+    warm()
+    print(f"cached                {timed(warm):8.2f} ms")
+
+    def add():
+        start = timezone.now() + timedelta(hours=random.randint(1, 10))
+        timeline._adjust(lot.id, start, start + timedelta(hours=2), 1)
+
+    print(f"update on new booking {timed(add, 200):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reservations", type=int, default=2000)
+    parser.add_argument("--hours", type=int, default=12)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_NAME", os.path.join(tempfile.mkdtemp(), "timeline_bench.sqlite3"))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unipark.settings")
+    os.environ.setdefault("DEBUG", "False")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Cluster index build, viewport query and incremental update costs.
+
+Scatters --lots lots over a city-sized area, builds the ClusterIndex, then
+times viewport queries for a phone-sized map (390x844 px) at several zoom
+levels and compares their JSON size with shipping every marker. Finally times
+changing one lot in place against rebuilding the whole index.
+
+    python benchmarks/map_clusters.py [--lots 20000] [--queries 200]
+
+Runs in memory, no database needed.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unipark.settings")
+
+
+def viewport(lat, lng, zoom, width=390, height=844):
+    """Bounding box of a width x height pixel map centred on (lat, lng)"""
+    degrees_per_pixel = 360 / (256 * 2 ** zoom)
+    half_w = width / 2 * degrees_per_pixel
+    half_h = height / 2 * degrees_per_pixel * math.cos(math.radians(lat))
+    return lng - half_w, lat - half_h, lng + half_w, lat + half_h
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lots", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    from parking.utils.clustering import ClusterIndex
+    from parking.utils.map_updates import columns
+
+    rows = [
+        (i, 33.80 + random.random() * 0.2, 35.40 + random.random() * 0.2, random.randint(0, 200), 200)
+        for i in range(1, args.lots + 1)
+    ]
+
+    started = time.perf_counter()
+    index = ClusterIndex()
+    index.sync(rows)
+    build_ms = (time.perf_counter() - started) * 1000
+    everything = json.dumps(columns([(lot_id, round(lat, 5), round(lng, 5), 3) for lot_id, lat, lng, _a, _t in rows]))
+    print(f"lots={args.lots}  build {build_ms:.0f} ms  all markers as JSON: {len(everything):,} bytes")
+
+    for zoom in (11, 13, 15, 17):
+        boxes = [viewport(33.85 + random.random() * 0.1, 35.45 + random.random() * 0.1, zoom)
+                 for _ in range(args.queries)]
+        started = time.perf_counter()
+        results = [index.query(*box, zoom) for box in boxes]
+        query_ms = (time.perf_counter() - started) * 1000 / len(boxes)
+        size = sum(len(json.dumps(result)) for result in results) / len(results)
+        clusters = sum(len(result["clusters"]["count"]) for result in results) / len(results)
+        points = sum(len(result["points"]["id"]) for result in results) / len(results)
+        print(f"zoom {zoom:>2}  query {query_ms:6.2f} ms  {clusters:6.1f} clusters  {points:6.1f} points  "
+              f"{size:9,.0f} bytes")
+
+    started = time.perf_counter()
+    for _ in range(args.queries):
+        lot_id, lat, lng, _available, total = random.choice(rows)
+        index.put((lot_id, lat, lng, random.randint(0, total), total))
+    put_us = (time.perf_counter() - started) * 1e6 / args.queries
+    started = time.perf_counter()
+    ClusterIndex().sync(rows)
+    rebuild_ms = (time.perf_counter() - started) * 1000
+    print(f"one lot changed: {put_us:.0f} us in place vs {rebuild_ms:.0f} ms full rebuild")
+
+
+if __name__ == "__main__":
+    main()
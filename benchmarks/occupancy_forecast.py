@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Build time of the occupancy forecast tables and cost of a prediction.
+
+Seeds --lots lots with --reservations bookings spread over the last eight
+weeks, runs build_occupancy_forecast, and times predicted_available() lookups
+for random lots and times once the profiles are loaded.
+
+    python benchmarks/occupancy_forecast.py [--lots 200] [--reservations 100000]
+
+Uses a throwaway SQLite database unless DATABASE_NAME is set.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run(args):
+    from datetime import timedelta
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.utils import timezone
+    from parking.models import OccupancyForecast, ParkingLot, Reservation, StudentProfile, Vehicle
+    from parking.utils import forecast
+
+    student = StudentProfile.objects.create(user=User.objects.create(username="bench"))
+    vehicle = Vehicle.objects.create(student=student, make="Kia", model="Rio", year=2020,
+                                     license_plate="B 123456", color="white")
+    lots = ParkingLot.objects.bulk_create(
+        ParkingLot(name=f"Lot {i}", address="Bliss Street", latitude=33.9, longitude=35.48, hourly_rate=2,
+                   daily_rate=12, monthly_rate=150, total_spots=50, available_spots=50,
+                   opening_time="06:00", closing_time="22:00")
+        for i in range(args.lots)
+    )
+    now = timezone.now()
+    Reservation.objects.bulk_create(
+        (
+            Reservation(student=student, vehicle=vehicle, parking_lot=random.choice(lots),
+                        start_time=(start := now - timedelta(minutes=random.randint(60, 8 * 7 * 24 * 60))),
+                        end_time=start + timedelta(minutes=random.randint(30, 480)), total_cost=2, status="completed")
+            for _ in range(args.reservations)
+        ),
+        batch_size=5000,
+    )
+
+    started = time.perf_counter()
+    call_command("build_occupancy_forecast", verbosity=0, stdout=open(os.devnull, "w"))
+    build_s = time.perf_counter() - started
+    size = sum(len(profile) for profile in OccupancyForecast.objects.values_list("profile", flat=True))
+    print(f"lots={args.lots} reservations={args.reservations}  build {build_s:.2f} s  tables {size:,} bytes")
+
+    forecast.profiles()
+    queries = [(random.choice(lots).id, now + timedelta(minutes=random.randint(0, 7 * 24 * 60))) for _ in range(100000)]
+    started = time.perf_counter()
+    for lot_id, when in queries:
+        forecast.predicted_available(lot_id, 50, when)
+    print(f"prediction {(time.perf_counter() - started) / len(queries) * 1e6:.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lots", type=int, default=200)
+    parser.add_argument("--reservations", type=int, default=100000)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_NAME", os.path.join(tempfile.mkdtemp(), "forecast_bench.sqlite3"))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unipark.settings")
+    os.environ.setdefault("DEBUG", "False")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Memory and throughput of owner exports.
+
+Seeds --rows reservations over 10 lots, then builds the full reservation
+export three ways, timing one run and measuring peak Python memory of
+another with tracemalloc:
+
+- CSV from a list of every model instance (what a plain view would do)
+- CSV streamed by exports.csv_chunks
+- Parquet streamed by exports.parquet_chunks (skipped without pyarrow)
+
+    python benchmarks/owner_export.py [--rows 200000]
+
+Uses a throwaway SQLite database unless DATABASE_NAME is set.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def measured(label, rows, produce):
+    started = time.perf_counter()
+    size = produce()
+    elapsed = time.perf_counter() - started
+    # Second run for memory, tracemalloc slows everything down
+    tracemalloc.start()
+    produce()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<20}{rows / elapsed:12.0f}{peak / 2**20:12.1f}{size / 2**20:10.1f}")
+
+
+def run(args):
+    import csv
+    import io
+    import random
+    from datetime import timedelta
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from parking.models import ParkingLot, Reservation, StudentProfile, Vehicle
+    from parking.utils import exports
+
+    owner = User.objects.create(username="owner")
+    student = StudentProfile.objects.create(user=User.objects.create(username="student"))
+    vehicle = Vehicle.objects.create(student=student, make="Kia", model="Rio", year=2020, license_plate="B 123456")
+    lots = ParkingLot.objects.bulk_create(
+        ParkingLot(name=f"Lot {i}", owner=owner, address="Bliss Street", latitude=33.9, longitude=35.48,
+                   hourly_rate=2, daily_rate=12, monthly_rate=150, total_spots=100, available_spots=100,
+                   opening_time="06:00", closing_time="22:00")
+        for i in range(10)
+    )
+    now = timezone.now()
+    Reservation.objects.bulk_create(
+        (Reservation(student=student, vehicle=vehicle, parking_lot=random.choice(lots),
+                     start_time=now - timedelta(minutes=30 * i), end_time=now - timedelta(minutes=30 * i - 60),
+                     total_cost=4, status="completed") for i in range(args.rows)),
+        batch_size=10000,
+    )
+    spec = exports.ExportSpec.parse("reservations", {}, [lot.id for lot in lots])
+
+    def naive():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(spec.columns)
+        for reservation in list(Reservation.objects.filter(parking_lot__in=lots)
+                                .select_related("parking_lot", "student__user", "vehicle").order_by("start_time")):
+            writer.writerow([reservation.id, reservation.parking_lot_id, reservation.parking_lot.name,
+                             reservation.student.user.username, reservation.vehicle.license_plate, reservation.status,
+                             reservation.start_time.isoformat(), reservation.end_time.isoformat(),
+                             reservation.total_cost, reservation.checked_in, reservation.created_at.isoformat()])
+        return len(buffer.getvalue().encode())
+
+    print(f"rows={args.rows}")
+    print(f"{'export':<20}{'rows/s':>12}{'peak MiB':>12}{'out MiB':>10}")
+    measured("csv, list", args.rows, naive)
+    measured("csv, streamed", args.rows, lambda: sum(len(chunk) for chunk in exports.csv_chunks(spec)))
+    if exports.parquet_available():
+        measured("parquet, streamed", args.rows, lambda: sum(len(chunk) for chunk in exports.parquet_chunks(spec)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_NAME", os.path.join(tempfile.mkdtemp(), "owner_export_bench.sqlite3"))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unipark.settings")
+    os.environ.setdefault("DEBUG", "False")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
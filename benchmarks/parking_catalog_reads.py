@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Lot read throughput in the parking service: database queries vs the
+in-memory catalog.
+
+Times single-lot lookups, first-page listings and nearby searches served the
+way the endpoints used to (one query each) and from the LotCatalog snapshot,
+including response validation in both cases.
+
+    python benchmarks/parking_catalog_reads.py [--lots 500] [--seconds 3]
+
+Uses a throwaway SQLite database unless DATABASE_URL is set.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from math import asin, cos, radians, sin, sqrt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "services", "parking"))
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(radians, (lat1, lng1, lat2, lng2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371 * asin(sqrt(a))
+
+
+async def rate(fn, seconds):
+    done = 0
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    while time.perf_counter() < deadline:
+        await fn()
+        done += 1
+    return done / (time.perf_counter() - started)
+
+
+async def run(args):
+    from datetime import time as time_type
+    from sqlalchemy import select
+    import main as parking
+
+    async with parking.engine.begin() as conn:
+        await conn.run_sync(parking.Base.metadata.create_all)
+    async with parking.SessionLocal() as db:
+        db.add(parking.CatalogVersion(id=1, version=1))
+        db.add_all(
+            parking.ParkingLot(
+                name=f"Lot {i}", address=f"{i} Bliss Street", latitude=33.85 + random.random() * 0.1,
+                longitude=35.45 + random.random() * 0.1, hourly_rate=1.5, daily_rate=10, monthly_rate=120,
+                total_spots=100, available_spots=40, opening_time=time_type(6, 0),
+                closing_time=time_type(22, 0), is_active=True,
+            )
+            for i in range(args.lots)
+        )
+        await db.commit()
+        await parking.catalog.refresh(db, force=True)
+
+    ids = list(range(1, args.lots + 1))
+    Response = parking.ParkingLotResponse
+
+    async def db_get():
+        async with parking.SessionLocal() as db:
+            Response.model_validate(await db.get(parking.ParkingLot, random.choice(ids)))
+
+    async def db_page():
+        async with parking.SessionLocal() as db:
+            lots = await db.scalars(select(parking.ParkingLot).where(parking.ParkingLot.is_active == True).limit(50))
+            [Response.model_validate(lot) for lot in lots]
+
+    async def db_nearby():
+        # What the endpoint did before the catalog: load every active lot and filter in Python
+        async with parking.SessionLocal() as db:
+            lots = (await db.scalars(select(parking.ParkingLot).where(parking.ParkingLot.is_active == True))).all()
+            [Response.model_validate(lot) for lot in lots
+             if haversine(33.9, 35.5, float(lot.latitude), float(lot.longitude)) <= 2]
+
+    async def mem_get():
+        Response.model_validate(parking.catalog.get(random.choice(ids)))
+
+    async def mem_page():
+        [Response.model_validate(lot) for lot in parking.catalog.page(0, 50)]
+
+    async def mem_nearby():
+        [Response.model_validate(lot) for lot in parking.catalog.nearby(33.9, 35.5, 2)]
+
+    print(f"database={parking.DATABASE_URL.split('://')[0]} lots={args.lots}")
+    for name, db_fn, mem_fn in (("GET /lots/{id}", db_get, mem_get),
+                                ("GET /lots?limit=50", db_page, mem_page),
+                                ("POST /lots/nearby", db_nearby, mem_nearby)):
+        db_qps = await rate(db_fn, args.seconds)
+        mem_qps = await rate(mem_fn, args.seconds)
+        print(f"{name:<20} db: {db_qps:9.0f}/s  memory: {mem_qps:9.0f}/s  ({mem_qps / db_qps:.1f}x)")
+    await parking.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lots", type=int, default=500)
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'parking_bench.db')}")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
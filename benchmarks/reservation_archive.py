@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Hot-table queries before and after archive_reservations.
+
+Seeds --rows reservations spread over three years for --students students,
+all finished except those of the last week, then times the queries that
+run on every dashboard load (auto_refresh_statuses and the student's recent
+reservations) before and after moving everything older than --days into
+the archive, and reports the archiving rate.
+
+    python benchmarks/reservation_archive.py [--rows 1000000] [--students 5000] [--days 90]
+
+Uses a throwaway SQLite database unless DATABASE_NAME is set.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def timed(repeat, fn):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def run(args):
+    from datetime import timedelta
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.utils import timezone
+    from parking.models import ArchivedReservation, ParkingLot, Reservation, StudentProfile, Vehicle
+    from parking.utils import archive
+
+    User.objects.bulk_create((User(username=f"student{i}") for i in range(args.students)), batch_size=5000)
+    StudentProfile.objects.bulk_create((StudentProfile(user_id=user_id) for user_id in User.objects.values_list("id", flat=True)),
+                                       batch_size=5000)
+    Vehicle.objects.bulk_create(
+        (Vehicle(student_id=student_id, make="Kia", model="Rio", year=2020, license_plate=f"B {100000 + student_id}",
+                 plate_key=f"B{100000 + student_id}") for student_id in StudentProfile.objects.values_list("id", flat=True)),
+        batch_size=5000,
+    )
+    lots = ParkingLot.objects.bulk_create(
+        ParkingLot(name=f"Lot {i}", address="Bliss Street", latitude=33.9, longitude=35.48, hourly_rate=2, daily_rate=12,
+                   monthly_rate=150, total_spots=100, available_spots=100, opening_time="06:00", closing_time="22:00")
+        for i in range(50)
+    )
+    vehicles = list(Vehicle.objects.values_list("id", "student_id"))
+    now = timezone.now()
+
+    def rows():
+        for _ in range(args.rows):
+            vehicle_id, student_id = random.choice(vehicles)
+            start = now - timedelta(minutes=random.randint(-7 * 24 * 60, 3 * 365 * 24 * 60))
+            if start > now - timedelta(days=7):
+                status = random.choice(["confirmed", "active"])
+            else:
+                status = random.choice(["completed", "completed", "expired", "cancelled"])
+            yield Reservation(student_id=student_id, vehicle_id=vehicle_id, parking_lot=random.choice(lots),
+                              start_time=start, end_time=start + timedelta(hours=2), total_cost=4, status=status)
+
+    Reservation.objects.bulk_create(rows(), batch_size=10000)
+    students = random.sample([student_id for _vehicle_id, student_id in vehicles], 200)
+
+    def dashboard_queries():
+        return {
+            "auto_refresh_statuses": timed(5, Reservation.auto_refresh_statuses),
+            "recent reservations": timed(1, lambda: [
+                list(Reservation.objects.filter(student_id=student_id).select_related("parking_lot", "vehicle")
+                     .order_by("-created_at")[:6]) for student_id in students
+            ]) / len(students),
+        }
+
+    before = dashboard_queries()
+    started = time.perf_counter()
+    moved = archive.archive_reservations(timedelta(days=args.days), settings.RESERVATION_ARCHIVE_BATCH)
+    archive_s = time.perf_counter() - started
+    after = dashboard_queries()
+
+    print(f"rows={args.rows} archived={moved} ({moved / archive_s:.0f} rows/s) "
+          f"hot={Reservation.objects.count()} archive={ArchivedReservation.objects.count()}")
+    print(f"{'query':<24}{'before ms':>12}{'after ms':>12}")
+    for label in before:
+        print(f"{label:<24}{before[label]:>12.2f}{after[label]:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--students", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_NAME", os.path.join(tempfile.mkdtemp(), "reservation_archive_bench.sqlite3"))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unipark.settings")
+    os.environ.setdefault("DEBUG", "False")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+"""
+Partition pruning on the monthly partitioned reservations table.
+
+Seeds --rows reservations straight in SQL, spread over three years and the
+coming week for --students students and 50 lots, and copies them into a
+plain table with the same indexes. It then captures the SQL the app sends for
+auto_refresh_statuses, an owner's dashboard and a student's home and
+dashboard pages, and replays every reservation query with
+EXPLAIN (ANALYZE) against both tables, in a transaction that is rolled back.
+For each query it reports how many partitions were scanned and the best of
+--repeat execution times. The unbounded auto_refresh_statuses(full=True)
+that archive_reservations runs is included to show a query without a
+start_time condition.
+
+    python benchmarks/reservation_partitions.py [--rows 20000000] [--students 20000] [--repeat 3]
+
+Needs PostgreSQL and an empty scratch database: set DATABASE_ENGINE to
+django.db.backends.postgresql and DATABASE_NAME, DATABASE_HOST etc.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FLAT = "bench_reservation_flat"
+
+
+def seed(args):
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from django.utils import timezone
+    from parking.models import ParkingLot, StudentProfile, Vehicle
+    from parking.utils import partitions
+
+    User.objects.bulk_create((User(username=f"student{i}") for i in range(args.students)), batch_size=5000)
+    StudentProfile.objects.bulk_create((StudentProfile(user_id=user_id) for user_id in User.objects.values_list("id", flat=True)),
+                                       batch_size=5000)
+    Vehicle.objects.bulk_create(
+        (Vehicle(student_id=student_id, make="Kia", model="Rio", year=2020, license_plate=f"B {100000 + student_id}",
+                 plate_key=f"B{100000 + student_id}") for student_id in StudentProfile.objects.values_list("id", flat=True)),
+        batch_size=5000,
+    )
+    owner = User.objects.create(username="owner")
+    ParkingLot.objects.bulk_create(
+        ParkingLot(name=f"Lot {i}", owner=owner if i < 5 else None, address="Bliss Street", latitude=33.9, longitude=35.48,
+                   hourly_rate=2, daily_rate=12, monthly_rate=150, total_spots=100, available_spots=100,
+                   opening_time="06:00", closing_time="22:00")
+        for i in range(50)
+    )
+    # Contiguous ids: everything above was created on an empty database
+    first_student = StudentProfile.objects.order_by("id").values_list("id", flat=True)[0]
+    first_vehicle = Vehicle.objects.order_by("id").values_list("id", flat=True)[0]
+    first_lot = ParkingLot.objects.order_by("id").values_list("id", flat=True)[0]
+    step = 1000000
+    with connection.cursor() as cursor:
+        # migrate only created the current month onwards
+        today = timezone.now().date()
+        partitions.create_partitions(partitions.runner(cursor), partitions.TABLE, partitions.COLUMN,
+                                     partitions.add_months(today.replace(day=1), -37), today)
+        for offset in range(0, args.rows, step):
+            # Open reservations in the last and coming week, finished ones before that
+            cursor.execute(
+                """
+                INSERT INTO parking_reservation (student_id, vehicle_id, parking_lot_id, status, start_time, end_time,
+                                                 total_cost, checked_in, created_at)
+                SELECT %(student)s + s, %(vehicle)s + s, %(lot)s + g %% 50,
+                       CASE WHEN start > now() - interval '7 days' THEN (ARRAY['confirmed', 'active'])[1 + g %% 2]
+                            ELSE (ARRAY['completed', 'completed', 'expired', 'cancelled'])[1 + g %% 4] END,
+                       start, start + interval '2 hours', 4, g %% 3 = 0, start - interval '2 days'
+                FROM (SELECT g, (g * 7919) %% %(students)s AS s,
+                             now() - interval '1 minute' * ((g * 104729) %% (3 * 365 * 24 * 60) - 7 * 24 * 60) AS start
+                      FROM generate_series(%(first)s::bigint, %(last)s) g) rows
+                """,
+                {"student": first_student, "vehicle": first_vehicle, "lot": first_lot, "students": args.students,
+                 "first": offset, "last": min(offset + step, args.rows) - 1},
+            )
+            print(f"  {min(offset + step, args.rows)} rows", flush=True)
+        cursor.execute(f"CREATE TABLE {FLAT} (LIKE parking_reservation INCLUDING DEFAULTS INCLUDING INDEXES)")
+        cursor.execute(f"INSERT INTO {FLAT} SELECT * FROM parking_reservation")
+        cursor.execute("VACUUM ANALYZE parking_reservation")
+        cursor.execute(f"VACUUM ANALYZE {FLAT}")
+    return owner
+
+
+def capture():
+    """(label, sql) for every statement on parking_reservation the app runs for the benchmarked pages"""
+    from django.contrib.auth.models import User
+    from django.db import connection, transaction
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from parking.models import Reservation, StudentProfile
+
+    student = StudentProfile.objects.order_by("id").first()
+    client = Client()
+    pages = [
+        ("auto_refresh", lambda: Reservation.auto_refresh_statuses()),
+        ("auto_refresh full", lambda: Reservation.auto_refresh_statuses(full=True)),
+    ]
+    for who, user in (("student", student.user), ("owner", User.objects.get(username="owner"))):
+        for path in ("/", "/dashboard/"):
+            pages.append((f"{who} {path}", lambda user=user, path=path: (client.force_login(user), client.get(path))))
+    statements = []
+    for label, page in pages:
+        # Rolled back so both tables still hold the same rows
+        with transaction.atomic(), CaptureQueriesContext(connection) as queries:
+            page()
+            transaction.set_rollback(True)
+        seen = set()
+        for query in queries:
+            sql = query["sql"]
+            # Page-level auto_refresh_statuses calls are measured on their own
+            if '"parking_reservation"' in sql and sql not in seen and (label.startswith("auto_refresh") or not sql.startswith("UPDATE")):
+                seen.add(sql)
+                statements.append((label, sql))
+    return statements
+
+
+def explain(cursor, sql, repeat):
+    """(best execution ms, partitions scanned) of ``sql``, rolled back each time"""
+    best, scanned = None, set()
+    for _ in range(repeat):
+        cursor.execute("BEGIN")
+        cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+        plan = cursor.fetchone()[0]
+        cursor.execute("ROLLBACK")
+        plan = plan if isinstance(plan, list) else json.loads(plan)
+        elapsed = plan[0]["Execution Time"]
+        best = elapsed if best is None else min(best, elapsed)
+        nodes = [plan[0]["Plan"]]
+        while nodes:
+            node = nodes.pop()
+            if node.get("Relation Name", "").startswith("parking_reservation_") and node.get("Actual Loops", 1):
+                scanned.add(node["Relation Name"])
+            nodes.extend(node.get("Plans", []))
+    return best, len(scanned)
+
+
+def run(args):
+    from django.db import connection
+    from parking.utils import partitions
+
+    started = time.perf_counter()
+    seed(args)
+    print(f"seeded {args.rows} reservations in {time.perf_counter() - started:.0f} s")
+    statements = capture()
+    with connection.cursor() as cursor:
+        total = len(partitions.partitions(partitions.runner(cursor), partitions.TABLE)) + 1
+        raw = cursor.connection.cursor()
+    print(f"{'page':<20}{'query':<44}{'partitions':>12}{'flat ms':>10}{'partitioned ms':>16}")
+    for label, sql in statements:
+        flat_ms, _ = explain(raw, re.sub(r'"parking_reservation"', f'"{FLAT}"', sql), args.repeat)
+        partitioned_ms, scanned = explain(raw, sql, args.repeat)
+        summary = " ".join(sql.split())[:42]
+        print(f"{label:<20}{summary:<44}{f'{scanned}/{total}':>12}{flat_ms:>10.1f}{partitioned_ms:>16.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000000)
+    parser.add_argument("--students", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    if os.environ.get("DATABASE_ENGINE") != "django.db.backends.postgresql":
+        parser.error("needs PostgreSQL, set DATABASE_ENGINE=django.db.backends.postgresql and DATABASE_NAME etc.")
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unipark.settings")
+    os.environ.setdefault("DEBUG", "False")
+    # The booking limits are what let the pages bound start_time
+    os.environ.setdefault("RESERVATION_MAX_DAYS", "31")
+    os.environ.setdefault("RESERVATION_PARTITIONING", "True")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Booking throughput for the reservations service.
+
+Drives POST /reservations with concurrent clients against the service app and
+against a copy of the previous handler (commit, refresh, render the QR PNG,
+commit, refresh), and reports bookings per second for both. Requests go
+through the ASGI app in-process, so the numbers cover the handler and the
+database but not HTTP parsing.
+
+    python benchmarks/reservations_bookings.py [--bookings 500] [--concurrency 32]
+
+Uses a throwaway SQLite database unless DATABASE_URL is set. SQLite allows one
+writer at a time, so point it at Postgres for numbers that mean anything at
+higher concurrency.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "services", "reservations"))
+
+
+def legacy_app():
+    import base64
+    from decimal import Decimal
+    from fastapi import Depends, FastAPI, status
+    from sqlalchemy.ext.asyncio import AsyncSession
+    import main as reservations
+
+    app = FastAPI()
+
+    @app.post("/reservations", status_code=status.HTTP_201_CREATED)
+    async def create_reservation(reservation: reservations.ReservationCreate, db: AsyncSession = Depends(reservations.get_db)):
+        duration_hours = (reservation.end_time - reservation.start_time).total_seconds() / 3600
+        db_reservation = reservations.Reservation(
+            student_id=reservation.student_id,
+            vehicle_id=reservation.vehicle_id,
+            parking_lot_id=reservation.parking_lot_id,
+            start_time=reservation.start_time,
+            end_time=reservation.end_time,
+            total_cost=Decimal(str(duration_hours)) * Decimal(str(reservation.hourly_rate)),
+            status='confirmed'
+        )
+        db.add(db_reservation)
+        await db.commit()
+        await db.refresh(db_reservation)
+        # The old payload had no signature, so every image was distinct: bypass the render cache
+        png = await asyncio.to_thread(reservations.render_qr_png.__wrapped__, f"http://unipark.app/checkin/{db_reservation.id}")
+        db_reservation.qr_code = base64.b64encode(png).decode()
+        await db.commit()
+        await db.refresh(db_reservation)
+        return {"id": db_reservation.id}
+
+    return app
+
+
+async def book(app, total, concurrency):
+    import httpx
+    start = datetime.utcnow() + timedelta(days=1)
+    remaining = iter(range(total))
+    failures = 0
+
+    async def worker(client):
+        nonlocal failures
+        for i in remaining:
+            response = await client.post("/reservations", json={
+                "student_id": i % 200 + 1,
+                "vehicle_id": i % 200 + 1,
+                "parking_lot_id": i % 20 + 1,
+                "start_time": (start + timedelta(minutes=i)).isoformat(),
+                "end_time": (start + timedelta(minutes=i + 120)).isoformat(),
+                "hourly_rate": 2.5,
+            })
+            if response.status_code != 201:
+                failures += 1
+
+    # Count handler errors (e.g. SQLite lock timeouts) as failed bookings instead of aborting
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://reservations") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return (total - failures) / elapsed, failures
+
+
+async def run(args):
+    import main as reservations
+
+    async with reservations.engine.begin() as conn:
+        await conn.run_sync(reservations.Base.metadata.create_all)
+    # No parking service here; give every lot room for all the bookings
+    for lot_id in range(1, 21):
+        reservations.lot_capacities.set(lot_id, args.bookings)
+
+    print(f"database={reservations.DATABASE_URL.split('://')[0]} bookings={args.bookings} concurrency={args.concurrency}")
+    for name, app in (("previous", legacy_app()), ("current", reservations.app)):
+        rate, failures = await book(app, args.bookings, args.concurrency)
+        print(f"{name:>8}: {rate:8.1f} bookings/s ({failures} failed)")
+    await reservations.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'reservations_bench.db')}")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+"""
+Requests per second for the parking service, async handlers vs sync handlers.
+
+Both variants serve the same lot queries from the parking service's models:
+the async one through the service's own engine and session factory
+(services/common/database.py), the sync one through a plain ``create_engine``
+session as the service did before it moved to async engines. The service
+itself answers lot reads from its in-memory catalog, so the handlers here
+query the database directly to keep the comparison about the engines. Each
+variant runs in its own uvicorn process and is driven with concurrent
+GET /lots/{id} and GET /lots requests.
+
+    python benchmarks/services_async_vs_sync.py [--concurrency 64] [--duration 10]
+
+Uses a throwaway SQLite database unless DATABASE_URL is set; point it at
+Postgres (postgresql://...) for meaningful numbers. The sync variant then
+needs psycopg2 installed.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "services", "parking"))
+
+
+def sync_app():
+    from fastapi import Depends, FastAPI, HTTPException
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session, sessionmaker
+    from typing import List
+    import main as parking
+
+    engine = create_engine(os.environ["DATABASE_URL"], pool_pre_ping=True)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    app = FastAPI()
+
+    def get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @app.get("/lots", response_model=List[parking.ParkingLotResponse])
+    def get_lots(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+        return db.query(parking.ParkingLot).filter(parking.ParkingLot.is_active == True).offset(skip).limit(limit).all()
+
+    @app.get("/lots/{lot_id}", response_model=parking.ParkingLotResponse)
+    def get_lot(lot_id: int, db: Session = Depends(get_db)):
+        lot = db.query(parking.ParkingLot).filter(parking.ParkingLot.id == lot_id).first()
+        if not lot:
+            raise HTTPException(status_code=404, detail="Parking lot not found")
+        return lot
+
+    return app
+
+
+def async_app():
+    from fastapi import Depends, FastAPI, HTTPException
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from typing import List
+    import main as parking
+
+    app = FastAPI()
+
+    @app.get("/lots", response_model=List[parking.ParkingLotResponse])
+    async def get_lots(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(parking.get_db)):
+        lots = await db.scalars(
+            select(parking.ParkingLot).where(parking.ParkingLot.is_active == True).offset(skip).limit(limit)
+        )
+        return lots.all()
+
+    @app.get("/lots/{lot_id}", response_model=parking.ParkingLotResponse)
+    async def get_lot(lot_id: int, db: AsyncSession = Depends(parking.get_db)):
+        lot = await db.get(parking.ParkingLot, lot_id)
+        if not lot:
+            raise HTTPException(status_code=404, detail="Parking lot not found")
+        return lot
+
+    return app
+
+
+def serve(variant, port):
+    import uvicorn
+    app = sync_app() if variant == "sync" else async_app()
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="critical")
+
+
+def seed(lots):
+    from datetime import time as time_type
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    import main as parking
+
+    engine = create_engine(os.environ["DATABASE_URL"])
+    parking.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.query(parking.ParkingLot).delete()
+        db.add_all(
+            parking.ParkingLot(
+                name=f"Lot {i}", address=f"{i} Bliss Street", latitude=33.89 + i * 1e-4, longitude=35.48,
+                hourly_rate=1.5, daily_rate=10, monthly_rate=120, total_spots=100, available_spots=40,
+                opening_time=time_type(6, 0), closing_time=time_type(22, 0), is_active=True,
+            )
+            for i in range(lots)
+        )
+        db.commit()
+        ids = [row[0] for row in db.query(parking.ParkingLot.id).all()]
+    engine.dispose()
+    return ids
+
+
+async def drive(port, ids, concurrency, duration):
+    import httpx
+    done = 0
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(client):
+        nonlocal done, errors
+        while time.perf_counter() < deadline:
+            if random.random() < 0.8:
+                url = f"/lots/{random.choice(ids)}"
+            else:
+                url = "/lots?limit=20"
+            try:
+                response = await client.get(url)
+                response.raise_for_status()
+                done += 1
+            except httpx.HTTPError:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return done / elapsed, errors
+
+
+def wait_for(port, timeout=30):
+    import httpx
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/lots/0", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--lots", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--serve", choices=["sync", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'parking_bench.db')}")
+    ids = seed(args.lots)
+
+    print(f"database={os.environ['DATABASE_URL'].split('://')[0]} concurrency={args.concurrency} duration={args.duration}s")
+    for variant in ("sync", "async"):
+        server = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", variant, "--port", str(args.port)])
+        try:
+            wait_for(args.port)
+            rps, errors = asyncio.run(drive(args.port, ids, args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{variant:>5}: {rps:8.1f} req/s ({errors} errors)")
+
+
+if __name__ == "__main__":
+    main()
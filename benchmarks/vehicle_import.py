@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+Vehicle import throughput: row by row through Vehicle.save versus
+vehicle_import.import_vehicles.
+
+Generates --rows vehicles for --students students, with a few percent of bad
+plates and repeated plates mixed in. It times saving the first --baseline
+rows one at a time (a duplicate check query and full_clean per row, as
+add_vehicle does), then imports the whole set in bulk into a fresh table.
+
+    python benchmarks/vehicle_import.py [--rows 20000] [--students 2000] [--baseline 2000]
+
+Uses a throwaway SQLite database unless DATABASE_NAME is set.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run(args):
+    from django.contrib.auth.models import User
+    from django.core.exceptions import ValidationError
+    from parking.models import StudentProfile, Vehicle
+    from parking.utils import vehicle_import
+
+    User.objects.bulk_create(User(username=f"student{i}") for i in range(args.students))
+    StudentProfile.objects.bulk_create(StudentProfile(user=user) for user in User.objects.all())
+
+    rows = []
+    for number in random.sample(range(10000, 10000000), args.rows):
+        plate = f"{random.choice('BGMNOPST')} {number}"
+        roll = random.random()
+        if roll < 0.02:
+            plate = f"{plate}X"
+        elif roll < 0.04 and rows:
+            plate = random.choice(rows)["license_plate"].lower().replace(" ", "")
+        rows.append({"username": f"student{random.randrange(args.students)}", "make": "Kia", "model": "Rio",
+                     "year": "2020", "license_plate": plate, "color": "white"})
+    students = dict(StudentProfile.objects.values_list("user__username", "id"))
+
+    started = time.perf_counter()
+    for row in rows[:args.baseline]:
+        vehicle = Vehicle(student_id=students[row["username"]], make=row["make"], model=row["model"],
+                          year=int(row["year"]), license_plate=row["license_plate"], color=row["color"])
+        try:
+            vehicle.clean()
+            if not Vehicle.objects.filter(license_plate=vehicle.license_plate).exists():
+                vehicle.save()
+        except ValidationError:
+            pass
+    per_row_s = (time.perf_counter() - started) / args.baseline
+    Vehicle.objects.all().delete()
+
+    started = time.perf_counter()
+    result = vehicle_import.import_vehicles(enumerate(rows, start=2))
+    bulk_s = time.perf_counter() - started
+
+    print(f"rows={args.rows} created={result.created} rejected={len(result.errors)}")
+    print(f"row by row   {1 / per_row_s:10.0f} rows/s")
+    print(f"bulk import  {args.rows / bulk_s:10.0f} rows/s  ({bulk_s:.2f} s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--students", type=int, default=2000)
+    parser.add_argument("--baseline", type=int, default=2000)
+    args = parser.parse_args()
+    os.environ.setdefault("DATABASE_NAME", os.path.join(tempfile.mkdtemp(), "vehicle_import_bench.sqlite3"))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "unipark.settings")
+    os.environ.setdefault("DEBUG", "False")
+
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,67 @@
+import json
+from collections import Counter
+
+from django.conf import settings
 from django.contrib import admin
-from .models import StudentProfile, Vehicle, ParkingLot, Reservation
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Least
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .live import hub
+from .models import ArchivedReservation, StudentProfile, Vehicle, ParkingLot, Reservation
+from .utils import plates, timeline
+from .utils.plates import OPEN_STATUSES, normalize_plate, plate_key
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    On PostgreSQL, uses the planner's row estimate for the page count once it
+    passes ADMIN_COUNT_ESTIMATE_THRESHOLD, instead of an exact COUNT(*) over
+    millions of rows: pg_class.reltuples for the unfiltered table, EXPLAIN
+    for a filtered one. Smaller results, and other databases, are counted.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                if not queryset.query.where:
+                    # Summed over the partitions of a partitioned table, whose own reltuples means nothing
+                    table = queryset.model._meta.db_table
+                    cursor.execute(
+                        'SELECT coalesce(sum(reltuples) FILTER (WHERE reltuples > 0), 0)::bigint FROM pg_class '
+                        'WHERE oid = %s::regclass OR oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)',
+                        [table, table],
+                    )
+                    estimate = cursor.fetchone()[0]
+                else:
+                    sql, params = queryset.query.sql_with_params()
+                    cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+                    plan = cursor.fetchone()[0]
+                    estimate = (plan if isinstance(plan, list) else json.loads(plan))[0]['Plan']['Plan Rows']
+            if estimate >= settings.ADMIN_COUNT_ESTIMATE_THRESHOLD:
+                return int(estimate)
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables with millions of rows: estimated counts,
+    no second COUNT for the unfiltered total, and searches that resolve to
+    indexed lookups (see get_search_results in the subclasses).
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def search_students(self, term):
+        """Students whose username starts with ``term``, as a subquery on the small profiles table"""
+        return StudentProfile.objects.filter(user__username__istartswith=term).values('id')
+
 
 @admin.register(StudentProfile)
 class StudentProfileAdmin(admin.ModelAdmin):
@@ -9,12 +71,26 @@ class StudentProfileAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at']
 
 @admin.register(Vehicle)
-class VehicleAdmin(admin.ModelAdmin):
+class VehicleAdmin(LargeTableAdmin):
     list_display = ['student', 'make', 'model', 'year', 'license_plate', 'color', 'is_primary', 'created_at']
-    list_filter = ['make', 'year', 'is_primary', 'created_at']
-    search_fields = ['make', 'model', 'license_plate', 'student__user__username']
+    list_select_related = ['student__user']
+    # make and year would need a DISTINCT over the whole table to list their choices
+    list_filter = ['is_primary']
+    search_fields = ['license_plate', 'student__user__username']
+    search_help_text = 'A plate (e.g. B 123456) or the start of a username.'
+    ordering = ['-id']
+    raw_id_fields = ['student']
     readonly_fields = ['created_at']
 
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        plate = normalize_plate(term)
+        if plate:
+            return queryset.filter(plate_key=plate_key(plate)), False
+        return queryset.filter(student__in=self.search_students(term)), False
+
 @admin.register(ParkingLot)
 class ParkingLotAdmin(admin.ModelAdmin):
     list_display = ['name', 'owner', 'address', 'hourly_rate', 'daily_rate', 'available_spots', 'total_spots', 'is_active']
@@ -43,11 +119,19 @@ class ParkingLotAdmin(admin.ModelAdmin):
     )
 
 @admin.register(Reservation)
-class ReservationAdmin(admin.ModelAdmin):
-    list_display = ['student', 'vehicle', 'parking_lot', 'status', 'start_time', 'end_time', 'total_cost', 'created_at']
-    list_filter = ['status', 'created_at', 'start_time']
-    search_fields = ['student__user__username', 'vehicle__license_plate', 'parking_lot__name']
+class ReservationAdmin(LargeTableAdmin):
+    list_display = ['id', 'student', 'vehicle', 'parking_lot', 'status', 'start_time', 'end_time', 'total_cost', 'created_at']
+    list_select_related = ['student__user', 'vehicle', 'parking_lot']
+    list_filter = ['status']
+    # Drill-down choices come from Min/Max of start_time (templates/admin/parking/reservation/change_list.html)
+    date_hierarchy = 'start_time'
+    search_fields = ['vehicle__license_plate', 'student__user__username', 'parking_lot__name']
+    search_help_text = 'A reservation id, a plate (e.g. B 123456), the start of a username or the start of a lot name.'
+    # Newest first along reservation_start_idx (and reservation_status_start_idx under a status filter)
+    ordering = ['-start_time']
+    raw_id_fields = ['student', 'vehicle', 'parking_lot']
     readonly_fields = ['created_at', 'qr_code']
+    actions = ['mark_confirmed', 'mark_completed', 'mark_expired', 'mark_cancelled']
     
     fieldsets = (
         ('Reservation Details', {
@@ -62,4 +146,100 @@ class ReservationAdmin(admin.ModelAdmin):
         ('Access', {
             'fields': ('qr_code',)
         })
-    )
\ No newline at end of file
+    )
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if term.isdigit():
+            return queryset.filter(pk=int(term)), False
+        plate = normalize_plate(term)
+        if plate:
+            return queryset.filter(vehicle__plate_key=plate_key(plate)), False
+        # Prefix match so it can use parkinglot_name_prefix_idx (migration 0012) on PostgreSQL
+        lots = ParkingLot.objects.filter(name__istartswith=term).values('id')
+        return queryset.filter(Q(student__in=self.search_students(term)) | Q(parking_lot__in=lots)), False
+
+    def set_status(self, request, queryset, status):
+        # One UPDATE for the whole selection, even with "select all"; no per-row saves or signals,
+        # so a cancellation gives spots back and refreshes the caches the signals would have
+        now = timezone.now()
+        with transaction.atomic():
+            changed = queryset.exclude(status=status)
+            released = []
+            if status == 'cancelled':
+                released = list(
+                    changed.filter(status__in=OPEN_STATUSES, end_time__gt=now).select_for_update()
+                    .values_list('parking_lot_id', 'series_id', 'start_time', 'end_time')
+                )
+            updated = changed.update(status=status)
+            if released:
+                self.release_spots(released, now)
+        self.message_user(request, f"{updated} reservation(s) marked as {status}.")
+
+    def release_spots(self, released, now):
+        """Give the cancelled reservations' spots back with one UPDATE per lot, as cancel_reservation does one at a time"""
+        spots = Counter()
+        series = set()
+        for lot_id, series_id, start_time, end_time in released:
+            timeline.reservation_removed(lot_id, start_time, end_time)
+            if series_id:
+                series.add((lot_id, series_id))
+            else:
+                spots[lot_id] += 1
+        # A weekly series holds one spot for all its occurrences, so only one with none left open gives it back
+        still_open = set(
+            Reservation.objects.filter(
+                series_id__in={series_id for _, series_id in series}, status__in=OPEN_STATUSES, end_time__gt=now
+            ).values_list('series_id', flat=True)
+        )
+        spots.update(lot_id for lot_id, series_id in series if series_id not in still_open)
+        for lot_id, count in spots.items():
+            ParkingLot.objects.filter(pk=lot_id).update(
+                available_spots=Least(F('available_spots') + count, F('total_spots'))
+            )
+        lot_ids = {lot_id for lot_id, *_ in released}
+
+        def refresh():
+            for lot_id in lot_ids:
+                plates.index.forget(lot_id)
+            hub.poke()
+
+        transaction.on_commit(refresh)
+
+    @admin.action(description='Mark selected reservations as confirmed')
+    def mark_confirmed(self, request, queryset):
+        self.set_status(request, queryset, 'confirmed')
+
+    @admin.action(description='Mark selected reservations as completed')
+    def mark_completed(self, request, queryset):
+        self.set_status(request, queryset, 'completed')
+
+    @admin.action(description='Mark selected reservations as expired')
+    def mark_expired(self, request, queryset):
+        self.set_status(request, queryset, 'expired')
+
+    @admin.action(description='Mark selected reservations as cancelled')
+    def mark_cancelled(self, request, queryset):
+        self.set_status(request, queryset, 'cancelled')
+
+
+@admin.register(ArchivedReservation)
+class ArchivedReservationAdmin(ReservationAdmin):
+    """Read-only changelist of the archive, with the live table's search and date drill-down"""
+
+    list_display = ReservationAdmin.list_display + ['archived_at']
+    change_list_template = 'admin/parking/reservation/change_list.html'
+    actions = None
+    fieldsets = ReservationAdmin.fieldsets + (
+        ('Archive', {
+            'fields': ('created_at', 'archived_at')
+        }),
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,20 @@ from django.apps import AppConfig
 class ParkingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'parking'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_migrate, post_save
+
+        from . import live
+        from .utils import clustering, partitions, plates
+        from .models import ParkingLot, Reservation, Vehicle
+
+        post_save.connect(live.lot_changed, sender=ParkingLot, dispatch_uid='parking.live.lot_saved')
+        post_delete.connect(live.lot_changed, sender=ParkingLot, dispatch_uid='parking.live.lot_deleted')
+        post_save.connect(clustering.lot_changed, sender=ParkingLot, dispatch_uid='parking.clustering.lot_saved')
+        post_delete.connect(clustering.lot_changed, sender=ParkingLot, dispatch_uid='parking.clustering.lot_deleted')
+        post_save.connect(plates.reservation_changed, sender=Reservation, dispatch_uid='parking.plates.reservation_saved')
+        post_delete.connect(plates.reservation_changed, sender=Reservation, dispatch_uid='parking.plates.reservation_deleted')
+        post_save.connect(plates.vehicle_changed, sender=Vehicle, dispatch_uid='parking.plates.vehicle_saved')
+        post_delete.connect(plates.vehicle_changed, sender=Vehicle, dispatch_uid='parking.plates.vehicle_deleted')
+        post_migrate.connect(partitions.maintain_after_migrate, sender=self, dispatch_uid='parking.partitions.maintain')
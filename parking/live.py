@@ -0,0 +1,150 @@
+"""
+Live lot availability for the find page.
+
+One AvailabilityHub per process keeps the latest ``available_spots`` of every
+active lot and fans changes out to Server-Sent Events subscribers. Changes
+are found by polling the lots table (one narrow query per interval, however
+many subscribers are connected), so writes from other workers, the admin or
+the microservices show up without any broker. Saves made in this process poke
+the hub so they go out without waiting for the next poll.
+
+The hub lives on the ASGI event loop; only ``poke`` may be called from other
+threads.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Iterable
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(event: str, version: int, data) -> str:
+    payload = json.dumps(data, separators=(",", ":"))
+    return f"id: {version}\nevent: {event}\ndata: {payload}\n\n"
+
+
+class Subscription:
+    """Queue of pending SSE messages for one client, optionally limited to some lots."""
+
+    def __init__(self, lots: set[int] | None, max_pending: int):
+        self.lots = lots
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=max_pending)
+        self.resync = False
+
+    def offer(self, version: int, changes: dict[int, int], encoded: str):
+        if self.lots is not None:
+            changes = {lot_id: spots for lot_id, spots in changes.items() if lot_id in self.lots}
+            if not changes:
+                return
+            encoded = sse_event("delta", version, {"v": version, "d": [[k, v] for k, v in changes.items()]})
+        try:
+            self.queue.put_nowait(encoded)
+        except asyncio.QueueFull:
+            # A slow client gets one fresh snapshot instead of an ever-growing backlog
+            self.resync = True
+
+
+class AvailabilityHub:
+    def __init__(self, poll_seconds: float = 2.0, max_pending: int = 32):
+        self.poll_seconds = poll_seconds
+        self.max_pending = max_pending
+        self.version = 0
+        self.snapshot: dict[int, int] = {}
+        self._subscribers: set[Subscription] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wake: asyncio.Event | None = None
+        self._poller: asyncio.Task | None = None
+        self._ready: asyncio.Event | None = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def subscribe(self, lots: Iterable[int] | None = None) -> Subscription:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use on this loop (or the loop was replaced, as in tests)
+            self._loop, self._wake, self._ready, self._poller = loop, asyncio.Event(), asyncio.Event(), None
+        subscription = Subscription(set(lots) if lots else None, self.max_pending)
+        self._subscribers.add(subscription)
+        if self._poller is None or self._poller.done():
+            self._ready.clear()
+            self._poller = loop.create_task(self._run())
+        await self._ready.wait()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscribers.discard(subscription)
+        if not self._subscribers and self._wake is not None:
+            # Let the poller notice it has nobody left to serve
+            self._wake.set()
+
+    def snapshot_for(self, subscription: Subscription) -> dict:
+        lots = self.snapshot.items()
+        if subscription.lots is not None:
+            lots = [(lot_id, spots) for lot_id, spots in lots if lot_id in subscription.lots]
+        return {"v": self.version, "d": [[lot_id, spots] for lot_id, spots in lots]}
+
+    def poke(self):
+        """Thread-safe: ask the poller to look for changes now"""
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass
+
+    def publish(self, changes: dict[int, int]):
+        if not changes:
+            return
+        self.version += 1
+        self.snapshot.update(changes)
+        encoded = sse_event("delta", self.version, {"v": self.version, "d": [[k, v] for k, v in changes.items()]})
+        for subscription in self._subscribers:
+            subscription.offer(self.version, changes, encoded)
+
+    async def refresh(self):
+        from .models import ParkingLot
+
+        current = {
+            lot_id: spots
+            async for lot_id, spots in ParkingLot.objects.filter(is_active=True).values_list("id", "available_spots")
+        }
+        changes = {lot_id: spots for lot_id, spots in current.items() if self.snapshot.get(lot_id) != spots}
+        # Lots that were removed or deactivated read as full
+        changes.update({lot_id: 0 for lot_id in self.snapshot.keys() - current.keys() if self.snapshot[lot_id] != 0})
+        self.publish(changes)
+
+    async def _run(self):
+        try:
+            while self._subscribers:
+                self._wake.clear()
+                try:
+                    await self.refresh()
+                except Exception:
+                    logger.exception("Live availability refresh failed")
+                self._ready.set()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._ready.set()
+
+
+hub = AvailabilityHub(
+    poll_seconds=getattr(settings, "LIVE_AVAILABILITY_POLL_SECONDS", 2.0),
+    max_pending=getattr(settings, "LIVE_AVAILABILITY_MAX_PENDING", 32),
+)
+
+
+def lot_changed(sender, **kwargs):
+    """post_save/post_delete receiver for ParkingLot, connected in ParkingConfig.ready"""
+    hub.poke()
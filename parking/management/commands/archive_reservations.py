@@ -0,0 +1,47 @@
+"""
+Move finished reservations out of the live table into the archive, e.g.
+nightly from cron:
+
+    python manage.py archive_reservations [--days 90] [--dry-run]
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from parking.models import Reservation
+from parking.utils import archive
+
+
+class Command(BaseCommand):
+    help = "Archive completed, expired and cancelled reservations that ended long enough ago."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.RESERVATION_ARCHIVE_AFTER_DAYS,
+            help=f"Archive reservations that ended this many days ago or more (default {settings.RESERVATION_ARCHIVE_AFTER_DAYS}).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.RESERVATION_ARCHIVE_BATCH,
+            help=f"Reservations moved per transaction (default {settings.RESERVATION_ARCHIVE_BATCH}).",
+        )
+        parser.add_argument("--limit", type=int, help="Stop after moving this many reservations.")
+        parser.add_argument("--dry-run", action="store_true", help="Count what would be archived without moving it.")
+
+    def handle(self, *args, days, batch_size, limit, dry_run, **options):
+        if days < 0 or batch_size < 1 or (limit is not None and limit < 1):
+            raise CommandError("--days must not be negative, --batch-size and --limit must be at least 1.")
+        if dry_run:
+            count = archive.archivable(timezone.now() - timedelta(days=days)).count()
+            self.stdout.write(self.style.SUCCESS(f"Would archive {count if limit is None else min(count, limit)} reservations."))
+            return
+        # Reservations missed by the windowed refresh on page loads become terminal here first
+        Reservation.auto_refresh_statuses(full=True)
+        moved = archive.archive_reservations(timedelta(days=days), batch_size, limit)
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} reservations older than {days} days."))
@@ -0,0 +1,96 @@
+"""
+Rebuild the per-lot hour-of-week occupancy forecasts from reservation history.
+
+Meant to run offline, e.g. nightly from cron:
+
+    python manage.py build_occupancy_forecast --weeks 8
+"""
+
+from datetime import timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from parking.models import OccupancyForecast, ParkingLot, Reservation
+from parking.utils import forecast
+
+
+class Command(BaseCommand):
+    help = "Aggregate past reservations into hour-of-week occupancy profiles per lot."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--weeks", type=int, default=8, help="Full weeks of history to use (default 8).")
+        parser.add_argument(
+            "--quantile",
+            type=float,
+            default=0.8,
+            help="Quantile of the weekly values kept for each hour; above 0.5 leans towards busy weeks (default 0.8).",
+        )
+
+    def handle(self, *args, weeks, quantile, **options):
+        if weeks < 1 or not 0 <= quantile <= 1:
+            raise CommandError("--weeks must be at least 1 and --quantile between 0 and 1.")
+
+        # Whole local weeks ending at the start of this week
+        today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        end = today - timedelta(days=today.weekday())
+        start = end - timedelta(weeks=weeks)
+        t0 = start.timestamp()
+        hours = int(round((end.timestamp() - t0) / 3600))
+
+        lots = list(ParkingLot.objects.values_list("id", "total_spots"))
+        if not lots:
+            self.stdout.write("No parking lots, nothing to build.")
+            return
+        index = {lot_id: position for position, (lot_id, _capacity) in enumerate(lots)}
+        capacity = np.maximum(np.array([capacity for _lot_id, capacity in lots], dtype=np.float32), 1)
+
+        rows = (
+            Reservation.objects.filter(start_time__lt=end, end_time__gt=start)
+            .exclude(status="cancelled")
+            .values_list("parking_lot_id", "start_time", "end_time")
+        )
+        lot_positions, starts, ends = [], [], []
+        for lot_id, window_start, window_end in rows.iterator(chunk_size=5000):
+            lot_positions.append(index[lot_id])
+            starts.append(window_start.timestamp())
+            ends.append(window_end.timestamp())
+        lot_positions = np.array(lot_positions, dtype=np.int64)
+        first = np.clip(np.floor((np.array(starts) - t0) / 3600), 0, hours).astype(np.int64)
+        last = np.clip(np.ceil((np.array(ends) - t0) / 3600), 0, hours).astype(np.int64)
+
+        # Reservations overlapping each hour of history, for every lot at once
+        diff = np.zeros((len(lots), hours + 1), dtype=np.int32)
+        np.add.at(diff, (lot_positions, first), 1)
+        np.add.at(diff, (lot_positions, last), -1)
+        occupied = np.cumsum(diff[:, :hours], axis=1) / capacity[:, None]
+
+        # Place every UTC hour at its local (week, hour of week); DST just shifts which hour lands where
+        start_utc = start.astimezone(dt_timezone.utc)
+        week_of, hour_of = np.empty(hours, dtype=np.int64), np.empty(hours, dtype=np.int64)
+        for hour in range(hours):
+            local = timezone.localtime(start_utc + timedelta(hours=hour))
+            week_of[hour] = min((local.date() - start.date()).days // 7, weeks - 1)
+            hour_of[hour] = local.weekday() * 24 + local.hour
+        grid = np.zeros((len(lots), weeks, forecast.HOURS_PER_WEEK), dtype=np.float32)
+        grid[:, week_of, hour_of] = occupied
+
+        profiles = np.clip(np.rint(np.quantile(grid, quantile, axis=1) * 100), 0, 100).astype(np.uint8)
+
+        built_at = timezone.now()
+        with transaction.atomic():
+            OccupancyForecast.objects.all().delete()
+            OccupancyForecast.objects.bulk_create(
+                OccupancyForecast(parking_lot_id=lot_id, profile=profiles[position].tobytes(), weeks=weeks,
+                                  built_at=built_at)
+                for lot_id, position in index.items()
+            )
+        forecast.forget()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Built forecasts for {len(lots)} lots from {len(starts)} reservations "
+                f"({timezone.localtime(start):%Y-%m-%d} to {timezone.localtime(end):%Y-%m-%d})."
+            )
+        )
@@ -0,0 +1,51 @@
+"""
+Import vehicles in bulk from a CSV file, e.g. a university fleet or old permits:
+
+    python manage.py import_vehicles fleet.csv [--dry-run]
+
+The file needs a header row with username, make, model, year and
+license_plate columns, and may have a color column.
+"""
+
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from parking.utils import vehicle_import
+
+
+class Command(BaseCommand):
+    help = "Validate and insert vehicles from a CSV file in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file to import, or - for standard input.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=vehicle_import.CHUNK_SIZE,
+            help=f"Rows per duplicate query and INSERT (default {vehicle_import.CHUNK_SIZE}).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Validate and report without inserting anything.")
+
+    def handle(self, *args, path, chunk_size, dry_run, **options):
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        try:
+            handle = sys.stdin if path == "-" else open(path, newline="", encoding="utf-8-sig")
+        except OSError as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+        with handle:
+            reader = csv.DictReader(handle)
+            missing = {"username", "make", "model", "year", "license_plate"} - set(reader.fieldnames or ())
+            if missing:
+                raise CommandError(f"Missing columns: {', '.join(sorted(missing))}")
+            # Row numbers as a spreadsheet shows them, counting the header as row 1
+            result = vehicle_import.import_vehicles(enumerate(reader, start=2), chunk_size, dry_run)
+
+        for number, message in result.errors:
+            self.stderr.write(f"Row {number}: {message}")
+        verb = "Would import" if dry_run else "Imported"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {result.created} vehicles, skipped {len(result.errors)} rows.")
+        )
@@ -0,0 +1,27 @@
+"""
+Add monthly reservation partitions ahead on PostgreSQL, and detach old ones
+once RESERVATION_PARTITION_RETAIN_MONTHS is set. Partitions the table first
+if RESERVATION_PARTITIONING was turned on since it last ran. Run it e.g.
+monthly from cron; migrate does the same on every deploy:
+
+    python manage.py maintain_reservation_partitions
+"""
+
+from django.core.management.base import BaseCommand
+
+from parking.utils import partitions
+
+
+class Command(BaseCommand):
+    help = "Create upcoming monthly partitions of the reservations table and detach expired ones (PostgreSQL)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias (default 'default').")
+
+    def handle(self, *args, database, **options):
+        created, detached = partitions.maintain(database)
+        for name in created:
+            self.stdout.write(f"Created {name}")
+        for name in detached:
+            self.stdout.write(f"Detached {name}, kept as a table of its own")
+        self.stdout.write(self.style.SUCCESS(f"{len(created)} partitions created, {len(detached)} detached."))
@@ -4,6 +4,7 @@ Microservices client for UNIPARK backend services
 import os
 import requests
 from typing import Optional, Dict, Any
+from urllib.parse import parse_qs, urlsplit
 
 class MicroservicesClient:
     """Client to communicate with backend microservices"""
@@ -106,10 +107,10 @@ class MicroservicesClient:
         return self._request('GET', f"{self.reservations_service}/reservations/{reservation_id}")
     
     def check_in_reservation(self, reservation_id: int, qr_code: str) -> Optional[Dict]:
-        """Check in to reservation"""
-        return self._request('POST', f"{self.reservations_service}/reservations/{reservation_id}/checkin", json={
-            "qr_code": qr_code
-        })
+        """Check in to reservation with the scanned QR payload, whose ``sig`` the service verifies"""
+        sig = parse_qs(urlsplit(qr_code).query).get('sig', [None])[0]
+        return self._request('POST', f"{self.reservations_service}/reservations/{reservation_id}/checkin",
+                             params={'sig': sig} if sig else None)
     
     def cancel_reservation(self, reservation_id: int) -> Optional[Dict]:
         """Cancel reservation"""
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 06:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0004_parkinglot_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='series_id',
+            field=models.UUIDField(blank=True, db_index=True, null=True),
+        ),
+    ]
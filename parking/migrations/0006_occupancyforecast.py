@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0005_reservation_series_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancyForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile', models.BinaryField()),
+                ('weeks', models.PositiveSmallIntegerField()),
+                ('built_at', models.DateTimeField()),
+                ('parking_lot', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy_forecast', to='parking.parkinglot')),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0006_occupancyforecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GateScan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_id', models.CharField(max_length=64, unique=True)),
+                ('result', models.CharField(choices=[('checked_in', 'Checked in'), ('already_checked_in', 'Already checked in'), ('rejected', 'Rejected')], max_length=20)),
+                ('error', models.CharField(blank=True, max_length=120)),
+                ('scanned_at', models.DateTimeField()),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('reservation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='gate_scans', to='parking.reservation')),
+            ],
+        ),
+    ]
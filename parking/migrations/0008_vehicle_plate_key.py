@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:21
+
+import re
+
+from django.db import migrations, models
+
+
+def fill_plate_keys(apps, schema_editor):
+    Vehicle = apps.get_model('parking', 'Vehicle')
+    vehicles = list(Vehicle.objects.only('id', 'license_plate'))
+    for vehicle in vehicles:
+        vehicle.plate_key = re.sub(r'[^0-9A-Z]', '', vehicle.license_plate.upper())
+    Vehicle.objects.bulk_update(vehicles, ['plate_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0007_gatescan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='plate_key',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=20),
+        ),
+        migrations.RunPython(fill_plate_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0008_vehicle_plate_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['start_time'], name='reservation_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'start_time'], name='reservation_status_start_idx'),
+        ),
+    ]
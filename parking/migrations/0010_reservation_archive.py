@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-19 07:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0009_reservation_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='gatescan',
+            name='reservation',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='gate_scans', to='parking.reservation'),
+        ),
+        migrations.CreateModel(
+            name='ArchivedReservation',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('active', 'Active'), ('completed', 'Completed'), ('expired', 'Expired'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('start_time', models.DateTimeField()),
+                ('end_time', models.DateTimeField()),
+                ('total_cost', models.DecimalField(decimal_places=2, max_digits=8)),
+                ('created_at', models.DateTimeField()),
+                ('qr_code', models.ImageField(blank=True, null=True, upload_to='qr_codes/')),
+                ('checked_in', models.BooleanField(default=False)),
+                ('series_id', models.UUIDField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField()),
+                ('parking_lot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reservations', to='parking.parkinglot')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reservations', to='parking.studentprofile')),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reservations', to='parking.vehicle')),
+            ],
+            options={
+                'db_table': 'parking_reservation_archive',
+                'indexes': [models.Index(fields=['student', 'start_time'], name='archive_student_start_idx'), models.Index(fields=['start_time'], name='archive_start_idx'), models.Index(fields=['status', 'start_time'], name='archive_status_start_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def partition_reservations(apps, schema_editor):
+    # PostgreSQL with RESERVATION_PARTITIONING only; see parking.utils.partitions
+    from parking.utils import partitions
+
+    partitions.convert(schema_editor.connection, timezone.now().date())
+
+
+def unpartition_reservations(apps, schema_editor):
+    from parking.utils import partitions
+
+    partitions.revert(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0010_reservation_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_reservations, unpartition_reservations),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+INDEX = 'parkinglot_name_prefix_idx'
+
+
+def add_index(apps, schema_editor):
+    # The admin's lot-name search is name__istartswith, which PostgreSQL runs as UPPER(name::text) LIKE 'TERM%';
+    # only an expression index with text_pattern_ops serves that under a non-C collation. Other databases are left alone
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX} ON parking_parkinglot (UPPER(name::text) text_pattern_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('parking', '0011_partition_reservations'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_index, drop_index),
+    ]
@@ -1,12 +1,17 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from io import BytesIO
 from django.core.files import File
 from django.urls import reverse
-import re
 import qrcode
 
+from .utils.plates import normalize_plate, plate_key
+
 
 class StudentProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -26,27 +31,24 @@ class Vehicle(models.Model):
     model = models.CharField(max_length=50)
     year = models.PositiveIntegerField()
     license_plate = models.CharField(max_length=20)
+    # license_plate without spaces, e.g. "B123456"; what plate readers are matched against
+    plate_key = models.CharField(max_length=20, db_index=True, editable=False, default='')
     color = models.CharField(max_length=30, blank=True, null=True)
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def clean(self):
         # Normalize input: remove extra spaces and uppercase
-        raw_plate = self.license_plate.upper().strip()
-        compact_plate = re.sub(r'\s+', '', raw_plate)
-
-        match = re.fullmatch(r'([A-Z])(\d{2,8})', compact_plate or '')
-        if not match:
+        plate = normalize_plate(self.license_plate)
+        if plate is None:
             raise ValidationError("Invalid Lebanese license plate format. Use format like: B 123456")
 
-        self.license_plate = f"{match.group(1)} {match.group(2)}"
+        self.license_plate = plate
 
     def save(self, *args, **kwargs):
-        # Run validation before saving
+        # Run validation (which also normalizes the plate) before saving
         self.full_clean()
-
-        # Normalize again before saving
-        self.license_plate = re.sub(r'\s+', ' ', self.license_plate.upper().strip())
+        self.plate_key = plate_key(self.license_plate)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -103,24 +105,58 @@ class Reservation(models.Model):
     
     qr_code = models.ImageField(upload_to='qr_codes/', blank=True, null=True)
     checked_in = models.BooleanField(default=False)
+    # Shared by the occurrences of a recurring booking; null for one-off reservations
+    series_id = models.UUIDField(blank=True, null=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            # Date drill-down and range filters in the admin; status filter with a date range
+            models.Index(fields=['start_time'], name='reservation_start_idx'),
+            models.Index(fields=['status', 'start_time'], name='reservation_status_start_idx'),
+        ]
+
+    # With RESERVATION_MAX_DAYS set, reserve_partial holds bookings to these, so start_time can be bounded by
+    # queries that only know end_time or created_at, letting PostgreSQL skip whole partitions (migration 0011)
+    BOOKING_GRACE = timedelta(hours=1)
+
+    @staticmethod
+    def max_duration() -> timedelta | None:
+        """The longest booking, None while bookings are unlimited"""
+        return timedelta(days=settings.RESERVATION_MAX_DAYS) if settings.RESERVATION_MAX_DAYS else None
+
+    @classmethod
+    def started_within_max_duration(cls, now) -> Q:
+        """Implied for every reservation open at ``now`` under the booking limits; matches all without them"""
+        longest = cls.max_duration()
+        return Q(start_time__gt=now - longest) if longest else Q()
+
+    @classmethod
+    def started_since_booking(cls, booked_from) -> Q:
+        """Implied for every reservation booked at ``booked_from`` or later under the booking limits"""
+        return Q(start_time__gte=booked_from - cls.BOOKING_GRACE) if cls.max_duration() else Q()
+
+    def gate_pass(self) -> str:
+        """Signed token the gate verifies offline (see parking.utils.passes)"""
+        from .utils import passes
+
+        return passes.signer().sign(
+            self.id, self.parking_lot_id, self.start_time, self.end_time, self.vehicle.license_plate
+        )
 
     def generate_qr_code(self):
         import qrcode
         from io import BytesIO
         from django.core.files import File
-        from django.conf import settings
-
-        check_in_url = reverse('parking:check_in', args=[self.id])
-        full_url = f"http://127.0.0.1:8000{check_in_url}"  # Change to your domain
 
-        # Generate a high quality QR code image
+        # The pass is short and alphanumeric, so it fits a small QR version; M
+        # correction is plenty for codes shown on a phone screen
         qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_H,
+            version=None,
+            error_correction=qrcode.constants.ERROR_CORRECT_M,
             box_size=10,
             border=4,
         )
-        qr.add_data(full_url)
+        qr.add_data(self.gate_pass())
         qr.make(fit=True)
         img = qr.make_image(fill_color="black", back_color="white")
 
@@ -130,35 +166,111 @@ class Reservation(models.Model):
         buffer.close()
 
     @classmethod
-    def auto_refresh_statuses(cls) -> None:
+    def auto_refresh_statuses(cls, full: bool = False) -> None:
         """
         Synchronize reservation statuses with their scheduled windows.
 
         - Pending/confirmed reservations that are currently in their booking window become active.
         - Active reservations that have ended remain active only if the driver checked in; otherwise they expire.
         - Checked-in reservations that have ended transition to completed once their window has elapsed.
+
+        Under the booking limits only reservations that started within the longest booking are looked
+        at, which covers every window that is open now or just closed; ``full`` (run by
+        archive_reservations) also catches ones that were missed for longer.
         """
         from django.utils import timezone
 
         now = timezone.now()
+        recent = cls.objects.all() if full else cls.objects.filter(cls.started_within_max_duration(now))
 
         # Promote upcoming reservations to active when their window begins.
-        cls.objects.filter(
+        recent.filter(
             status__in=['pending', 'confirmed'],
             start_time__lte=now,
             end_time__gt=now,
         ).update(status='active')
 
         # Mark checked-in reservations as completed when their window ends.
-        cls.objects.filter(
+        recent.filter(
             status__in=['pending', 'confirmed', 'active'],
             end_time__lte=now,
             checked_in=True,
         ).update(status='completed')
 
         # Any other overdue reservations expire automatically.
-        cls.objects.filter(
+        recent.filter(
             status__in=['pending', 'confirmed', 'active'],
             end_time__lte=now,
             checked_in=False,
         ).update(status='expired')
+
+
+class ArchivedReservation(models.Model):
+    """
+    A finished reservation moved out of the reservations table by
+    archive_reservations, under its original id. Read only by the history page,
+    owner exports and the admin, so the live table keeps to reservations that
+    can change.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(StudentProfile, on_delete=models.CASCADE, related_name='archived_reservations')
+    vehicle = models.ForeignKey(Vehicle, on_delete=models.CASCADE, related_name='archived_reservations')
+    parking_lot = models.ForeignKey(ParkingLot, on_delete=models.CASCADE, related_name='archived_reservations')
+    status = models.CharField(max_length=20, choices=Reservation.STATUS_CHOICES)
+    start_time = models.DateTimeField()
+    end_time = models.DateTimeField()
+    total_cost = models.DecimalField(max_digits=8, decimal_places=2)
+    created_at = models.DateTimeField()
+    qr_code = models.ImageField(upload_to='qr_codes/', blank=True, null=True)
+    checked_in = models.BooleanField(default=False)
+    series_id = models.UUIDField(blank=True, null=True)
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'parking_reservation_archive'
+        indexes = [
+            # A student's history page, newest first
+            models.Index(fields=['student', 'start_time'], name='archive_student_start_idx'),
+            models.Index(fields=['start_time'], name='archive_start_idx'),
+            models.Index(fields=['status', 'start_time'], name='archive_status_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student.user.username} - {self.parking_lot.name} (archived)"
+
+
+class OccupancyForecast(models.Model):
+    """Hour-of-week occupancy profile of a lot, built from reservation history by build_occupancy_forecast."""
+
+    parking_lot = models.OneToOneField(ParkingLot, on_delete=models.CASCADE, related_name='occupancy_forecast')
+    # 168 bytes, one per local hour of the week starting Monday 00:00: the share of the lot booked, in percent
+    profile = models.BinaryField()
+    weeks = models.PositiveSmallIntegerField()
+    built_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.parking_lot.name} forecast ({self.weeks} weeks)"
+
+
+class GateScan(models.Model):
+    """One pass scan reported by a gate controller, keyed by the controller's own event id so retries are harmless."""
+
+    RESULT_CHOICES = [
+        ('checked_in', 'Checked in'),
+        ('already_checked_in', 'Already checked in'),
+        ('rejected', 'Rejected'),
+    ]
+
+    event_id = models.CharField(max_length=64, unique=True)
+    # No database constraint: scans keep the id when their reservation moves to ArchivedReservation
+    reservation = models.ForeignKey(
+        Reservation, on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name='gate_scans'
+    )
+    result = models.CharField(max_length=20, choices=RESULT_CHOICES)
+    error = models.CharField(max_length=120, blank=True)
+    scanned_at = models.DateTimeField()
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.event_id} ({self.result})"
@@ -0,0 +1,104 @@
+"""
+Admin template tags for the large parking tables.
+"""
+
+from datetime import date, datetime, timedelta
+
+from django import template
+from django.utils import formats, timezone
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+register = template.Library()
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return (timezone.localtime(value) if timezone.is_aware(value) else value).date()
+    return value
+
+
+def _between(first: date, last: date, kind: str) -> list[date]:
+    if kind == "year":
+        return [date(year, 1, 1) for year in range(first.year, last.year + 1)]
+    if kind == "month":
+        months = (last.year - first.year) * 12 + last.month - first.month
+        return [date(first.year + (first.month - 1 + i) // 12, (first.month - 1 + i) % 12 + 1, 1) for i in range(months + 1)]
+    return [first + timedelta(days=i) for i in range((last - first).days + 1)]
+
+
+def _bounds(queryset, field_name):
+    """Earliest and latest value of the field as dates, or (None, None) for no rows"""
+    values = queryset.order_by().filter(**{f"{field_name}__isnull": False}).values_list(field_name, flat=True)
+    # Two ORDER BY ... LIMIT 1 lookups; a combined MIN/MAX isn't index-assisted on every backend
+    first, last = values.order_by(field_name).first(), values.order_by(f"-{field_name}").first()
+    return (_as_date(first), _as_date(last)) if first is not None else (None, None)
+
+
+@register.inclusion_tag("admin/date_hierarchy.html")
+def range_date_hierarchy(cl):
+    """
+    Drop-in for {% date_hierarchy cl %} on tables too large for its DISTINCT
+    queries. The years, months or days offered are every one between the
+    earliest and latest value of the field in the changelist (already narrowed
+    to the chosen year or month), read as the first row in each direction of
+    its index. A choice may occasionally lead to an empty page.
+    """
+    field_name = cl.date_hierarchy
+    year_field, month_field, day_field = f"{field_name}__year", f"{field_name}__month", f"{field_name}__day"
+    year_lookup, month_lookup, day_lookup = (cl.params.get(name) for name in (year_field, month_field, day_field))
+
+    def link(filters):
+        return cl.get_query_string(filters, [f"{field_name}__"])
+
+    if year_lookup and month_lookup and day_lookup:
+        day = date(int(year_lookup), int(month_lookup), int(day_lookup))
+        return {
+            "show": True,
+            "back": {
+                "link": link({year_field: year_lookup, month_field: month_lookup}),
+                "title": capfirst(formats.date_format(day, "YEAR_MONTH_FORMAT")),
+            },
+            "choices": [{"title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT"))}],
+        }
+
+    first, last = _bounds(cl.queryset, field_name)
+
+    def choices(kind):
+        return _between(first, last, kind) if first else []
+
+    if not (year_lookup or month_lookup or day_lookup) and first and first.year == last.year:
+        # Start at the narrowest level that holds everything, as date_hierarchy does
+        year_lookup = first.year
+        if first.month == last.month:
+            month_lookup = first.month
+
+    if year_lookup and month_lookup:
+        return {
+            "show": True,
+            "back": {"link": link({year_field: year_lookup}), "title": str(year_lookup)},
+            "choices": [
+                {
+                    "link": link({year_field: year_lookup, month_field: month_lookup, day_field: day.day}),
+                    "title": capfirst(formats.date_format(day, "MONTH_DAY_FORMAT")),
+                }
+                for day in choices("day")
+            ],
+        }
+    if year_lookup:
+        return {
+            "show": True,
+            "back": {"link": link({}), "title": _("All dates")},
+            "choices": [
+                {
+                    "link": link({year_field: year_lookup, month_field: month.month}),
+                    "title": capfirst(formats.date_format(month, "YEAR_MONTH_FORMAT")),
+                }
+                for month in choices("month")
+            ],
+        }
+    return {
+        "show": True,
+        "back": None,
+        "choices": [{"link": link({year_field: str(year.year)}), "title": str(year.year)} for year in choices("year")],
+    }
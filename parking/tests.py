@@ -1,3 +1,450 @@
-from django.test import TestCase
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from services.common import range_partitions
+
+from .models import ArchivedReservation, GateScan, ParkingLot, Reservation, StudentProfile, Vehicle
+from .utils import archive, exports, map_updates, partitions, passes, plates
+from .utils.vehicle_import import import_vehicles
+
+SERVICES = settings.BASE_DIR / "services"
+
+
+def installed(*modules):
+    return all(importlib.util.find_spec(module) for module in modules)
+
+
+def load_service(name, **env):
+    """A service's main.py, imported as ``<name>_service`` with ``env`` set, the way its image runs it"""
+    directory = SERVICES / name
+    if str(directory) not in sys.path:
+        sys.path.insert(0, str(directory))
+    with mock.patch.dict(os.environ, env):
+        spec = importlib.util.spec_from_file_location(f"{name}_service", directory / "main.py")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    return module
+
+
+class ParkingFixtures(TestCase):
+    """An owner with a lot and a student with a vehicle"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user("owner", password="x", is_staff=True, is_superuser=True)
+        cls.user = User.objects.create_user("student", password="x")
+        cls.student = StudentProfile.objects.create(user=cls.user)
+        cls.vehicle = Vehicle.objects.create(
+            student=cls.student, make="Kia", model="Rio", year=2020, license_plate="B 123456"
+        )
+        cls.lot = cls.make_lot("Hamra")
+
+    @classmethod
+    def make_lot(cls, name, total_spots=10):
+        return ParkingLot.objects.create(
+            name=name, owner=cls.owner, address="Beirut", latitude=Decimal("33.89"), longitude=Decimal("35.48"),
+            hourly_rate=2, daily_rate=12, monthly_rate=150, total_spots=total_spots, available_spots=total_spots,
+            opening_time="06:00", closing_time="22:00",
+        )
+
+    def reserve(self, start, hours=1, status="confirmed", lot=None, vehicle=None):
+        return Reservation.objects.create(
+            student=self.student, vehicle=vehicle or self.vehicle, parking_lot=lot or self.lot, status=status,
+            start_time=start, end_time=start + timedelta(hours=hours), total_cost=Decimal("2.00"),
+        )
+
+
+class GatePassTests(ParkingFixtures):
+    def setUp(self):
+        self.reservation = self.reserve(timezone.now() - timedelta(minutes=10))
+        self.token = self.reservation.gate_pass()
+
+    def test_pass_carries_the_reservation(self):
+        gate_pass = passes.verifier().verify(self.token, self.lot.id)
+        self.assertEqual(gate_pass.reservation_id, self.reservation.id)
+        self.assertEqual(gate_pass.lot_id, self.lot.id)
+        self.assertEqual(gate_pass.plate, "B 123456")
+
+    def test_pass_is_rejected_elsewhere_and_outside_its_window(self):
+        verifier = passes.verifier()
+        with self.assertRaisesMessage(passes.InvalidPass, "another lot"):
+            verifier.verify(self.token, self.lot.id + 1)
+        with self.assertRaisesMessage(passes.InvalidPass, "expired"):
+            verifier.verify(self.token, at=(self.reservation.end_time + timedelta(days=1)).timestamp())
+
+    def test_tampered_pass_is_rejected(self):
+        tampered = self.token[:-1] + ("A" if self.token[-1] != "A" else "B")
+        with self.assertRaises(passes.InvalidPass):
+            passes.verifier().verify(tampered)
+        response = self.client.post(reverse("parking:verify_gate_pass"), {"pass": tampered})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(response.json()["valid"])
+
+    def test_gate_verifies_pass_without_a_session(self):
+        response = self.client.post(reverse("parking:verify_gate_pass"), {"pass": self.token, "lot": self.lot.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["reservation"], self.reservation.id)
+
+
+@override_settings(GATE_API_KEY="gate-key")
+class GateScanTests(ParkingFixtures):
+    def scan(self, events, key="gate-key"):
+        return self.client.post(
+            reverse("parking:ingest_gate_scans"), json.dumps({"events": events}),
+            content_type="application/json", headers={"X-Gate-Key": key},
+        )
+
+    def test_retried_batch_is_not_applied_twice(self):
+        reservation = self.reserve(timezone.now() - timedelta(minutes=10))
+        events = [
+            {"id": "gate-1", "pass": reservation.gate_pass(), "lot": self.lot.id},
+            {"id": "gate-2", "pass": reservation.gate_pass(), "lot": self.lot.id},
+        ]
+        first = self.scan(events).json()["results"]
+        self.assertEqual([result["result"] for result in first], ["checked_in", "already_checked_in"])
+
+        retry = self.scan(events).json()["results"]
+        self.assertEqual([result["result"] for result in retry], ["checked_in", "already_checked_in"])
+        self.assertTrue(all(result["duplicate"] for result in retry))
+        self.assertEqual(GateScan.objects.count(), 2)
+        reservation.refresh_from_db()
+        self.assertTrue(reservation.checked_in)
+
+    def test_cancelled_and_forged_passes_are_rejected(self):
+        cancelled = self.reserve(timezone.now() - timedelta(minutes=10), status="cancelled")
+        results = self.scan([
+            {"id": "gate-1", "pass": cancelled.gate_pass()},
+            {"id": "gate-2", "pass": "NOTAPASS"},
+        ]).json()["results"]
+        self.assertEqual([result["result"] for result in results], ["rejected", "rejected"])
+        self.assertEqual(results[0]["error"], "Reservation was cancelled")
+        cancelled.refresh_from_db()
+        self.assertFalse(cancelled.checked_in)
+
+    def test_wrong_key_is_refused(self):
+        self.assertEqual(self.scan([], key="wrong").status_code, 403)
+
+
+@override_settings(GATE_API_KEY="gate-key")
+class PlateLookupTests(ParkingFixtures):
+    def setUp(self):
+        plates.index.forget()
+        self.reservation = self.reserve(timezone.now() - timedelta(minutes=10))
+
+    def lookup(self, plate):
+        response = self.client.get(
+            reverse("parking:gate_plate_lookup"), {"lot": self.lot.id, "plate": plate}, headers={"X-Gate-Key": "gate-key"}
+        )
+        return response.json()
+
+    def test_exact_read_in_any_spelling(self):
+        result = self.lookup("b-123 456")
+        self.assertEqual(result["match"], "exact")
+        self.assertEqual([found["id"] for found in result["reservations"]], [self.reservation.id])
+
+    def test_one_misread_character_still_matches(self):
+        result = self.lookup("B123457")
+        self.assertEqual(result["match"], "fuzzy")
+        self.assertEqual(result["distance"], 1)
+        self.assertEqual([found["id"] for found in result["reservations"]], [self.reservation.id])
+
+    def test_ambiguous_and_unknown_reads(self):
+        other = Vehicle.objects.create(student=self.student, make="Kia", model="Rio", year=2021, license_plate="B 123459")
+        self.reserve(timezone.now() - timedelta(minutes=10), vehicle=other)
+        self.assertEqual(self.lookup("B123458")["match"], "ambiguous")
+        self.assertIsNone(self.lookup("Z 999")["match"])
+
+
+class VehicleImportTests(ParkingFixtures):
+    def test_bad_rows_are_reported_and_the_rest_imported(self):
+        row = {"username": "student", "make": "Kia", "model": "Picanto", "year": "2019"}
+        result = import_vehicles([
+            (2, {**row, "license_plate": "m 55 555"}),
+            (3, {**row, "license_plate": "M 55555"}),
+            (4, {**row, "license_plate": "B 123456"}),
+            (5, {**row, "license_plate": "not a plate"}),
+            (6, {**row, "license_plate": "N 1234", "username": "nobody"}),
+            (7, {**row, "license_plate": "N 1235", "year": "-5"}),
+            (8, {**row, "license_plate": "N 1236", "year": "soon"}),
+        ])
+        self.assertEqual(result.created, 1)
+        self.assertEqual([number for number, _message in result.errors], [3, 4, 5, 6, 7, 8])
+        self.assertIn("already appears on row 2", result.errors[0][1])
+        self.assertIn("already registered", result.errors[1][1])
+        self.assertTrue(Vehicle.objects.filter(plate_key="M55555", is_primary=False).exists())
+
+    def test_dry_run_writes_nothing(self):
+        result = import_vehicles(
+            [(2, {"username": "student", "make": "Kia", "model": "Rio", "year": 2020, "license_plate": "C 777"})],
+            dry_run=True,
+        )
+        self.assertEqual((result.created, result.errors), (1, []))
+        self.assertFalse(Vehicle.objects.filter(plate_key="C777").exists())
+
+
+class MapUpdateTests(SimpleTestCase):
+    def setUp(self):
+        map_updates.history = map_updates.SnapshotHistory()
+
+    def test_current_client_gets_nothing_and_a_new_one_everything(self):
+        rows = [(1, 33.9, 35.5, 3), (2, 33.8, 35.4, 0)]
+        full = map_updates.map_update(rows, None)
+        self.assertEqual(full["cols"]["id"], [1, 2])
+        self.assertIsNone(map_updates.map_update(rows, full["v"]))
+
+    def test_known_version_gets_a_delta(self):
+        rows = [(1, 33.9, 35.5, 3), (2, 33.8, 35.4, 0)]
+        base = map_updates.map_update(rows, None)["v"]
+        delta = map_updates.map_update([(1, 33.9, 35.5, 1), (3, 33.7, 35.3, 2)], base)
+        self.assertEqual(delta["base"], base)
+        self.assertEqual(delta["changed"]["id"], [1, 3])
+        self.assertEqual(delta["removed"], [2])
+
+    def test_forgotten_version_gets_everything(self):
+        update = map_updates.map_update([(1, 33.9, 35.5, 3)], "0123456789abcdef")
+        self.assertNotIn("base", update)
+        self.assertEqual(update["cols"]["id"], [1])
+
+
+class ArchiveExportTests(ParkingFixtures):
+    def setUp(self):
+        self.day = timezone.make_aware(datetime(2025, 3, 4, 9))
+        self.old = self.reserve(self.day, status="completed")
+        self.recent = self.reserve(self.day + timedelta(hours=2), status="completed")
+        self.future = self.reserve(timezone.now() + timedelta(days=1))
+        # Only the first ended long enough ago
+        Reservation.objects.filter(pk=self.recent.pk).update(end_time=timezone.now())
+
+    def test_archive_moves_finished_reservations_under_their_ids(self):
+        moved = archive.archive_reservations(timedelta(days=30), batch_size=1)
+        self.assertEqual(moved, 1)
+        self.assertFalse(Reservation.objects.filter(pk=self.old.pk).exists())
+        self.assertEqual(ArchivedReservation.objects.get().pk, self.old.pk)
+
+    def test_exports_merge_the_archive_in_order(self):
+        archive.archive_reservations(timedelta(days=30), batch_size=10)
+        spec = exports.ExportSpec.parse("reservations", {"columns": "id,status"}, [self.lot.id])
+        self.assertEqual(
+            list(exports.rows(spec, chunk_size=1)),
+            [(self.old.pk, "completed"), (self.recent.pk, "completed"), (self.future.pk, "confirmed")],
+        )
+
+    def test_revenue_adds_up_a_day_split_across_both_tables(self):
+        archive.archive_reservations(timedelta(days=30), batch_size=10)
+        spec = exports.ExportSpec.parse(
+            "revenue", {"start": "2025-03-04", "end": "2025-03-04", "columns": "day,reservations,revenue"}, [self.lot.id]
+        )
+        self.assertEqual(list(exports.rows(spec, chunk_size=10)), [(date(2025, 3, 4), 2, Decimal("4.00"))])
+
+
+class PartitionDDLTests(SimpleTestCase):
+    def runner(self, attached=(), occupied=()):
+        """A ``run`` that records statements and answers the catalog lookups"""
+        statements = []
+
+        def run(sql, params=None):
+            statements.append(sql)
+            if "pg_inherits" in sql:
+                return [(name,) for name in attached]
+            if sql.startswith("SELECT EXISTS"):
+                return [(any(f"'{month}" in sql for month in occupied),)]
+            return []
+
+        return run, statements
+
+    def test_missing_months_are_created(self):
+        run, statements = self.runner(attached=["parking_reservation_p2026_01"])
+        created = range_partitions.create_partitions(
+            run, "parking_reservation", "start_time", date(2026, 1, 15), date(2026, 3, 1)
+        )
+        self.assertEqual(created, ["parking_reservation_p2026_02", "parking_reservation_p2026_03"])
+        self.assertIn(
+            'CREATE TABLE "parking_reservation_p2026_02" PARTITION OF "parking_reservation" '
+            "FOR VALUES FROM ('2026-02-01 00:00:00+00') TO ('2026-03-01 00:00:00+00')",
+            statements,
+        )
+
+    def test_rows_in_the_default_partition_move_into_a_new_month(self):
+        run, statements = self.runner(occupied=["2026-02-01"])
+        range_partitions.create_partitions(run, "parking_reservation", "start_time", date(2026, 2, 1), date(2026, 2, 1))
+        self.assertTrue(any(sql.startswith("WITH moved AS (DELETE FROM \"parking_reservation_default\"") for sql in statements))
+        self.assertTrue(any("ATTACH PARTITION \"parking_reservation_p2026_02\"" in sql for sql in statements))
+
+    def test_months_that_ended_are_detached(self):
+        run, statements = self.runner(attached=[
+            "parking_reservation_p2025_11", "parking_reservation_p2025_12", "parking_reservation_p2026_01",
+        ])
+        detached = range_partitions.detach_partitions(run, "parking_reservation", date(2026, 1, 1))
+        self.assertEqual(detached, ["parking_reservation_p2025_11", "parking_reservation_p2025_12"])
+        self.assertEqual(statements[-1], 'ALTER TABLE "parking_reservation" DETACH PARTITION "parking_reservation_p2025_12"')
+
+    def test_add_months_crosses_years(self):
+        self.assertEqual(range_partitions.add_months(date(2025, 11, 1), 3), date(2026, 2, 1))
+        self.assertEqual(range_partitions.add_months(date(2025, 1, 1), -1), date(2024, 12, 1))
+
+
+@skipUnless(connection.vendor == "postgresql", "partitioning is PostgreSQL only")
+class PartitionConversionTests(ParkingFixtures):
+    def is_partitioned(self):
+        with connection.cursor() as cursor:
+            return partitions.is_partitioned(partitions.runner(cursor), partitions.TABLE)
+
+    @override_settings(RESERVATION_PARTITIONING=True)
+    def test_round_trip_keeps_rows_and_unique_ids(self):
+        existing = self.reserve(timezone.now() - timedelta(days=40))
+        # The copy drops the old table, which Postgres refuses while this transaction's deferred FK checks are pending
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        self.assertTrue(partitions.convert(connection, timezone.now().date()))
+        self.assertTrue(self.is_partitioned())
+        added = self.reserve(timezone.now())
+        self.assertGreater(added.pk, existing.pk)
+        with self.assertRaises(DatabaseError), transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {partitions.TABLE} (id) VALUES (%s)", [existing.pk])
+
+        self.assertTrue(partitions.revert(connection))
+        self.assertFalse(self.is_partitioned())
+        self.assertEqual(set(Reservation.objects.values_list("pk", flat=True)), {existing.pk, added.pk})
+
+    def test_off_by_default(self):
+        self.assertFalse(partitions.convert(connection, timezone.now().date()))
+        self.assertFalse(self.is_partitioned())
+
+
+@skipUnless(installed("jose"), "needs the services' python-jose")
+class TokenTests(SimpleTestCase):
+    def setUp(self):
+        from services.common import tokens
+
+        self.tokens = tokens
+        self.verifier = tokens.TokenVerifier(secret="secret")
+        self.claims = {"id": 1, "username": "student", "email": "s@example.com", "first_name": "S",
+                       "last_name": "T", "is_active": True}
+
+    def test_claims_round_trip(self):
+        token = self.tokens.create_access_token({"sub": "student", **self.claims}, secret="secret")
+        claims = self.verifier.verify_header(f"Bearer {token}")
+        self.assertTrue(self.tokens.has_user_claims(claims))
+        self.assertEqual(self.tokens.user_claims(claims), self.claims)
+
+    def test_bad_tokens_are_rejected(self):
+        InvalidToken = self.tokens.InvalidToken
+        with self.assertRaises(InvalidToken):
+            self.verifier.verify(self.tokens.create_access_token({"sub": "student"}, secret="other"))
+        with self.assertRaises(InvalidToken):
+            self.verifier.verify(self.tokens.create_access_token({"sub": "student"}, expires_minutes=-1, secret="secret"))
+        with self.assertRaisesMessage(InvalidToken, "missing required claims"):
+            self.verifier.verify(self.tokens.create_access_token({"id": 1}, secret="secret"))
+        with self.assertRaises(InvalidToken):
+            self.verifier.verify_header("Basic abc")
+
+    def test_old_tokens_without_claims_are_told_apart(self):
+        claims = self.verifier.verify(self.tokens.create_access_token({"sub": "student"}, secret="secret"))
+        self.assertFalse(self.tokens.has_user_claims(claims))
+
+
+@skipUnless(installed("passlib", "bcrypt"), "needs the auth service's passlib and bcrypt")
+class PasswordRehashTests(SimpleTestCase):
+    def setUp(self):
+        from passlib.hash import bcrypt
+
+        with mock.patch.dict(os.environ, {"BCRYPT_ROUNDS": "4"}):
+            spec = importlib.util.spec_from_file_location("auth_hashing", SERVICES / "auth" / "hashing.py")
+            self.hashing = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self.hashing)
+        self.old_hash = bcrypt.using(rounds=5).hash("secret-pw")
+
+    def test_login_with_an_old_work_factor_gets_a_new_hash(self):
+        valid, new_hash = self.hashing._verify_and_update("secret-pw", self.old_hash)
+        self.assertTrue(valid)
+        self.assertTrue(new_hash.startswith("$2b$04$"))
+        self.assertEqual(self.hashing._verify_and_update("secret-pw", new_hash), (True, None))
+
+    def test_wrong_password_gets_no_hash(self):
+        self.assertEqual(self.hashing._verify_and_update("wrong", self.old_hash), (False, None))
+
+
+@skipUnless(installed("fastapi", "sqlalchemy", "aiosqlite", "httpx", "qrcode"), "needs the reservations service's dependencies")
+class ReservationServiceTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.service = load_service(
+            "reservations", DATABASE_URL=f"sqlite:///{cls.directory.name}/reservations.sqlite3", QR_SIGNING_KEY="qr-key"
+        )
+
+        async def create_tables():
+            async with cls.service.engine.begin() as conn:
+                await conn.run_sync(cls.service.Base.metadata.create_all)
+
+        asyncio.run(create_tables())
+
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run(cls.service.engine.dispose())
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.service.availability.load([], [])
+
+    async def book(self, db, lot_id, start, status="confirmed"):
+        reservation = self.service.Reservation(
+            student_id=1, vehicle_id=1, parking_lot_id=lot_id, status=status,
+            start_time=start, end_time=start + timedelta(hours=1), total_cost=2,
+        )
+        db.add(reservation)
+        await db.commit()
+        return reservation
+
+    def test_catch_up_adds_bookings_from_other_replicas_once(self):
+        service, availability = self.service, self.service.availability
+        start = datetime.utcnow() + timedelta(hours=1)
+
+        async def scenario():
+            async with service.SessionLocal() as db:
+                await self.book(db, 7, start)
+                await service.catch_up_availability(db, 7)
+                seen = availability.peak(7, start, start + timedelta(hours=1))
+                # Committed by another replica after this one last looked
+                await self.book(db, 7, start)
+                cancelled = await self.book(db, 7, start, status="cancelled")
+                await service.catch_up_availability(db, 7)
+                await service.catch_up_availability(db, 7)
+                return seen, availability.peak(7, start, start + timedelta(hours=1)), cancelled.id
+
+        seen, caught_up, cancelled_id = asyncio.run(scenario())
+        self.assertEqual((seen, caught_up), (1, 2))
+        self.assertEqual(availability.high_water(7), cancelled_id)
+
+    def test_check_in_needs_a_valid_signature(self):
+        service = self.service
+        HTTPException = importlib.import_module("fastapi").HTTPException
+
+        async def scenario():
+            async with service.SessionLocal() as db:
+                reservation = await self.book(db, 8, datetime.utcnow())
+                for sig in (None, "forged"):
+                    with self.assertRaises(HTTPException) as caught:
+                        await service.check_in(reservation.id, sig, db=db)
+                    self.assertEqual(caught.exception.status_code, 403)
+                result = await service.check_in(reservation.id, service.qr_signature(reservation.id), db=db)
+                await db.refresh(reservation)
+                return result, reservation.checked_in
+
+        self.assertEqual(asyncio.run(scenario()), ({"message": "Checked in successfully"}, True))
@@ -24,6 +24,7 @@ urlpatterns = [
         name='password_reset_complete',
     ),
     path('dashboard/', views.dashboard, name='dashboard'),
+    path('history/', views.reservation_history, name='reservation_history'),
     path('settings/', views.settings_view, name='settings'),
     path('language-toggle/', views.toggle_language, name='toggle_language'),
     path('hero/location/', views.hero_location, name='hero_location'),
@@ -31,11 +32,20 @@ urlpatterns = [
     path('vehicle/edit/<int:vehicle_id>/', views.edit_vehicle, name='edit_vehicle'),
     path('vehicle/delete/<int:vehicle_id>/', views.delete_vehicle, name='delete_vehicle'),
     path('find/', views.find_parking, name='find_parking'),
+    path('find/map-data/', views.map_data, name='map_data'),
+    path('find/map-clusters/', views.map_clusters, name='map_clusters'),
+    path('find/live/', views.live_availability, name='live_availability'),
     path('parking-lot/<int:parking_lot_id>/', views.parking_lot_detail, name='parking_lot_detail'),
     path('api/nearby-parking/', views.get_nearby_parking, name='get_nearby_parking'),
     path('home/reservation-card/', views.home_reservation_card, name='home_reservation_card'),
     path('reserve/<int:parking_lot_id>/', views.reserve_partial, name='reserve_partial'),
     path('cancel/<int:reservation_id>/', views.cancel_reservation, name='cancel_reservation'),
     path('checkin/<int:reservation_id>/', views.check_in, name='check_in'),
+    path('reservation/<int:reservation_id>/qr/', views.reservation_qr_code, name='reservation_qr_code'),
+    path('gate/verify/', views.verify_gate_pass, name='verify_gate_pass'),
+    path('gate/scans/', views.ingest_gate_scans, name='ingest_gate_scans'),
+    path('gate/plates/', views.gate_plate_lookup, name='gate_plate_lookup'),
+    path('exports/<str:kind>/', views.owner_export, name='owner_export'),
+    path('exports/files/<str:name>/', views.owner_export_file, name='owner_export_file'),
 
 ]
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""
+Hot/cold split of the reservations table.
+
+Reservations that can no longer change (completed, expired, cancelled) and
+ended more than RESERVATION_ARCHIVE_AFTER_DAYS ago are moved, under their own
+ids, to ArchivedReservation. Each batch of RESERVATION_ARCHIVE_BATCH rows is
+copied and deleted in its own transaction, so the job can be stopped and
+rerun at any point and never holds locks on more than one batch.
+
+Nothing reads the archive unless asked: the history page, its admin
+changelist and owner exports query it directly, everything else keeps to the
+live table.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+TERMINAL_STATUSES = ("completed", "expired", "cancelled")
+
+
+def archivable(cutoff: datetime):
+    from ..models import Reservation
+
+    return Reservation.objects.filter(status__in=TERMINAL_STATUSES, end_time__lt=cutoff)
+
+
+def archive_batch(cutoff: datetime, batch_size: int) -> int:
+    """Move up to ``batch_size`` archivable reservations; returns how many moved"""
+    from ..models import ArchivedReservation, Reservation
+
+    connection = connections[router.db_for_write(Reservation)]
+    quote = connection.ops.quote_name
+    live, cold = Reservation._meta, ArchivedReservation._meta
+    columns = ", ".join(quote(field.column) for field in live.concrete_fields)
+    with transaction.atomic(using=connection.alias):
+        # Any batch will do: unordered, the oldest rows come straight off reservation_status_start_idx,
+        # where ORDER BY id would sort every archivable row again for each batch
+        ids = list(archivable(cutoff).select_for_update().order_by().values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return 0
+        in_ids = f"{quote(live.pk.column)} IN ({', '.join(['%s'] * len(ids))})"
+        archived_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        # Copied and removed in SQL: the same columns on both sides, no model instances or per-row
+        # delete signals (the only receiver drops cached open reservations, and these are finished)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {quote(cold.db_table)} ({columns}, {quote(cold.get_field('archived_at').column)}) "
+                f"SELECT {columns}, %s FROM {quote(live.db_table)} WHERE {in_ids}",
+                [archived_at, *ids],
+            )
+            cursor.execute(f"DELETE FROM {quote(live.db_table)} WHERE {in_ids}", ids)
+    return len(ids)
+
+
+def archive_reservations(older_than: timedelta, batch_size: int, limit: int | None = None) -> int:
+    """Archive terminal reservations that ended before now - ``older_than``; returns how many moved"""
+    cutoff = timezone.now() - older_than
+    moved = 0
+    while limit is None or moved < limit:
+        count = archive_batch(cutoff, batch_size if limit is None else min(batch_size, limit - moved))
+        moved += count
+        if count < batch_size:
+            break
+    return moved
@@ -0,0 +1,146 @@
+"""
+Batched check-in ingestion for gate controllers.
+
+A gate buffers pass scans and posts them in batches. Every scan carries an
+event id chosen by the gate; a scan whose id was already ingested gets its
+stored result back instead of being applied again, so a gate can retry a
+batch after a timeout without double counting.
+
+scanned_at comes from the gate, so it is only believed within
+GATE_PASS_LEEWAY_SECONDS of the server clock; scans outside that are
+rejected rather than checked against the pass window at a time the gate
+picked.
+
+Passes are checked in memory (see passes.py). The database work for a whole
+batch is a fixed handful of statements in one transaction: one read of the
+event ids already seen, one read of the reservations, one UPDATE for every
+reservation checked in and one INSERT for the scan records.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Any, Sequence
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import passes
+
+EVENT_ID_MAX_LENGTH = 64
+
+
+@dataclass
+class ScanEvent:
+    event_id: str
+    token: str
+    lot_id: int | None
+    scanned_at: datetime
+
+
+class InvalidScan(ValueError):
+    pass
+
+
+def parse_event(raw: Any) -> ScanEvent:
+    """``{"id": ..., "pass": ..., "lot": optional int, "scanned_at": optional ISO 8601}``"""
+    if not isinstance(raw, dict):
+        raise InvalidScan("Each event must be an object")
+    event_id = raw.get("id")
+    if not isinstance(event_id, str) or not 0 < len(event_id) <= EVENT_ID_MAX_LENGTH:
+        raise InvalidScan(f"Each event needs a string id of at most {EVENT_ID_MAX_LENGTH} characters")
+    token = raw.get("pass")
+    if not isinstance(token, str):
+        raise InvalidScan(f"Event {event_id} has no pass")
+    lot_id = raw.get("lot")
+    if lot_id is not None and (isinstance(lot_id, bool) or not isinstance(lot_id, int)):
+        raise InvalidScan(f"Event {event_id} has a non-integer lot")
+    scanned_at = timezone.now()
+    if raw.get("scanned_at"):
+        try:
+            scanned_at = parse_datetime(raw["scanned_at"])
+        except (TypeError, ValueError):
+            scanned_at = None
+        if scanned_at is None:
+            raise InvalidScan(f"Event {event_id} has an invalid scanned_at")
+        if timezone.is_naive(scanned_at):
+            scanned_at = timezone.make_aware(scanned_at, dt_timezone.utc)
+    return ScanEvent(event_id, token, lot_id, scanned_at)
+
+
+def _result(scan) -> dict[str, Any]:
+    result = {"id": scan.event_id, "result": scan.result, "reservation": scan.reservation_id}
+    if scan.error:
+        result["error"] = scan.error
+    return result
+
+
+def ingest(events: Sequence[ScanEvent]) -> list[dict[str, Any]]:
+    """Apply a batch of scans; returns one result per event, in order"""
+    from ..models import GateScan, Reservation
+
+    verifier = passes.verifier()
+    now = timezone.now()
+    leeway = timedelta(seconds=settings.GATE_PASS_LEEWAY_SECONDS)
+    with transaction.atomic():
+        seen = {scan.event_id: scan for scan in GateScan.objects.filter(event_id__in={event.event_id for event in events})}
+
+        # Signatures and windows first, so only plausible scans reach the database
+        fresh: dict[str, tuple[ScanEvent, passes.GatePass | None, str]] = {}
+        for event in events:
+            if event.event_id in seen or event.event_id in fresh:
+                continue
+            if not now - leeway <= event.scanned_at <= now + leeway:
+                fresh[event.event_id] = (event, None, "scanned_at is too far from the server clock")
+                continue
+            try:
+                gate_pass = verifier.verify(event.token, event.lot_id, event.scanned_at.timestamp())
+                fresh[event.event_id] = (event, gate_pass, "")
+            except passes.InvalidPass as exc:
+                fresh[event.event_id] = (event, None, str(exc))
+
+        reservation_ids = {gate_pass.reservation_id for _event, gate_pass, _error in fresh.values() if gate_pass}
+        reservations = {
+            reservation_id: (checked_in, status)
+            for reservation_id, checked_in, status in Reservation.objects.filter(id__in=reservation_ids)
+            .values_list("id", "checked_in", "status")
+        }
+
+        scans, checking_in = [], set()
+        for event, gate_pass, error in fresh.values():
+            reservation_id, result = None, "rejected"
+            if gate_pass is not None:
+                current = reservations.get(gate_pass.reservation_id)
+                if current is None:
+                    error = "Reservation not found"
+                elif current[1] == "cancelled":
+                    error = "Reservation was cancelled"
+                else:
+                    reservation_id = gate_pass.reservation_id
+                    if current[0] or reservation_id in checking_in:
+                        result = "already_checked_in"
+                    else:
+                        result = "checked_in"
+                        checking_in.add(reservation_id)
+            scans.append(
+                GateScan(
+                    event_id=event.event_id,
+                    reservation_id=reservation_id,
+                    result=result,
+                    error=error[:120],
+                    scanned_at=event.scanned_at,
+                )
+            )
+
+        if checking_in:
+            Reservation.objects.filter(id__in=checking_in, checked_in=False).update(checked_in=True)
+        # A concurrent retry of the same batch may have inserted some ids first; its results stand
+        GateScan.objects.bulk_create(scans, ignore_conflicts=True)
+
+    results = {scan.event_id: _result(scan) for scan in scans}
+    for event_id, scan in seen.items():
+        results[event_id] = {**_result(scan), "duplicate": True}
+    return [results[event.event_id] for event in events]
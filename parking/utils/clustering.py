@@ -0,0 +1,205 @@
+"""
+Server-side marker clustering for the find page map.
+
+Lots are projected to Web Mercator and dropped into a square grid per zoom
+level. Cells are 64 map pixels wide and every cell at zoom z is exactly four
+cells at z + 1, so the grids form a hierarchy: a lot sits in one cell per
+level and its cell key at any zoom is its finest key shifted right. Each cell
+keeps its lot count, coordinate sums (for the centroid) and summed available
+and total spots, so changing one lot touches one cell per level instead of
+rebuilding anything.
+
+Viewport queries return the occupied cells inside a bounding box at a zoom as
+clusters, or as plain points for cells holding a single lot. Past
+``max_zoom`` every lot is its own point.
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Any, Iterable
+
+from django.db.models.signals import post_delete
+
+from .map_updates import availability_bucket
+
+# Cells are 2**CELL_BITS times smaller than a 256px tile, i.e. 64px wide
+CELL_BITS = 2
+MAX_ZOOM = 16
+MAX_LATITUDE = 85.05112878
+
+# (id, lat, lng, available, total)
+LotRow = tuple[int, float, float, int, int]
+
+
+def project(lat: float, lng: float) -> tuple[float, float]:
+    """Web Mercator position in [0, 1) x [0, 1), origin at the north-west corner"""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lng + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return min(max(x, 0.0), 1 - 1e-12), min(max(y, 0.0), 1 - 1e-12)
+
+
+class Cell:
+    __slots__ = ("count", "sum_lat", "sum_lng", "available", "total", "lot_ids")
+
+    def __init__(self):
+        self.count = 0
+        self.sum_lat = 0.0
+        self.sum_lng = 0.0
+        self.available = 0
+        self.total = 0
+        self.lot_ids: set[int] = set()
+
+
+class ClusterIndex:
+    def __init__(self, max_zoom: int = MAX_ZOOM):
+        self.max_zoom = max_zoom
+        self.bits = max_zoom + CELL_BITS
+        # Bumped whenever a lot is added, moved, changed or removed
+        self.version = 0
+        self.synced_at = 0.0
+        self._levels: list[dict[tuple[int, int], Cell]] = [{} for _ in range(max_zoom + 1)]
+        self._lots: dict[int, LotRow] = {}
+        self._keys: dict[int, tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._lots)
+
+    def _finest_key(self, lat: float, lng: float) -> tuple[int, int]:
+        x, y = project(lat, lng)
+        scale = 1 << self.bits
+        return int(x * scale), int(y * scale)
+
+    def _apply(self, row: LotRow, key: tuple[int, int], sign: int):
+        lot_id, lat, lng, available, total = row
+        fx, fy = key
+        for zoom, cells in enumerate(self._levels):
+            shift = self.max_zoom - zoom
+            cell_key = (fx >> shift, fy >> shift)
+            cell = cells.get(cell_key)
+            if cell is None:
+                cell = cells[cell_key] = Cell()
+            cell.count += sign
+            cell.sum_lat += sign * lat
+            cell.sum_lng += sign * lng
+            cell.available += sign * available
+            cell.total += sign * total
+            if sign > 0:
+                cell.lot_ids.add(lot_id)
+            else:
+                cell.lot_ids.discard(lot_id)
+                if not cell.count:
+                    del cells[cell_key]
+
+    def _put(self, row: LotRow) -> bool:
+        lot_id = row[0]
+        old = self._lots.get(lot_id)
+        if old == row:
+            return False
+        if old is not None:
+            self._apply(old, self._keys[lot_id], -1)
+        key = self._finest_key(row[1], row[2])
+        self._apply(row, key, 1)
+        self._lots[lot_id] = row
+        self._keys[lot_id] = key
+        return True
+
+    def _drop(self, lot_id: int) -> bool:
+        old = self._lots.pop(lot_id, None)
+        if old is None:
+            return False
+        self._apply(old, self._keys.pop(lot_id), -1)
+        return True
+
+    def put(self, row: LotRow):
+        """Add a lot or update it in place, touching one cell per zoom level"""
+        with self._lock:
+            if self._put(row):
+                self.version += 1
+
+    def remove(self, lot_id: int):
+        with self._lock:
+            if self._drop(lot_id):
+                self.version += 1
+
+    def sync(self, rows: Iterable[LotRow]) -> int:
+        """Bring the index in line with ``rows``, applying only what changed; returns how many lots changed"""
+        rows = list(rows)
+        with self._lock:
+            changed = sum(self._put(row) for row in rows)
+            current = {row[0] for row in rows}
+            changed += sum(self._drop(lot_id) for lot_id in list(self._lots) if lot_id not in current)
+            if changed:
+                self.version += 1
+            self.synced_at = time.monotonic()
+            return changed
+
+    def query(self, west: float, south: float, east: float, north: float, zoom: int) -> dict[str, Any]:
+        """
+        Clusters and single points inside the bounding box at ``zoom``, both in
+        columnar form. Points use the map-data layout (id, lat, lng, b).
+        """
+
+        clusters = {"lat": [], "lng": [], "count": [], "available": [], "total": [], "b": []}
+        points = {"id": [], "lat": [], "lng": [], "b": []}
+        zoom = max(0, zoom)
+        # Past max_zoom the finest cells only serve to find the lots in view
+        level = min(zoom, self.max_zoom)
+        with self._lock:
+            shift = self.max_zoom - level
+            x0, y0 = (value >> shift for value in self._finest_key(north, west))
+            x1, y1 = (value >> shift for value in self._finest_key(south, east))
+            cells = self._levels[level]
+            if (x1 - x0 + 1) * (y1 - y0 + 1) < len(cells):
+                found = ((key, cells.get(key)) for key in
+                         ((x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)))
+            else:
+                found = ((key, cell) for key, cell in cells.items()
+                         if x0 <= key[0] <= x1 and y0 <= key[1] <= y1)
+            for _key, cell in found:
+                if cell is None:
+                    continue
+                if cell.count == 1 or zoom > self.max_zoom:
+                    for lot_id in cell.lot_ids:
+                        self._point(points, *self._lots[lot_id])
+                    continue
+                clusters["lat"].append(round(cell.sum_lat / cell.count, 5))
+                clusters["lng"].append(round(cell.sum_lng / cell.count, 5))
+                clusters["count"].append(cell.count)
+                clusters["available"].append(cell.available)
+                clusters["total"].append(cell.total)
+                clusters["b"].append(availability_bucket(cell.available, cell.total))
+            return {"v": self.version, "zoom": zoom, "clusters": clusters, "points": points}
+
+    @staticmethod
+    def _point(points, lot_id, lat, lng, available, total):
+        points["id"].append(lot_id)
+        points["lat"].append(round(lat, 5))
+        points["lng"].append(round(lng, 5))
+        points["b"].append(availability_bucket(available, total))
+
+
+def lot_rows(lots: Iterable[dict[str, Any]]) -> list[LotRow]:
+    """Index rows for the normalised lots returned by demo.demo_lots()"""
+    return [
+        (lot["id"], float(lot["latitude"]), float(lot["longitude"]), lot.get("available") or 0, lot.get("total") or 0)
+        for lot in lots
+    ]
+
+
+index = ClusterIndex()
+
+
+def lot_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver for ParkingLot, connected in ParkingConfig.ready"""
+    if kwargs.get("signal") is post_delete or not instance.is_active:
+        index.remove(instance.pk)
+    elif index.synced_at and instance.latitude is not None and instance.longitude is not None:
+        # Before the first sync the whole table is loaded anyway
+        index.put((instance.pk, float(instance.latitude), float(instance.longitude),
+                   instance.available_spots, instance.total_spots))
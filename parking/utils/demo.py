@@ -46,7 +46,9 @@ def feature_trio() -> list[dict[str, Any]]:
 
 def hero_stats() -> list[DemoStat]:
     lots = ParkingLot.objects.count()
-    reservations = Reservation.objects.filter(status="confirmed").count()
+    # Under the booking limits, confirmed ones that started before the longest booking are stale, and bounding
+    # start_time prunes partitions
+    reservations = Reservation.objects.filter(Reservation.started_within_max_duration(_now()), status="confirmed").count()
     minutes_saved = max(reservations * 7, 180)
     return [
         DemoStat(label="Partner Garages", value=max(lots, 12)),
@@ -0,0 +1,337 @@
+"""
+Reservation and revenue exports for lot owners.
+
+An export is a queryset over the owner's lots, narrowed to a start_time date
+range and projected onto the requested columns with ``values_list``, read
+with ``.iterator()`` in EXPORT_CHUNK_SIZE batches (a server-side cursor on
+PostgreSQL). The same query runs over the archive (see archive.py) and the
+two ordered streams are merged, so history doesn't drop out of exports once
+it is archived; a day's revenue at a lot can come from both and is added up. CSV is encoded one batch at a time and Parquet one row group of
+EXPORT_PARQUET_ROW_GROUP rows at a time, so memory stays flat however much
+history a lot has. Both come out as chunks of bytes that can feed a
+StreamingHttpResponse or a file. Under ASGI, StreamingHttpResponse collects a
+sync iterator into a list before sending any of it, so the view streams
+``achunks()`` there instead, which reads each chunk in a worker thread as it
+is needed.
+
+Parquet needs pyarrow, which isn't a hard requirement; without it only CSV
+is offered.
+
+Exports too slow to download while waiting run in a background thread that
+writes EXPORT_ROOT/<user id>/<name>: ``<name>.part`` while running, renamed
+to ``<name>`` when done or to ``<name>.failed`` (holding the error) if not.
+Files older than EXPORT_RETENTION_HOURS are removed when the same user starts
+another export.
+"""
+
+from __future__ import annotations
+
+import csv
+import heapq
+import io
+import itertools
+import logging
+import os
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, time as dt_time, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Iterable, Iterator, NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+REVENUE_STATUSES = ("confirmed", "active", "completed")
+
+
+class ExportError(ValueError):
+    pass
+
+
+class Column(NamedTuple):
+    path: str
+    # int, str, bool, decimal, date or datetime; picks the Parquet type
+    kind: str
+
+
+RESERVATION_COLUMNS = {
+    "id": Column("id", "int"),
+    "lot_id": Column("parking_lot_id", "int"),
+    "lot": Column("parking_lot__name", "str"),
+    "student": Column("student__user__username", "str"),
+    "plate": Column("vehicle__license_plate", "str"),
+    "status": Column("status", "str"),
+    "start_time": Column("start_time", "datetime"),
+    "end_time": Column("end_time", "datetime"),
+    "total_cost": Column("total_cost", "decimal"),
+    "checked_in": Column("checked_in", "bool"),
+    "created_at": Column("created_at", "datetime"),
+}
+
+# One row per lot and day of start_time, over paid reservations
+REVENUE_COLUMNS = {
+    "day": Column("day", "date"),
+    "lot_id": Column("lot_id", "int"),
+    "lot": Column("lot", "str"),
+    "reservations": Column("reservations", "int"),
+    "revenue": Column("revenue", "decimal"),
+}
+
+KINDS = {"reservations": RESERVATION_COLUMNS, "revenue": REVENUE_COLUMNS}
+
+
+@dataclass
+class ExportSpec:
+    kind: str
+    columns: list[str]
+    lot_ids: list[int]
+    start: date | None = None
+    end: date | None = None
+
+    @classmethod
+    def parse(cls, kind: str, params, lot_ids: Iterable[int]) -> "ExportSpec":
+        """
+        Read ``columns``, ``lots``, ``start`` and ``end`` (inclusive ISO
+        dates) from query parameters. ``lot_ids`` are the lots the caller may
+        export; ``lots`` can only narrow them.
+        """
+        if kind not in KINDS:
+            raise ExportError(f"Unknown export {kind!r}, expected one of {', '.join(KINDS)}")
+        available = KINDS[kind]
+        columns = [name.strip() for name in params.get("columns", "").split(",") if name.strip()] or list(available)
+        unknown = [name for name in columns if name not in available]
+        if unknown:
+            raise ExportError(f"Unknown columns {', '.join(unknown)}, expected some of {', '.join(available)}")
+
+        allowed = set(lot_ids)
+        if params.get("lots"):
+            try:
+                requested = {int(value) for value in params["lots"].split(",") if value.strip()}
+            except ValueError:
+                raise ExportError("lots should be comma separated lot ids") from None
+            if requested - allowed:
+                raise ExportError("lots may only name your own lots")
+            allowed = requested
+        try:
+            start = date.fromisoformat(params["start"]) if params.get("start") else None
+            end = date.fromisoformat(params["end"]) if params.get("end") else None
+        except ValueError:
+            raise ExportError("start and end should be dates like 2025-01-31") from None
+        if start and end and start > end:
+            raise ExportError("start is after end")
+        return cls(kind, columns, sorted(allowed), start, end)
+
+    def filename(self, fmt: str) -> str:
+        period = "-".join(str(day) for day in (self.start, self.end) if day) or "all"
+        return f"{self.kind}-{period}.{fmt}"
+
+
+def _day_start(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def queryset(spec: ExportSpec, model):
+    """
+    The export over ``model``, Reservation or ArchivedReservation. Rows lead
+    with their sort key, (day, lot_id) or (start_time, id), for rows() to
+    merge on; revenue rows carry every column.
+    """
+    reservations = model.objects.filter(parking_lot_id__in=spec.lot_ids)
+    if spec.start:
+        reservations = reservations.filter(start_time__gte=_day_start(spec.start))
+    if spec.end:
+        reservations = reservations.filter(start_time__lt=_day_start(spec.end + timedelta(days=1)))
+    if spec.kind == "revenue":
+        reservations = (
+            reservations.filter(status__in=REVENUE_STATUSES)
+            .values(day=TruncDate("start_time"), lot_id=F("parking_lot_id"), lot=F("parking_lot__name"))
+            .annotate(reservations=Count("id"), revenue=Sum("total_cost"))
+            .order_by("day", "lot_id")
+        )
+        return reservations.values_list(*REVENUE_COLUMNS)
+    reservations = reservations.order_by("start_time", "id")
+    return reservations.values_list("start_time", "id", *(RESERVATION_COLUMNS[name].path for name in spec.columns))
+
+
+def rows(spec: ExportSpec, chunk_size: int) -> Iterator[tuple]:
+    """The export's rows from the live table and the archive, in order, each read through its own cursor"""
+    from ..models import ArchivedReservation, Reservation
+
+    merged = heapq.merge(
+        *(queryset(spec, model).iterator(chunk_size=chunk_size) for model in (Reservation, ArchivedReservation)),
+        key=lambda row: row[:2],
+    )
+    if spec.kind != "revenue":
+        for row in merged:
+            yield row[2:]
+        return
+    positions = [list(REVENUE_COLUMNS).index(name) for name in spec.columns]
+    for (day, lot_id), group in itertools.groupby(merged, key=lambda row: row[:2]):
+        _, _, lot, count, revenue = next(group)
+        for row in group:
+            count += row[3]
+            revenue += row[4]
+        row = (day, lot_id, lot, count, revenue)
+        yield tuple(row[i] for i in positions)
+
+
+def batches(spec: ExportSpec, chunk_size: int) -> Iterator[list[tuple]]:
+    """The export's rows, ``chunk_size`` at a time"""
+    batch = []
+    for row in rows(spec, chunk_size):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(spec: ExportSpec) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(spec.columns)
+    columns = KINDS[spec.kind]
+    datetimes = [i for i, name in enumerate(spec.columns) if columns[name].kind == "datetime"]
+    # Looked up once: timezone.localtime() per value costs as much as the rest of the row
+    tz = timezone.get_current_timezone()
+    for batch in batches(spec, settings.EXPORT_CHUNK_SIZE):
+        if datetimes:
+            batch = [list(row) for row in batch]
+            for row in batch:
+                for i in datetimes:
+                    if row[i] is not None:
+                        row[i] = row[i].astimezone(tz).isoformat()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink for pyarrow that hands out what was written since the last take()"""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def parquet_chunks(spec: ExportSpec) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        "int": pa.int64(), "str": pa.string(), "bool": pa.bool_(), "decimal": pa.decimal128(12, 2),
+        "date": pa.date32(), "datetime": pa.timestamp("us", tz=settings.TIME_ZONE),
+    }
+    columns = KINDS[spec.kind]
+    schema = pa.schema([(name, types[columns[name].kind]) for name in spec.columns])
+    sink = _Drain()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="snappy") as writer:
+        for batch in batches(spec, settings.EXPORT_PARQUET_ROW_GROUP):
+            # Each batch is one row group; only its columns are held in memory
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)], schema=schema,
+            ))
+            # Not held while the next row group is read
+            del batch
+            yield sink.take()
+    yield sink.take()
+
+
+def chunks(spec: ExportSpec, fmt: str) -> Iterator[bytes]:
+    if fmt == "parquet":
+        return parquet_chunks(spec)
+    return csv_chunks(spec)
+
+
+async def achunks(spec: ExportSpec, fmt: str) -> AsyncIterator[bytes]:
+    """chunks() one at a time from the request's sync thread, which keeps the cursor"""
+    iterator = chunks(spec, fmt)
+    step = sync_to_async(next)
+    try:
+        # next() with a default: StopIteration can't cross an await
+        while (chunk := await step(iterator, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(iterator.close)()
+
+
+def user_dir(user_id: int) -> Path:
+    return Path(settings.EXPORT_ROOT) / str(user_id)
+
+
+def _write(path: Path, spec: ExportSpec, fmt: str):
+    partial = path.with_name(path.name + ".part")
+    try:
+        with open(partial, "wb") as handle:
+            for chunk in chunks(spec, fmt):
+                handle.write(chunk)
+        os.replace(partial, path)
+    except Exception as exc:
+        logger.exception("Export %s failed", path)
+        path.with_name(path.name + ".failed").write_text(str(exc))
+        partial.unlink(missing_ok=True)
+    finally:
+        connections.close_all()
+
+
+def start_background(user_id: int, spec: ExportSpec, fmt: str) -> str:
+    """Write the export to a file in a background thread; returns the file name"""
+    directory = user_dir(user_id)
+    directory.mkdir(parents=True, exist_ok=True)
+    cutoff = time.time() - settings.EXPORT_RETENTION_HOURS * 3600
+    for old in directory.iterdir():
+        if old.stat().st_mtime < cutoff:
+            old.unlink(missing_ok=True)
+    name = f"{uuid.uuid4().hex[:12]}-{spec.filename(fmt)}"
+    threading.Thread(target=_write, args=(directory / name, spec, fmt), name=f"export-{name}", daemon=True).start()
+    return name
+
+
+def background_status(user_id: int, name: str) -> tuple[str, Path | None]:
+    """("ready", path), ("running", None), ("failed", error file) or ("missing", None)"""
+    path = user_dir(user_id) / name
+    if path.name != name or name.endswith((".part", ".failed")):
+        return "missing", None
+    if path.is_file():
+        return "ready", path
+    if path.with_name(name + ".part").is_file():
+        return "running", None
+    if path.with_name(name + ".failed").is_file():
+        return "failed", path.with_name(name + ".failed")
+    return "missing", None
@@ -0,0 +1,70 @@
+"""
+Occupancy forecasts from reservation history.
+
+The build_occupancy_forecast command condenses past reservations into one
+168-byte profile per lot: for every local hour of the week, the share of the
+lot that is usually booked, in percent. This module keeps every profile in
+memory and answers "how full will lot X be at time T" with a dict lookup and
+an index into the profile.
+
+Profiles are reloaded from the database at most every
+OCCUPANCY_FORECAST_RELOAD_SECONDS, so a nightly rebuild reaches every worker
+without restarts.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+HOURS_PER_WEEK = 7 * 24
+
+_profiles: dict[int, bytes] = {}
+_loaded_at = 0.0
+_lock = threading.Lock()
+
+
+def hour_of_week(when: datetime) -> int:
+    """Index into a profile: local Monday 00:00-01:00 is 0"""
+    local = timezone.localtime(when)
+    return local.weekday() * 24 + local.hour
+
+
+def profiles() -> dict[int, bytes]:
+    global _profiles, _loaded_at
+    if time.monotonic() - _loaded_at > settings.OCCUPANCY_FORECAST_RELOAD_SECONDS:
+        with _lock:
+            if time.monotonic() - _loaded_at > settings.OCCUPANCY_FORECAST_RELOAD_SECONDS:
+                from ..models import OccupancyForecast
+
+                _profiles = {
+                    lot_id: bytes(profile)
+                    for lot_id, profile in OccupancyForecast.objects.values_list("parking_lot_id", "profile")
+                }
+                _loaded_at = time.monotonic()
+    return _profiles
+
+
+def forget():
+    """Make the next lookup reload the profiles, e.g. right after a rebuild"""
+    global _loaded_at
+    _loaded_at = 0.0
+
+
+def predicted_share(lot_id: int, when: datetime) -> float | None:
+    """Usual share of the lot booked at ``when``, or None without a forecast"""
+    profile = profiles().get(lot_id)
+    if profile is None:
+        return None
+    return profile[hour_of_week(when)] / 100
+
+
+def predicted_available(lot_id: int, capacity: int, when: datetime) -> int | None:
+    share = predicted_share(lot_id, when)
+    if share is None:
+        return None
+    return max(capacity - round(share * capacity), 0)
@@ -0,0 +1,124 @@
+"""
+Marker data and versioned map updates for the find page.
+
+The map only needs a marker per lot: id, position and an availability bucket.
+Those rows are served in a columnar layout by the map-data endpoint (as JSON
+or as packed typed arrays) and identified by a catalog version, a hash of the
+rows themselves, so every worker agrees on it without any shared state.
+
+The map echoes its version back in the ``X-Map-Version`` request header and
+HTMX responses then carry only the rows that changed since that version in
+their ``HX-Trigger`` header, or nothing when the map is already current. A
+delta can only be computed against a snapshot this process still remembers;
+for anything older the map gets every row again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Iterable
+
+# Recent snapshots kept per process to diff against
+HISTORY_SIZE = 32
+
+# Five decimals is about a metre, plenty for a marker
+COORDINATE_DIGITS = 5
+
+Row = tuple[int, float, float, int]
+
+
+def availability_bucket(available: int, total: int) -> int:
+    """0 full, 1 almost full, 2 filling up, 3 plenty of room"""
+    if available <= 0:
+        return 0
+    if not total or available * 10 < total:
+        return 1
+    if available * 10 < total * 4:
+        return 2
+    return 3
+
+
+def marker_rows(lots: Iterable[dict[str, Any]]) -> list[Row]:
+    """(id, lat, lng, bucket) for the normalised lots returned by demo.demo_lots()"""
+    return [
+        (
+            lot["id"],
+            round(float(lot["latitude"]), COORDINATE_DIGITS),
+            round(float(lot["longitude"]), COORDINATE_DIGITS),
+            availability_bucket(lot.get("available") or 0, lot.get("total") or 0),
+        )
+        for lot in lots
+    ]
+
+
+def catalog_version(rows: list[Row]) -> str:
+    encoded = json.dumps(rows, separators=(",", ":"))
+    return hashlib.blake2b(encoded.encode(), digest_size=8).hexdigest()
+
+
+def columns(rows: list[Row]) -> dict[str, list]:
+    ids, lats, lngs, buckets = (list(column) for column in zip(*rows)) if rows else ([], [], [], [])
+    return {"id": ids, "lat": lats, "lng": lngs, "b": buckets}
+
+
+def pack_rows(rows: list[Row]) -> bytes:
+    """
+    Little-endian typed arrays: uint32 count, uint32 ids, float32 lats,
+    float32 lngs, uint8 buckets. Every array starts 4-byte aligned.
+    """
+
+    count = len(rows)
+    ids, lats, lngs, buckets = columns(rows).values()
+    return struct.pack(f"<I{count}I{count}f{count}f{count}B", count, *ids, *lats, *lngs, *buckets)
+
+
+class SnapshotHistory:
+    def __init__(self, size: int = HISTORY_SIZE):
+        self.size = size
+        self._snapshots: OrderedDict[str, dict[int, Row]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, version: str, rows: list[Row]):
+        with self._lock:
+            if version in self._snapshots:
+                self._snapshots.move_to_end(version)
+                return
+            self._snapshots[version] = {row[0]: row for row in rows}
+            while len(self._snapshots) > self.size:
+                self._snapshots.popitem(last=False)
+
+    def get(self, version: str) -> dict[int, Row] | None:
+        with self._lock:
+            return self._snapshots.get(version)
+
+
+history = SnapshotHistory()
+
+
+def map_update(rows: list[Row], client_version: str | None) -> dict[str, Any] | None:
+    """
+    Payload for the ``map:update`` event, or None when the client is current.
+
+    Full payloads look like ``{"v": version, "cols": {...}}``; deltas like
+    ``{"v": version, "base": client_version, "changed": {...}, "removed": [...]}``
+    where ``cols`` and ``changed`` use the columnar layout of ``columns``.
+    """
+
+    version = catalog_version(rows)
+    history.remember(version, rows)
+    if client_version == version:
+        return None
+    old = history.get(client_version) if client_version else None
+    if old is None:
+        return {"v": version, "cols": columns(rows)}
+    current = {row[0] for row in rows}
+    return {
+        "v": version,
+        "base": client_version,
+        "changed": columns([row for row in rows if old.get(row[0]) != row]),
+        "removed": [lot_id for lot_id in old if lot_id not in current],
+    }
@@ -0,0 +1,102 @@
+"""
+Monthly range partitions of the reservations table on PostgreSQL.
+
+Only with RESERVATION_PARTITIONING set: migration 0011 (or the next
+``migrate`` after the setting is turned on) rebuilds parking_reservation as a
+table partitioned by month of start_time: same columns, defaults, indexes and
+foreign keys, a primary key of (id, start_time) as PostgreSQL requires, ids
+from the sequence only so they stay unique, one partition per month of
+existing data and RESERVATION_PARTITION_MONTHS_AHEAD months after the current
+one, and a default partition for anything outside them. Rows are copied, so
+on a large table it needs a maintenance window. Migrating back to 0010 turns
+it into a plain table again. Other databases are left alone.
+
+After every ``migrate`` (post_migrate) and from the
+maintain_reservation_partitions command, the months ahead are topped up and,
+when RESERVATION_PARTITION_RETAIN_MONTHS is set, partitions that ended more
+than that many months ago are detached. A detached partition is kept as a
+plain table to dump or drop; with retention longer than the archive window,
+archive_reservations has emptied it long before.
+
+The DDL lives in services/common/range_partitions.py, shared with the
+reservations service; this module runs it through a Django cursor.
+
+Queries prune partitions only with a condition on start_time, which the
+views add when RESERVATION_MAX_DAYS is set (see
+Reservation.started_within_max_duration and started_since_booking).
+"""
+
+from __future__ import annotations
+
+from datetime import date
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from services.common.range_partitions import (  # noqa: F401
+    add_months, create_partitions, detach_partitions, is_partitioned, partition_table, partitions, unpartition_table,
+)
+
+TABLE = "parking_reservation"
+COLUMN = "start_time"
+
+
+def runner(cursor):
+    """A Django cursor as the ``run`` callable range_partitions takes"""
+    def run(sql, params=None):
+        cursor.execute(sql, params)
+        return cursor.fetchall() if cursor.description else []
+    return run
+
+
+def convert(connection, today: date) -> bool:
+    """Partition the table if RESERVATION_PARTITIONING asks for it and it isn't yet; returns whether it did"""
+    if connection.vendor != "postgresql" or not settings.RESERVATION_PARTITIONING:
+        return False
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        run = runner(cursor)
+        if is_partitioned(run, TABLE):
+            return False
+        partition_table(run, TABLE, COLUMN, settings.RESERVATION_PARTITION_MONTHS_AHEAD, today)
+    return True
+
+
+def revert(connection) -> bool:
+    """Turn the partitioned table back into a plain one; returns whether it was partitioned"""
+    if connection.vendor != "postgresql":
+        return False
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        run = runner(cursor)
+        if not is_partitioned(run, TABLE):
+            return False
+        unpartition_table(run, TABLE, COLUMN)
+    return True
+
+
+def maintain(using: str = "default", today: date | None = None) -> tuple[list[str], list[str]]:
+    """
+    Partition the table if the setting was turned on since, add the months
+    ahead and detach old partitions; returns (created, detached) partition names
+    """
+    from django.utils import timezone
+
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return [], []
+    today = today or timezone.now().date()
+    month = today.replace(day=1)
+    convert(connection, today)
+    with connection.cursor() as cursor:
+        run = runner(cursor)
+        if not is_partitioned(run, TABLE):
+            return [], []
+        created = create_partitions(run, TABLE, COLUMN, month, add_months(month, settings.RESERVATION_PARTITION_MONTHS_AHEAD))
+        detached = []
+        if settings.RESERVATION_PARTITION_RETAIN_MONTHS:
+            detached = detach_partitions(run, TABLE, add_months(month, -settings.RESERVATION_PARTITION_RETAIN_MONTHS))
+    return created, detached
+
+
+def maintain_after_migrate(sender, using, **kwargs):
+    """post_migrate receiver for the parking app, connected in ParkingConfig.ready"""
+    maintain(using)
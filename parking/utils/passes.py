@@ -0,0 +1,162 @@
+"""
+Signed gate passes carried by the reservation QR codes.
+
+A pass is a short token that holds everything a gate needs to decide whether
+to open: reservation id, lot, booking window and plate. It is signed with a
+truncated HMAC-SHA256, so a gate holding the keys verifies it locally without
+a session, a database read or a network round trip.
+
+Layout before encoding (big-endian):
+
+    key id      1 byte    which key signed the pass
+    reservation 4 bytes
+    lot         4 bytes
+    start       4 bytes   minutes since the Unix epoch (UTC)
+    duration    2 bytes   minutes
+    plate       n bytes   UTF-8, whatever is left before the tag
+    tag         12 bytes  HMAC-SHA256 over everything above, truncated
+
+The token is unpadded base32, which only uses characters from the QR
+alphanumeric set and so encodes at 5.5 bits per character instead of 8.
+
+Keys are ``{key_id: secret}``. Passes are signed with the active key and
+verified with whichever key their key id names, so rotating means adding a
+new key, making it active, and dropping the old one once the passes it signed
+have expired. This module only needs the standard library so gate devices can
+use it as is; ``signer()`` and ``verifier()`` build instances from Django
+settings.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import hmac
+import struct
+import time
+from datetime import datetime, timezone
+from typing import Mapping, NamedTuple
+
+HEADER = struct.Struct(">BIIIH")
+TAG_BYTES = 12
+MAX_PLATE_BYTES = 32
+
+
+class InvalidPass(Exception):
+    """Raised when a pass is malformed, badly signed, for another lot or outside its window."""
+
+
+class GatePass(NamedTuple):
+    reservation_id: int
+    lot_id: int
+    start: int
+    end: int
+    plate: str
+    key_id: int
+
+    @property
+    def starts_at(self) -> datetime:
+        return datetime.fromtimestamp(self.start, timezone.utc)
+
+    @property
+    def ends_at(self) -> datetime:
+        return datetime.fromtimestamp(self.end, timezone.utc)
+
+
+def _macs(keys: Mapping[int, bytes | str]) -> dict[int, "hmac.HMAC"]:
+    macs = {}
+    for key_id, secret in keys.items():
+        if not 0 <= key_id <= 255:
+            raise ValueError(f"Pass key ids must fit in a byte, got {key_id}")
+        macs[key_id] = hmac.new(secret.encode() if isinstance(secret, str) else secret, digestmod=hashlib.sha256)
+    return macs
+
+
+class PassSigner:
+    def __init__(self, keys: Mapping[int, bytes | str], active: int):
+        if active not in keys:
+            raise ValueError(f"Active pass key {active} is not configured")
+        self.key_id = active
+        self._mac = _macs({active: keys[active]})[active]
+
+    def sign(self, reservation_id: int, lot_id: int, start: datetime, end: datetime, plate: str) -> str:
+        start_minute = int(start.timestamp()) // 60
+        # Round the end up so the pass never closes before the booking does
+        duration = -(-int(end.timestamp()) // 60) - start_minute
+        plate_bytes = plate.strip().upper().encode()
+        if len(plate_bytes) > MAX_PLATE_BYTES:
+            raise ValueError("Plate is too long for a pass")
+        body = HEADER.pack(self.key_id, reservation_id, lot_id, start_minute, min(max(duration, 0), 0xFFFF)) + plate_bytes
+        mac = self._mac.copy()
+        mac.update(body)
+        return base64.b32encode(body + mac.digest()[:TAG_BYTES]).decode().rstrip("=")
+
+
+class PassVerifier:
+    """
+    Checks passes against a set of keys. ``leeway`` seconds are allowed on
+    either side of the booking window for early arrivals and clock drift.
+    """
+
+    def __init__(self, keys: Mapping[int, bytes | str], leeway: int = 0):
+        self.leeway = leeway
+        self._macs = _macs(keys)
+
+    def decode(self, token: str) -> GatePass:
+        """Check the signature only; the window and lot are left to the caller"""
+        token = token.strip().upper()
+        try:
+            raw = base64.b32decode(token + "=" * (-len(token) % 8))
+        except (binascii.Error, ValueError) as exc:
+            raise InvalidPass("Pass is not valid base32") from exc
+        if len(raw) < HEADER.size + TAG_BYTES:
+            raise InvalidPass("Pass is too short")
+        body, tag = raw[:-TAG_BYTES], raw[-TAG_BYTES:]
+        mac = self._macs.get(body[0])
+        if mac is None:
+            raise InvalidPass("Pass was signed with an unknown key")
+        mac = mac.copy()
+        mac.update(body)
+        if not hmac.compare_digest(mac.digest()[:TAG_BYTES], tag):
+            raise InvalidPass("Pass signature does not match")
+        key_id, reservation_id, lot_id, start_minute, duration = HEADER.unpack_from(body)
+        try:
+            plate = body[HEADER.size:].decode()
+        except UnicodeDecodeError as exc:
+            raise InvalidPass("Pass plate is not valid UTF-8") from exc
+        return GatePass(reservation_id, lot_id, start_minute * 60, (start_minute + duration) * 60, plate, key_id)
+
+    def verify(self, token: str, lot_id: int | None = None, at: float | None = None) -> GatePass:
+        """Decode ``token`` and check it is for ``lot_id`` (when given) and open at ``at`` (default now)"""
+        gate_pass = self.decode(token)
+        if lot_id is not None and gate_pass.lot_id != lot_id:
+            raise InvalidPass("Pass is for another lot")
+        at = time.time() if at is None else at
+        if at < gate_pass.start - self.leeway:
+            raise InvalidPass("Pass is not valid yet")
+        if at > gate_pass.end + self.leeway:
+            raise InvalidPass("Pass has expired")
+        return gate_pass
+
+
+_signer: PassSigner | None = None
+_verifier: PassVerifier | None = None
+
+
+def signer() -> PassSigner:
+    global _signer
+    if _signer is None:
+        from django.conf import settings
+
+        _signer = PassSigner(settings.GATE_PASS_KEYS, settings.GATE_PASS_ACTIVE_KEY)
+    return _signer
+
+
+def verifier() -> PassVerifier:
+    global _verifier
+    if _verifier is None:
+        from django.conf import settings
+
+        _verifier = PassVerifier(settings.GATE_PASS_KEYS, settings.GATE_PASS_LEEWAY_SECONDS)
+    return _verifier
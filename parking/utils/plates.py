@@ -0,0 +1,210 @@
+"""
+Plate lookups for plate-reader gates.
+
+Plates are compared by key: uppercase letters and digits only, so "b 123456",
+"B123456" and "B-123 456" are the same plate. Vehicle.plate_key stores it
+with an index. normalize_plate and plate_key live in
+services/common/plates.py, shared with the parking service.
+
+For each lot the gate asks about, PlateIndex keeps the reservations that are
+open around now in memory: a dict from plate key to reservations for exact
+reads, and a deletion index over the keys for reads where the camera got a
+character wrong, dropped one or added one. The deletion index finds the few
+plates that can be within GATE_PLATE_MAX_DISTANCE edits of a read with
+dictionary lookups, and only those get a full edit distance. (A BK-tree
+prunes badly here: keys of nearly the same length and alphabet sit at a
+handful of distances from each other, so a search visits a large share of
+the tree.)
+
+A lot's entry is loaded with one query on first use and reloaded after
+GATE_PLATE_INDEX_TTL seconds. Reservation saves in this process drop the
+lot's entry right away; bulk inserts and other workers are caught by the TTL.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple
+
+from django.conf import settings
+from django.utils import timezone
+
+from services.common.plates import normalize_plate, plate_key  # noqa: F401
+
+OPEN_STATUSES = ("pending", "confirmed", "active")
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance: single-character substitutions, insertions and deletions"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def deletions(key: str, depth: int) -> set[str]:
+    """``key`` and every string left after deleting up to ``depth`` of its characters"""
+    variants = {key}
+    frontier = {key}
+    for _ in range(depth):
+        frontier = {variant[:i] + variant[i + 1:] for variant in frontier for i in range(len(variant))}
+        variants |= frontier
+    return variants
+
+
+class DeletionIndex:
+    """
+    Keys filed under every deletion variant of up to ``depth`` characters.
+
+    Two strings within edit distance k share a variant with at most k
+    characters deleted from each (a substitution is the same position deleted
+    from both, an insertion or deletion is one position deleted from one), so
+    the variants of a query name every key that can be within k of it.
+    """
+
+    __slots__ = ("depth", "_variants")
+
+    def __init__(self, depth: int):
+        self.depth = depth
+        self._variants: dict[str, set[str]] = {}
+
+    def add(self, key: str):
+        for variant in deletions(key, self.depth):
+            self._variants.setdefault(variant, set()).add(key)
+
+    def search(self, key: str, max_distance: int) -> list[tuple[int, str]]:
+        """Keys within ``max_distance`` (at most ``depth``) of ``key``, closest first"""
+        max_distance = min(max_distance, self.depth)
+        candidates = set()
+        for variant in deletions(key, max_distance):
+            candidates |= self._variants.get(variant, set())
+        found = ((edit_distance(key, candidate), candidate) for candidate in candidates)
+        return sorted(match for match in found if match[0] <= max_distance)
+
+
+class PlateEntry(NamedTuple):
+    reservation_id: int
+    key: str
+    plate: str
+    start: datetime
+    end: datetime
+    checked_in: bool
+
+
+class LotPlates:
+    __slots__ = ("loaded_at", "by_plate", "fuzzy")
+
+    def __init__(self, entries: list[PlateEntry], depth: int):
+        self.loaded_at = time.monotonic()
+        self.by_plate: dict[str, list[PlateEntry]] = {}
+        self.fuzzy = DeletionIndex(depth)
+        for entry in entries:
+            if entry.key not in self.by_plate:
+                self.fuzzy.add(entry.key)
+            self.by_plate.setdefault(entry.key, []).append(entry)
+
+
+class PlateIndex:
+    def __init__(self, ttl: float = 30.0, leeway: timedelta = timedelta(minutes=15), max_distance: int = 1):
+        self.ttl = ttl
+        self.leeway = leeway
+        self.max_distance = max_distance
+        self._lots: dict[int, LotPlates] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, lot_id: int) -> LotPlates:
+        from ..models import Reservation
+
+        now = timezone.now()
+        # Wide enough that every entry that can open while this copy is in use is already in it
+        rows = Reservation.objects.filter(
+            parking_lot_id=lot_id,
+            status__in=OPEN_STATUSES,
+            end_time__gt=now - self.leeway,
+            start_time__lt=now + self.leeway + timedelta(seconds=self.ttl),
+        ).values_list("id", "vehicle__plate_key", "vehicle__license_plate", "start_time", "end_time", "checked_in")
+        return LotPlates([PlateEntry(*row) for row in rows], self.max_distance)
+
+    def lot(self, lot_id: int) -> LotPlates:
+        plates = self._lots.get(lot_id)
+        if plates is None or time.monotonic() - plates.loaded_at > self.ttl:
+            with self._lock:
+                plates = self._lots.get(lot_id)
+                if plates is None or time.monotonic() - plates.loaded_at > self.ttl:
+                    plates = self._lots[lot_id] = self._load(lot_id)
+        return plates
+
+    def forget(self, lot_id: int | None = None):
+        if lot_id is None:
+            self._lots.clear()
+        else:
+            self._lots.pop(lot_id, None)
+
+    def lookup(self, lot_id: int, plate: str, max_distance: int = 1, at: datetime | None = None) -> dict[str, Any]:
+        """
+        Reservations at ``lot_id`` open at ``at`` (default now) for the plate
+        read as ``plate``. ``match`` is "exact", "fuzzy" (one plate at the
+        smallest distance), "ambiguous" (several) or None.
+        """
+        at = at or timezone.now()
+        key = plate_key(plate)
+        plates = self.lot(lot_id)
+
+        def open_entries(candidate: str) -> list[PlateEntry]:
+            return [
+                entry for entry in plates.by_plate.get(candidate, ())
+                if entry.start - self.leeway <= at <= entry.end + self.leeway
+            ]
+
+        match, distance, entries = None, None, open_entries(key) if key else []
+        if entries:
+            match, distance = "exact", 0
+        elif key and max_distance > 0:
+            closest: list[str] = []
+            for found_distance, candidate in plates.fuzzy.search(key, max_distance):
+                if found_distance == 0 or (closest and found_distance > distance):
+                    continue
+                found = open_entries(candidate)
+                if found:
+                    distance = found_distance
+                    closest.append(candidate)
+                    entries.extend(found)
+            if closest:
+                match = "fuzzy" if len(closest) == 1 else "ambiguous"
+        return {
+            "plate": key,
+            "match": match,
+            "distance": distance,
+            "reservations": [
+                {
+                    "id": entry.reservation_id,
+                    "plate": entry.plate,
+                    "start": entry.start.isoformat(),
+                    "end": entry.end.isoformat(),
+                    "checked_in": entry.checked_in,
+                }
+                for entry in entries
+            ],
+        }
+
+
+index = PlateIndex(
+    settings.GATE_PLATE_INDEX_TTL, timedelta(seconds=settings.GATE_PASS_LEEWAY_SECONDS), settings.GATE_PLATE_MAX_DISTANCE
+)
+
+
+def reservation_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver for Reservation, connected in ParkingConfig.ready"""
+    index.forget(instance.parking_lot_id)
+
+
+def vehicle_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver for Vehicle; plate edits are rare, so drop every lot"""
+    index.forget()
@@ -0,0 +1,51 @@
+"""
+Series bookings in the reserve flow.
+
+The rule itself is expanded by services/common/recurrence.py, shared with the
+reservations service; this module adds the capacity check against the lot's
+existing bookings.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Sequence
+
+from services.common.recurrence import MAX_OCCURRENCES, RecurrenceError, weekly_occurrences  # noqa: F401
+
+
+def split_by_capacity(
+    occurrences: Sequence[tuple[datetime, datetime]],
+    booked: Sequence[tuple[datetime, datetime]],
+    capacity: int,
+) -> tuple[list[tuple[datetime, datetime]], list[tuple[datetime, datetime]]]:
+    """
+    Split occurrences into those that fit next to ``booked`` and those that don't.
+
+    ``booked`` holds the lot's existing reservation windows over the whole
+    series span, fetched with one query. Occurrences never overlap each other,
+    so each is checked against existing bookings only: the peak overlap inside
+    the occurrence is found with a sweep over the bookings that touch it.
+    """
+
+    booked = sorted(booked)
+    starts = [window_start for window_start, _end in booked]
+    # Nothing that starts earlier than this before an occurrence can still be running in it
+    longest = max((window_end - window_start for window_start, window_end in booked), default=timedelta(0))
+    fits, full = [], []
+    for occ_start, occ_end in occurrences:
+        events = []
+        first = bisect_left(starts, occ_start - longest)
+        for window_start, window_end in booked[first: bisect_left(starts, occ_end)]:
+            if window_end > occ_start:
+                events.append((max(window_start, occ_start), 1))
+                events.append((min(window_end, occ_end), -1))
+        # Ends sort before starts at the same instant, so back-to-back bookings don't overlap
+        events.sort(key=lambda event: (event[0], event[1]))
+        peak = current = 0
+        for _moment, delta in events:
+            current += delta
+            peak = max(peak, current)
+        (fits if peak < capacity else full).append((occ_start, occ_end))
+    return fits, full
@@ -0,0 +1,158 @@
+"""
+Per-lot availability timeline for the lot detail page.
+
+Each 30-minute bucket stores the peak number of reservations overlapping it,
+computed for a whole range of buckets with one query and one sorted sweep
+over the reservation windows. Buckets are cached one key per lot and bucket,
+so the detail page reads the next hours with a single ``get_many`` and only
+queries for buckets that are missing.
+
+Writes keep the cache current without recomputing it. A new or cancelled
+reservation shifts the peak of every bucket it fully covers by exactly one,
+and those buckets are adjusted in place. The (at most two) buckets it only
+partly covers are dropped and recomputed on the next read. Expiry needs no
+update: a reservation expires only once its window has ended, and its window
+still counts as occupied time for the buckets it overlapped.
+
+Buckets after the current one also consult the lot's occupancy forecast
+(see forecast.py): a bucket shows whichever is fuller, the bookings already
+made or what history says is usually booked at that hour, and is flagged when
+the forecast wins.
+
+The cache is Django's default cache. With a shared backend every worker sees
+the adjustments; with the per-process default, AVAILABILITY_TIMELINE_TTL
+bounds how stale another worker's buckets can get.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Any, Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import forecast
+
+BUCKET = timedelta(minutes=30)
+# Updates never look further ahead than the longest timeline the page can show
+MAX_HOURS = 24
+# Share of the lot booked from which a bucket is shown as a peak
+PEAK_SHARE = 0.75
+
+
+def bucket_start(moment: datetime) -> datetime:
+    return moment.replace(minute=moment.minute - moment.minute % 30, second=0, microsecond=0)
+
+
+def _key(lot_id: int, start: datetime) -> str:
+    return f"lot-timeline:{lot_id}:{int(start.timestamp())}"
+
+
+def bucket_peaks(windows: Sequence[tuple[datetime, datetime]], start: datetime, count: int) -> list[int]:
+    """
+    Most reservations overlapping at any moment of each of ``count`` buckets
+    from ``start``, in one pass over the windows' start and end events.
+    """
+
+    # Ends sort before starts at the same instant, so back-to-back bookings don't overlap
+    events = sorted([(window_start, 1) for window_start, _end in windows] + [(end, -1) for _start, end in windows])
+    times = [moment for moment, _delta in events]
+    current = 0
+    position = 0
+    peaks = []
+    for index in range(count):
+        lo = start + index * BUCKET
+        hi = lo + BUCKET
+        # Everything up to and including the bucket start sets the level it opens with
+        while position < len(events) and events[position][0] <= lo:
+            current += events[position][1]
+            position += 1
+        peak = current
+        end = bisect_left(times, hi, lo=position)
+        while position < end:
+            current += events[position][1]
+            peak = max(peak, current)
+            position += 1
+        peaks.append(peak)
+    return peaks
+
+
+def _compute(lot_id: int, start: datetime, count: int) -> list[int]:
+    from ..models import Reservation
+
+    end = start + count * BUCKET
+    windows = Reservation.objects.filter(
+        parking_lot_id=lot_id,
+        start_time__lt=end,
+        end_time__gt=start,
+    ).exclude(status="cancelled").values_list("start_time", "end_time")
+    peaks = bucket_peaks(list(windows), start, count)
+    cache.set_many(
+        {_key(lot_id, start + index * BUCKET): peak for index, peak in enumerate(peaks)},
+        settings.AVAILABILITY_TIMELINE_TTL,
+    )
+    return peaks
+
+
+def lot_timeline(lot_id: int, capacity: int, hours: int | None = None) -> list[dict[str, Any]]:
+    """Blocks for the detail page from the current bucket through the next ``hours``"""
+    hours = min(hours or settings.AVAILABILITY_TIMELINE_HOURS, MAX_HOURS)
+    first = bucket_start(timezone.now())
+    starts = [first + index * BUCKET for index in range(hours * 2)]
+    cached = cache.get_many([_key(lot_id, start) for start in starts])
+    peaks = [cached.get(_key(lot_id, start)) for start in starts]
+    missing = [index for index, peak in enumerate(peaks) if peak is None]
+    if missing:
+        computed = _compute(lot_id, starts[missing[0]], missing[-1] - missing[0] + 1)
+        for index in missing:
+            peaks[index] = computed[index - missing[0]]
+
+    blocks = []
+    for index, (start, peak) in enumerate(zip(starts, peaks)):
+        share = forecast.predicted_share(lot_id, start) if index else None
+        expected = round(share * capacity) if share is not None else 0
+        occupied = max(peak, expected)
+        available = max(capacity - occupied, 0)
+        blocks.append(
+            {
+                "time": timezone.localtime(start).strftime("%H:%M"),
+                "available": available,
+                "fill": int(available / capacity * 100) if capacity else 0,
+                "is_peak": capacity > 0 and occupied >= capacity * PEAK_SHARE,
+                "forecast": expected > peak,
+            }
+        )
+    return blocks
+
+
+def _adjust(lot_id: int, start: datetime, end: datetime, delta: int):
+    first = bucket_start(max(start, timezone.now()))
+    last = min(end, bucket_start(timezone.now()) + timedelta(hours=MAX_HOURS))
+    stale = []
+    lo = first
+    while lo < last:
+        hi = lo + BUCKET
+        key = _key(lot_id, lo)
+        if start <= lo and hi <= end:
+            try:
+                cache.incr(key, delta)
+            except ValueError:
+                # Not cached; the next read computes it
+                pass
+        else:
+            stale.append(key)
+        lo = hi
+    if stale:
+        cache.delete_many(stale)
+
+
+def reservation_added(lot_id: int, start: datetime, end: datetime):
+    transaction.on_commit(lambda: _adjust(lot_id, start, end, 1))
+
+
+def reservation_removed(lot_id: int, start: datetime, end: datetime):
+    transaction.on_commit(lambda: _adjust(lot_id, start, end, -1))
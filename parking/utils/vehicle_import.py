@@ -0,0 +1,125 @@
+"""
+Bulk vehicle import for onboarding fleets and migrating old permits.
+
+Rows are checked in one pass before anything touches the database: plates
+are normalized with the precompiled pattern from plates.py and every other
+field is coerced and run through the model field's validators. Duplicates are caught in memory (the same plate twice in
+the input) and against the table with one ``plate_key IN (...)`` query per
+chunk, which the plate_key index answers. Valid rows are then inserted with
+``bulk_create`` in chunks, skipping the per-row ``full_clean`` of
+Vehicle.save since every row has already been validated.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Mapping
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .plates import normalize_plate, plate_key
+
+CHUNK_SIZE = 1000
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    # (row number, message), row numbers as given by the caller
+    errors: list[tuple[int, str]] = field(default_factory=list)
+
+
+def _chunks(values, size: int):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _text(row: Mapping[str, Any], name: str, max_length: int, required: bool = True) -> str:
+    value = str(row.get(name) or "").strip()
+    if required and not value:
+        raise ValueError(f"{name} is required")
+    if len(value) > max_length:
+        raise ValueError(f"{name} is longer than {max_length} characters")
+    return value
+
+
+def prepare(rows: Iterable[tuple[int, Mapping[str, Any]]], students: Mapping[str, int]):
+    """
+    Validate ``(row number, row)`` pairs. Rows need ``username``, ``make``,
+    ``model``, ``year`` and ``license_plate``; ``color`` is optional.
+    ``students`` maps usernames to StudentProfile ids. Returns the rows as
+    Vehicle field dicts keyed by plate key, and the errors.
+    """
+    from ..models import Vehicle
+
+    # bulk_create skips full_clean, so the year's range (PositiveIntegerField) is checked here
+    year_field = Vehicle._meta.get_field("year")
+    valid: dict[str, tuple[int, dict[str, Any]]] = {}
+    errors = []
+    for number, row in rows:
+        try:
+            plate = normalize_plate(str(row.get("license_plate") or ""))
+            if plate is None:
+                raise ValueError(f"invalid plate {row.get('license_plate')!r}, use a format like B 123456")
+            key = plate_key(plate)
+            if key in valid:
+                raise ValueError(f"plate {plate} already appears on row {valid[key][0]}")
+            student_id = students.get(_text(row, "username", 150))
+            if student_id is None:
+                raise ValueError(f"no student with username {row.get('username')!r}")
+            try:
+                year = int(row.get("year"))
+            except (TypeError, ValueError):
+                raise ValueError(f"year {row.get('year')!r} is not a number") from None
+            try:
+                year_field.run_validators(year)
+            except ValidationError as exc:
+                raise ValueError(f"year {year}: {' '.join(exc.messages)}") from None
+            valid[key] = (number, {
+                "student_id": student_id,
+                "make": _text(row, "make", 50),
+                "model": _text(row, "model", 50),
+                "year": year,
+                "license_plate": plate,
+                "plate_key": key,
+                "color": _text(row, "color", 30, required=False) or None,
+            })
+        except ValueError as exc:
+            errors.append((number, str(exc)))
+    return valid, errors
+
+
+def import_vehicles(rows: Iterable[tuple[int, Mapping[str, Any]]], chunk_size: int = CHUNK_SIZE,
+                    dry_run: bool = False) -> ImportResult:
+    from ..models import StudentProfile, Vehicle
+
+    rows = list(rows)
+    students = {}
+    for usernames in _chunks({str(row.get("username") or "").strip() for _number, row in rows}, chunk_size):
+        students.update(StudentProfile.objects.filter(user__username__in=usernames).values_list("user__username", "id"))
+    valid, errors = prepare(rows, students)
+    result = ImportResult(errors=errors)
+
+    for keys in _chunks(valid, chunk_size):
+        for key in set(Vehicle.objects.filter(plate_key__in=keys).values_list("plate_key", flat=True)):
+            number, vehicle = valid.pop(key)
+            result.errors.append((number, f"plate {vehicle['license_plate']} is already registered"))
+    result.errors.sort()
+
+    # A student's first vehicle becomes primary, like adding one from the dashboard
+    with_vehicles = set()
+    for student_ids in _chunks({vehicle["student_id"] for _number, vehicle in valid.values()}, chunk_size):
+        with_vehicles.update(Vehicle.objects.filter(student_id__in=student_ids).values_list("student_id", flat=True))
+    vehicles = []
+    for _number, fields in sorted(valid.values(), key=lambda item: item[0]):
+        is_primary = fields["student_id"] not in with_vehicles
+        with_vehicles.add(fields["student_id"])
+        vehicles.append(Vehicle(is_primary=is_primary, **fields))
+
+    if not dry_run:
+        with transaction.atomic():
+            Vehicle.objects.bulk_create(vehicles, batch_size=chunk_size)
+    result.created = len(vehicles)
+    return result
@@ -3,30 +3,41 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.core.handlers.asgi import ASGIRequest
+from django.core.paginator import Paginator
 import logging
-from django.core.serializers.json import DjangoJSONEncoder
-from django.db.models import Q
-from django.http import HttpResponse, JsonResponse
+from django.db import transaction
+from django.db.models import F, Q
+from django.http import FileResponse, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.templatetags.static import static
 from django.urls import reverse
 from django.utils import timezone, translation
 from django.utils.translation import gettext as _
-from django.views.decorators.http import require_GET
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 from urllib.parse import urlencode
 
+import asyncio
 import json
 import random
 import re
 import string
+import time
+import uuid
 from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Any
 
 from .forms import StudentLoginForm, StudentSignupForm, VehicleForm
-from .models import ParkingLot, Reservation, StudentProfile, Vehicle
-from .utils import demo
+from .live import hub, sse_event
+from .models import ArchivedReservation, ParkingLot, Reservation, StudentProfile, Vehicle
+from .utils import checkins, clustering, demo, exports, forecast, passes, plates, timeline
+from .utils.map_updates import catalog_version, columns, map_update, marker_rows, pack_rows
+from .utils.recurrence import RecurrenceError, split_by_capacity, weekly_occurrences
 
 logger = logging.getLogger(__name__)
 
@@ -39,6 +50,7 @@ def _next_reservation_for(student_profile):
     now = timezone.now()
     return (
         Reservation.objects.filter(
+            Reservation.started_within_max_duration(now),
             student=student_profile,
             end_time__gt=now,  # Use __gt instead of __gte to exclude reservations that just ended
             status__in=["confirmed", "pending", "active"]
@@ -120,6 +132,7 @@ def home(request):
         now = timezone.now()
         upcoming_reservations = list(
             Reservation.objects.filter(
+                Reservation.started_within_max_duration(now),
                 student=student_profile,
                 status__in=["confirmed", "pending", "active"],
                 end_time__gt=now,  # Use __gt to exclude reservations that have ended
@@ -148,6 +161,7 @@ def home_reservation_card(request):
         now = timezone.now()
         reservations = list(
             Reservation.objects.filter(
+                Reservation.started_within_max_duration(now),
                 student=student_profile,
                 status__in=["confirmed", "pending", "active"],
                 end_time__gt=now,  # Use __gt to exclude reservations that have ended
@@ -294,6 +308,8 @@ def dashboard(request):
     student_profile, created = StudentProfile.objects.get_or_create(user=request.user)
     vehicles = student_profile.vehicles.all()
     Reservation.auto_refresh_statuses()
+    # Archived ones are listed on the history page. Not bounded by start_time: archiving goes by end_time and
+    # may not run at all, so anything still in the live table can be among the latest
     recent_reservations = Reservation.objects.filter(student=student_profile).order_by('-created_at')
 
     # Check if user is a parking lot owner
@@ -305,27 +321,31 @@ def dashboard(request):
         # Calculate real metrics for owner
         from django.db.models import Count, Sum, Q
         
-        today = timezone.now().date()
-        today_bookings = Reservation.objects.filter(
+        # Today as a range (created_at__date can't use an index); under the booking limits a booking made today
+        # starts no earlier than BOOKING_GRACE before today, which keeps older partitions out of it
+        today_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        booked_today = Reservation.objects.filter(
+            Reservation.started_since_booking(today_start),
             parking_lot__in=owned_lots,
-            created_at__date=today
-        ).count()
+            created_at__gte=today_start,
+            created_at__lt=today_start + timedelta(days=1),
+        )
+        today_bookings = booked_today.count()
         
         total_spots = owned_lots.aggregate(total=Sum('total_spots'))['total'] or 0
         available_spots = owned_lots.aggregate(total=Sum('available_spots'))['total'] or 0
         occupancy = int((total_spots - available_spots) / total_spots * 100) if total_spots > 0 else 0
         
-        today_revenue = Reservation.objects.filter(
-            parking_lot__in=owned_lots,
-            created_at__date=today,
+        today_revenue = booked_today.filter(
             status__in=['confirmed', 'active', 'completed']
         ).aggregate(total=Sum('total_cost'))['total'] or 0
         
         now = timezone.now()
         live_reservations = Reservation.objects.filter(
+            Reservation.started_within_max_duration(now),
             parking_lot__in=owned_lots,
             status__in=['active', 'confirmed'],
-            end_time__gt=now  # Use __gt to exclude reservations that have ended
+            end_time__gt=now,  # Use __gt to exclude reservations that have ended
         ).select_related('student__user', 'parking_lot').order_by('-start_time')[:10]
         
         owner_metrics = {
@@ -374,6 +394,19 @@ def dashboard(request):
     return render(request, "dashboard.html", context)
 
 
+@login_required
+def reservation_history(request):
+    """The student's archived reservations, newest first (see parking.utils.archive)"""
+    student_profile, created = StudentProfile.objects.get_or_create(user=request.user)
+    archived = (
+        ArchivedReservation.objects.filter(student=student_profile)
+        .select_related("parking_lot", "vehicle")
+        .order_by("-start_time", "-id")
+    )
+    page = Paginator(archived, settings.RESERVATION_HISTORY_PAGE_SIZE).get_page(request.GET.get("page"))
+    return render(request, "history.html", {"page": page})
+
+
 
 @login_required
 def add_vehicle(request):
@@ -425,6 +458,13 @@ def find_parking(request):
     active_filter = request.GET.get("filter", "all")
     current_sort = request.GET.get("sort", "closest")
     live_enabled = request.GET.get("live") in {"1", "true", "on"}
+    arrive = None
+    try:
+        arrive = timezone.make_aware(datetime.strptime(request.GET.get("arrive", ""), "%Y-%m-%dT%H:%M"))
+    except ValueError:
+        pass
+    if arrive is not None and arrive <= timezone.now():
+        arrive = None
 
     raw_lots = demo.demo_lots()
 
@@ -446,6 +486,12 @@ def find_parking(request):
         }
 
     lots = [prepare_lot(item) for item in raw_lots]
+    for lot in lots:
+        # Expected free spots at the chosen arrival time, from the lot's occupancy forecast
+        lot["forecast_open"] = forecast.predicted_available(lot["id"], lot["capacity"], arrive) if arrive else None
+
+    def expected_open(lot):
+        return lot["open"] if lot["forecast_open"] is None else lot["forecast_open"]
 
     if query:
         q = query.lower()
@@ -458,7 +504,7 @@ def find_parking(request):
     filter_sort_map = {
         "closest": lambda lot: lot["distance_km"],
         "best_price": lambda lot: lot["price"] if lot["price"] is not None else float("inf"),
-        "availability": lambda lot: (-lot["open"], lot["capacity"]),
+        "availability": lambda lot: (-expected_open(lot), lot["capacity"]),
     }
 
     if active_filter in filter_sort_map:
@@ -470,22 +516,24 @@ def find_parking(request):
         "closest": lambda lot: lot["distance_km"],
         "price_asc": lambda lot: lot["price"] if lot["price"] is not None else float("inf"),
         "price_desc": lambda lot: lot["price"] if lot["price"] is not None else float("-inf"),
-        "availability_desc": lambda lot: lot["open"],
+        "availability_desc": expected_open,
     }
 
     if current_sort in sort_map:
         reverse = current_sort in {"price_desc", "availability_desc"}
         lots = sorted(lots, key=sort_map[current_sort], reverse=reverse)
 
-    lots_json = json.dumps(raw_lots, cls=DjangoJSONEncoder)
+    rows = marker_rows(raw_lots)
+    map_version = catalog_version(rows)
 
     context = {
         "query": query,
         "lots": lots,
-        "lots_json": lots_json,
+        "map_version": map_version,
         "active_filter": active_filter,
         "current_sort": current_sort,
         "live_enabled": live_enabled,
+        "arrive": arrive,
         "show_skeletons": False,
         "next_url": "",
         "empty_animation": static("img/lottie/search-empty.json"),
@@ -494,14 +542,117 @@ def find_parking(request):
     if is_htmx(request):
         html = render_to_string("partials/_results_items.html", context, request=request)
         response = HttpResponse(html)
-        response["HX-Trigger"] = json.dumps({"map:update": {"lots": raw_lots}})
+        update = map_update(rows, request.headers.get("X-Map-Version"))
+        if update is not None:
+            response["HX-Trigger"] = json.dumps({"map:update": update}, separators=(",", ":"))
         return response
 
     return render(request, "find_parking.html", context)
 
 
+@require_GET
+def map_data(request):
+    """
+    Marker data for the find page map as parallel columns of ids, lat, lng and
+    availability buckets, as JSON or with ``?format=bin`` as packed typed
+    arrays (see map_updates.pack_rows).
+
+    The ETag is the catalog version. The page links here with ``?v=<version>``,
+    and a response for the current version is cached for good since a new
+    version means a new URL. Any other request is revalidated against the ETag.
+    """
+    rows = marker_rows(demo.demo_lots())
+    version = catalog_version(rows)
+    binary = request.GET.get("format") == "bin"
+    etag = f'"{version}.bin"' if binary else f'"{version}"'
+    cache_control = "public, max-age=31536000, immutable" if request.GET.get("v") == version else "no-cache"
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if binary:
+            response = HttpResponse(pack_rows(rows), content_type="application/octet-stream")
+        else:
+            response = JsonResponse({"v": version, **columns(rows)})
+    response["ETag"] = etag
+    response["Cache-Control"] = cache_control
+    response["X-Map-Version"] = version
+    return response
+
+
+@require_GET
+def map_clusters(request):
+    """
+    Clusters and single lots inside ``?bbox=west,south,east,north`` at
+    ``?zoom=``, from the in-process cluster index. The index is brought up to
+    date with the lots table at most every MAP_CLUSTER_SYNC_SECONDS, applying
+    only lots that changed; lot saves in this process update it right away.
+    """
+    try:
+        west, south, east, north = (float(value) for value in request.GET["bbox"].split(","))
+        zoom = int(request.GET.get("zoom", 14))
+    except (KeyError, ValueError):
+        return JsonResponse({"success": False, "error": "Expected bbox=west,south,east,north and an integer zoom"}, status=400)
+
+    index = clustering.index
+    if time.monotonic() - index.synced_at > settings.MAP_CLUSTER_SYNC_SECONDS:
+        index.sync(clustering.lot_rows(demo.demo_lots()))
+    return JsonResponse(index.query(west, south, east, north, zoom))
+
+
+@require_GET
+async def live_availability(request):
+    """
+    Server-Sent Events stream of available spots for the find page live mode.
+
+    Sends a ``snapshot`` event with every lot (or only those in ``?lots=1,2``)
+    and then ``delta`` events carrying ``[[lot_id, available_spots], ...]`` for
+    lots that changed. Runs as an async view so an idle subscriber costs a
+    queue on the event loop rather than a worker thread.
+    """
+    lot_ids = {int(value) for value in request.GET.get("lots", "").split(",") if value.strip().isdigit()}
+    heartbeat = settings.LIVE_AVAILABILITY_HEARTBEAT_SECONDS
+
+    if not isinstance(request, ASGIRequest):
+        # Under WSGI an endless stream would hold a worker thread for good, and Django drains an async
+        # iterator completely before sending any of it. One snapshot instead; EventSource reconnects
+        # after ``retry``, which turns live mode into polling
+        lots = ParkingLot.objects.filter(is_active=True)
+        if lot_ids:
+            lots = lots.filter(id__in=lot_ids)
+        rows = [[lot_id, spots] async for lot_id, spots in lots.values_list("id", "available_spots")]
+        response = HttpResponse("retry: 5000\n" + sse_event("snapshot", hub.version, {"v": hub.version, "d": rows}),
+                                content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    async def stream():
+        subscription = await hub.subscribe(lot_ids or None)
+        try:
+            # Reconnects are fine: every connection starts from a fresh snapshot
+            yield "retry: 5000\n" + sse_event("snapshot", hub.version, hub.snapshot_for(subscription))
+            while True:
+                if subscription.resync:
+                    while not subscription.queue.empty():
+                        subscription.queue.get_nowait()
+                    subscription.resync = False
+                    yield sse_event("snapshot", hub.version, hub.snapshot_for(subscription))
+                try:
+                    yield await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            hub.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Keeps nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
 def parking_lot_detail(request, parking_lot_id):
     lot_data = None
+    availability = None
     try:
         lot_obj = ParkingLot.objects.get(pk=parking_lot_id)
         lot_data = {
@@ -517,6 +668,7 @@ def parking_lot_detail(request, parking_lot_id):
             "ev_chargers": 6,
             "height_limit": "2.1m",
         }
+        availability = timeline.lot_timeline(lot_obj.id, lot_obj.total_spots)
     except ParkingLot.DoesNotExist:
         for lot in demo.demo_lots():
             if int(lot["id"]) == parking_lot_id:
@@ -535,11 +687,114 @@ def parking_lot_detail(request, parking_lot_id):
 
     context = {
         "lot": lot_data,
-        "timeline": demo.availability_timeline(),
+        "timeline": availability if availability is not None else demo.availability_timeline(),
     }
     return render(request, "lot_detail.html", context)
 
 
+def _repeat_weekdays():
+    return [
+        (0, _("Mon")), (1, _("Tue")), (2, _("Wed")), (3, _("Thu")),
+        (4, _("Fri")), (5, _("Sat")), (6, _("Sun")),
+    ]
+
+
+def _reserve_series(request, lot_obj, lot_context, student_profile, vehicle, start_dt, end_dt, form_context):
+    """
+    Book a weekly series in one transaction.
+
+    The rule is expanded here, capacity for every occurrence is checked against
+    one query of the lot's existing bookings, and the occurrences that fit are
+    inserted with a single bulk_create. The lot row stays locked from the check
+    to the insert so concurrent bookings can't both take the last spot. Dates
+    where the lot is full are skipped and listed in the confirmation. QR codes
+    are rendered when first opened (reservation_qr_code), not per occurrence.
+    """
+
+    def form_error(message):
+        html = render_to_string(
+            "partials/_reserve_modal.html", {**form_context, "error": message}, request=request
+        )
+        return HttpResponse(html, status=422)
+
+    try:
+        until = datetime.strptime(request.POST.get("repeat_until") or "", "%Y-%m-%d").date()
+    except ValueError:
+        return form_error(_("Choose the date the weekly booking should end."))
+    tz = timezone.get_current_timezone()
+    start_local = timezone.make_naive(start_dt, tz)
+    weekdays = [int(day) for day in request.POST.getlist("repeat_days") if day.isdigit()] or [start_local.weekday()]
+    try:
+        occurrences = weekly_occurrences(start_local, timezone.make_naive(end_dt, tz), weekdays, until)
+    except RecurrenceError as exc:
+        return form_error(str(exc))
+    occurrences = [(timezone.make_aware(start, tz), timezone.make_aware(end, tz)) for start, end in occurrences]
+
+    duration_hours = (end_dt - start_dt).total_seconds() / 3600
+    cost = Decimal(duration_hours) * lot_obj.hourly_rate
+    series_id = uuid.uuid4()
+    with transaction.atomic():
+        lot_obj = ParkingLot.objects.select_for_update().get(pk=lot_obj.pk)
+        booked = Reservation.objects.filter(
+            parking_lot=lot_obj,
+            status__in=["confirmed", "pending", "active"],
+            start_time__lt=occurrences[-1][1],
+            end_time__gt=occurrences[0][0],
+        ).values_list("start_time", "end_time")
+        bookable, full = split_by_capacity(occurrences, list(booked), lot_obj.total_spots)
+        if not bookable:
+            return form_error(_("The lot is full on every date of this schedule."))
+        reservations = Reservation.objects.bulk_create(
+            Reservation(
+                student=student_profile,
+                vehicle=vehicle,
+                parking_lot=lot_obj,
+                start_time=start,
+                end_time=end,
+                total_cost=cost,
+                status="confirmed",
+                series_id=series_id,
+            )
+            for start, end in bookable
+        )
+        for start, end in bookable:
+            timeline.reservation_added(lot_obj.id, start, end)
+        # A series holds one spot at a time, like a one-off booking
+        ParkingLot.objects.filter(pk=lot_obj.pk, available_spots__gt=0).update(available_spots=F("available_spots") - 1)
+
+    first = reservations[0]
+    html = render_to_string(
+        "partials/_reservation_success_modal.html",
+        {
+            "simulation_only": False,
+            "reservation": first,
+            "lot": lot_context,
+            "start_time": timezone.localtime(first.start_time),
+            "end_time": timezone.localtime(first.end_time),
+            "vehicle": vehicle,
+            "series": {
+                "count": len(reservations),
+                "until": until,
+                "total_cost": cost * len(reservations),
+                "skipped": [timezone.localtime(start) for start, _end in full],
+            },
+        },
+        request=request,
+    )
+    response = HttpResponse(html)
+    payload = {
+        "title": _("Weekly booking confirmed"),
+        "message": _("%(count)d sessions booked through %(until)s.") % {
+            "count": len(reservations),
+            "until": until.strftime("%b %d"),
+        },
+        "variant": "success",
+    }
+    response["X-UniPark-Toast"] = json.dumps(payload)
+    response["HX-Trigger"] = json.dumps({"reservation:refresh": {"id": first.id}})
+    return response
+
+
 def reserve_partial(request, parking_lot_id):
     lot_obj = ParkingLot.objects.filter(pk=parking_lot_id).first()
     simulation_only = False
@@ -575,12 +830,16 @@ def reserve_partial(request, parking_lot_id):
 
     now = timezone.now()
     active_reservations_qs = Reservation.objects.filter(
+        Reservation.started_within_max_duration(now),
         student=student_profile,
         status__in=["confirmed", "pending", "active"],
         end_time__gt=now,  # Use __gt to exclude reservations that have ended
     )
     max_reservations = 3
-    active_reservations_count = active_reservations_qs.count()
+    # A weekly series counts once towards the limit
+    active_reservations_count = active_reservations_qs.filter(series_id__isnull=True).count() + (
+        active_reservations_qs.exclude(series_id=None).values("series_id").distinct().count()
+    )
     max_reservations_reached = not simulation_only and active_reservations_count >= max_reservations
     latest_reservation = active_reservations_qs.order_by("-end_time").first()
 
@@ -599,6 +858,10 @@ def reserve_partial(request, parking_lot_id):
                     "max_reservations_reached": True,
                     "max_reservations": max_reservations,
                     "active_reservations_count": active_reservations_count,
+                    "repeat": request.POST.get("repeat") == "weekly",
+                    "repeat_weekdays": _repeat_weekdays(),
+                    "repeat_days": request.POST.getlist("repeat_days"),
+                    "default_repeat_until": request.POST.get("repeat_until") or "",
                 },
                 request=request,
             )
@@ -621,6 +884,10 @@ def reserve_partial(request, parking_lot_id):
                     "max_reservations_reached": max_reservations_reached,
                     "max_reservations": max_reservations,
                     "active_reservations_count": active_reservations_count,
+                    "repeat": request.POST.get("repeat") == "weekly",
+                    "repeat_weekdays": _repeat_weekdays(),
+                    "repeat_days": request.POST.getlist("repeat_days"),
+                    "default_repeat_until": request.POST.get("repeat_until") or "",
                 },
                 request=request,
             )
@@ -630,19 +897,30 @@ def reserve_partial(request, parking_lot_id):
         start_dt = timezone.make_aware(datetime.strptime(start_time_str, "%Y-%m-%dT%H:%M"), tz)
         end_dt = timezone.make_aware(datetime.strptime(end_time_str, "%Y-%m-%dT%H:%M"), tz)
 
+        error = None
         if end_dt <= start_dt:
+            error = _("End time must be after start time.")
+        elif Reservation.max_duration() and end_dt - start_dt > Reservation.max_duration():
+            error = _("Reservations can last at most %(days)d days.") % {"days": settings.RESERVATION_MAX_DAYS}
+        elif Reservation.max_duration() and start_dt < now - Reservation.BOOKING_GRACE:
+            error = _("Start time can't be in the past.")
+        if error:
             html = render_to_string(
                 "partials/_reserve_modal.html",
                 {
                     "lot": lot_context,
                     "vehicles": vehicles,
-                    "error": _("End time must be after start time."),
+                    "error": error,
                     "default_start": start_time_str,
                     "default_end": end_time_str,
                     "vehicle_warning": vehicle_warning,
                     "max_reservations_reached": max_reservations_reached,
                     "max_reservations": max_reservations,
                     "active_reservations_count": active_reservations_count,
+                    "repeat": request.POST.get("repeat") == "weekly",
+                    "repeat_weekdays": _repeat_weekdays(),
+                    "repeat_days": request.POST.getlist("repeat_days"),
+                    "default_repeat_until": request.POST.get("repeat_until") or "",
                 },
                 request=request,
             )
@@ -674,6 +952,23 @@ def reserve_partial(request, parking_lot_id):
             return response
 
         vehicle = get_object_or_404(Vehicle, id=vehicle_id, student=student_profile)
+        if request.POST.get("repeat") == "weekly":
+            form_context = {
+                "lot": lot_context,
+                "vehicles": vehicles,
+                "default_start": start_time_str,
+                "default_end": end_time_str,
+                "vehicle_warning": vehicle_warning,
+                "max_reservations_reached": max_reservations_reached,
+                "max_reservations": max_reservations,
+                "active_reservations_count": active_reservations_count,
+                "repeat": True,
+                "repeat_weekdays": _repeat_weekdays(),
+                "repeat_days": request.POST.getlist("repeat_days"),
+                "default_repeat_until": request.POST.get("repeat_until") or "",
+            }
+            return _reserve_series(request, lot_obj, lot_context, student_profile, vehicle, start_dt, end_dt, form_context)
+
         duration_hours = (end_dt - start_dt).total_seconds() / 3600
         total_cost = Decimal(duration_hours) * lot_obj.hourly_rate
 
@@ -688,6 +983,7 @@ def reserve_partial(request, parking_lot_id):
         )
         reservation.generate_qr_code()
         reservation.save()
+        timeline.reservation_added(lot_obj.id, start_dt, end_dt)
         lot_obj.available_spots = max(lot_obj.available_spots - 1, 0)
         lot_obj.save()
 
@@ -735,6 +1031,9 @@ def reserve_partial(request, parking_lot_id):
         "max_reservations_reached": max_reservations_reached,
         "max_reservations": max_reservations,
         "active_reservations_count": active_reservations_count,
+        "repeat_weekdays": _repeat_weekdays(),
+        "repeat_days": [str(default_start.weekday())],
+        "default_repeat_until": (default_start + timedelta(weeks=14)).strftime("%Y-%m-%d"),
     }
     html = render_to_string("partials/_reserve_modal.html", context, request=request)
     return HttpResponse(html)
@@ -841,12 +1140,22 @@ def cancel_reservation(request, reservation_id):
         messages.error(request, _("Cancellation period has expired. You can no longer cancel this reservation."))
         return redirect("parking:dashboard")
 
+    was_cancelled = reservation.status == "cancelled"
     reservation.status = "cancelled"
     reservation.save()
+    if not was_cancelled:
+        timeline.reservation_removed(reservation.parking_lot_id, reservation.start_time, reservation.end_time)
 
     parking_lot = reservation.parking_lot
-    parking_lot.available_spots = min(parking_lot.available_spots + 1, parking_lot.total_spots)
-    parking_lot.save()
+    # A weekly series took one spot for all its occurrences, so only the last open one gives it back
+    series_still_open = reservation.series_id and Reservation.objects.filter(
+        series_id=reservation.series_id,
+        status__in=["confirmed", "pending", "active"],
+        end_time__gt=now,
+    ).exists()
+    if not was_cancelled and not series_still_open:
+        parking_lot.available_spots = min(parking_lot.available_spots + 1, parking_lot.total_spots)
+        parking_lot.save()
 
     payload = {
         "title": _("Reservation cancelled"),
@@ -875,3 +1184,159 @@ def check_in(request, reservation_id):
         reservation.save()
         messages.success(request, f"Checked in successfully for {reservation.parking_lot.name}!")
     return redirect('parking:dashboard')
+
+
+@login_required
+def reservation_qr_code(request, reservation_id):
+    """The reservation's gate QR, rendered the first time it's opened (series bookings skip it at booking time)"""
+    reservation = get_object_or_404(Reservation, id=reservation_id, student__user=request.user)
+    if not reservation.qr_code:
+        reservation.generate_qr_code()
+        reservation.save(update_fields=["qr_code"])
+    return FileResponse(reservation.qr_code.open("rb"), content_type="image/png")
+
+
+def gate_key_error(request):
+    """
+    The error response for a gate controller request without the right
+    X-Gate-Key, or None. Without a configured GATE_API_KEY every request is
+    refused, unless GATE_API_OPEN is set in development.
+    """
+    if not settings.GATE_API_KEY:
+        if settings.GATE_API_OPEN:
+            return None
+        return JsonResponse({"success": False, "error": "Gate API is not configured"}, status=503)
+    if not constant_time_compare(request.headers.get("X-Gate-Key", ""), settings.GATE_API_KEY):
+        return JsonResponse({"success": False, "error": "Invalid gate key"}, status=403)
+    return None
+
+
+@csrf_exempt
+@require_POST
+def verify_gate_pass(request):
+    """
+    Gate barrier check for the pass in a reservation QR code. POST ``pass``
+    and optionally the gate's ``lot``; the answer comes from the signature and
+    the window in the pass alone, without a session or a database read.
+    """
+    try:
+        lot_id = int(request.POST["lot"]) if request.POST.get("lot") else None
+        gate_pass = passes.verifier().verify(request.POST.get("pass", ""), lot_id)
+    except ValueError:
+        return JsonResponse({"valid": False, "error": "lot must be an integer"}, status=400)
+    except passes.InvalidPass as exc:
+        return JsonResponse({"valid": False, "error": str(exc)}, status=403)
+    return JsonResponse(
+        {
+            "valid": True,
+            "reservation": gate_pass.reservation_id,
+            "lot": gate_pass.lot_id,
+            "plate": gate_pass.plate,
+            "start": gate_pass.starts_at.isoformat(),
+            "end": gate_pass.ends_at.isoformat(),
+        }
+    )
+
+
+@csrf_exempt
+@require_POST
+def ingest_gate_scans(request):
+    """
+    Batch of pass scans from a gate controller: ``{"events": [{"id", "pass",
+    "lot", "scanned_at"}, ...]}``. Answers with one result per event, in
+    order. Event ids make retries safe; see parking.utils.checkins.
+    """
+    denied = gate_key_error(request)
+    if denied:
+        return denied
+    try:
+        raw_events = json.loads(request.body)["events"]
+        if not isinstance(raw_events, list):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"success": False, "error": 'Expected a JSON body {"events": [...]}'}, status=400)
+    if len(raw_events) > settings.GATE_SCAN_MAX_BATCH:
+        return JsonResponse(
+            {"success": False, "error": f"At most {settings.GATE_SCAN_MAX_BATCH} events per batch"}, status=413
+        )
+    try:
+        events = [checkins.parse_event(raw) for raw in raw_events]
+    except checkins.InvalidScan as exc:
+        return JsonResponse({"success": False, "error": str(exc)}, status=400)
+    return JsonResponse({"success": True, "results": checkins.ingest(events)})
+
+
+@require_GET
+def gate_plate_lookup(request):
+    """
+    Open reservations at ``?lot=`` for the plate a camera read as ``?plate=``,
+    tolerating up to GATE_PLATE_MAX_DISTANCE misread characters (or
+    ``?distance=``, capped at that). Answered from the in-memory plate index,
+    see parking.utils.plates.
+    """
+    denied = gate_key_error(request)
+    if denied:
+        return denied
+    try:
+        lot_id = int(request.GET["lot"])
+        plate = request.GET["plate"]
+        max_distance = min(int(request.GET.get("distance", settings.GATE_PLATE_MAX_DISTANCE)), settings.GATE_PLATE_MAX_DISTANCE)
+    except (KeyError, ValueError):
+        return JsonResponse({"success": False, "error": "Expected an integer lot and a plate"}, status=400)
+    return JsonResponse({"success": True, **plates.index.lookup(lot_id, plate, max(max_distance, 0))})
+
+
+def _exportable_lot_ids(user) -> list[int]:
+    lots = ParkingLot.objects.all() if user.is_staff else ParkingLot.objects.filter(owner=user)
+    return list(lots.values_list("id", flat=True))
+
+
+@login_required
+@require_GET
+def owner_export(request, kind):
+    """
+    Export of the caller's lots: ``reservations`` or daily ``revenue``.
+
+    ``?format=csv`` (default) or ``parquet``, ``?start=`` and ``?end=`` as
+    inclusive dates of start_time, ``?lots=1,2`` and ``?columns=a,b`` to
+    narrow it. Streams the file unless ``?background=1``, which writes it in
+    the background and answers with a URL to poll and download it from. See
+    parking.utils.exports.
+    """
+    lot_ids = _exportable_lot_ids(request.user)
+    if not lot_ids:
+        return JsonResponse({"success": False, "error": "Exports are for parking lot owners"}, status=403)
+    fmt = request.GET.get("format", "csv")
+    if fmt not in exports.FORMATS or (fmt == "parquet" and not exports.parquet_available()):
+        available = [name for name in exports.FORMATS if name == "csv" or exports.parquet_available()]
+        return JsonResponse({"success": False, "error": f"format should be one of {', '.join(available)}"}, status=400)
+    try:
+        spec = exports.ExportSpec.parse(kind, request.GET, lot_ids)
+    except exports.ExportError as exc:
+        return JsonResponse({"success": False, "error": str(exc)}, status=400)
+
+    if request.GET.get("background") in ("1", "true"):
+        name = exports.start_background(request.user.id, spec, fmt)
+        url = reverse("parking:owner_export_file", args=[name])
+        return JsonResponse({"success": True, "status": "running", "url": url}, status=202)
+
+    # ASGI would otherwise build the whole file in memory before sending it
+    content = exports.achunks(spec, fmt) if isinstance(request, ASGIRequest) else exports.chunks(spec, fmt)
+    response = StreamingHttpResponse(content, content_type=exports.FORMATS[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{spec.filename(fmt)}"'
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@login_required
+@require_GET
+def owner_export_file(request, name):
+    """A background export: the file once written, otherwise its status"""
+    status, path = exports.background_status(request.user.id, name)
+    if status == "ready":
+        return FileResponse(open(path, "rb"), as_attachment=True, filename=name.split("-", 1)[1])
+    if status == "running":
+        return JsonResponse({"success": True, "status": status}, status=202)
+    if status == "failed":
+        return JsonResponse({"success": False, "status": status, "error": path.read_text()}, status=500)
+    return JsonResponse({"success": False, "status": status, "error": "No such export"}, status=404)
@@ -1,9 +1,15 @@
 from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import httpx
 import os
+import sys
+
+# Shared modules live in services/common locally and are copied next to main.py in the image
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+
+from tokens import InvalidToken, USER_CLAIMS, has_user_claims, verifier
 
 app = FastAPI(title="API Gateway", version="1.0")
 
@@ -56,11 +62,18 @@ async def verify_email(request: Request):
 
 @app.get("/api/auth/me")
 async def get_current_user(request: Request):
-    """Proxy to auth service"""
+    """Answered from the token claims; proxies to auth service for legacy tokens"""
     token = request.headers.get("Authorization")
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
+    try:
+        claims = verifier.verify_header(token)
+    except InvalidToken:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    if has_user_claims(claims):
+        return {name: claims[name] for name in USER_CLAIMS}
+    
     async with httpx.AsyncClient() as client:
         response = await client.get(
             f"{AUTH_SERVICE}/me",
@@ -70,11 +83,17 @@ async def get_current_user(request: Request):
 
 # Parking proxy routes
 @app.get("/api/parking/lots")
-async def get_lots():
-    """Proxy to parking service"""
+async def get_lots(request: Request):
+    """Proxy to parking service, passing pagination and ETag headers through"""
+    headers = {}
+    if "if-none-match" in request.headers:
+        headers["If-None-Match"] = request.headers["if-none-match"]
     async with httpx.AsyncClient() as client:
-        response = await client.get(f"{PARKING_SERVICE}/lots")
-        return response.json()
+        response = await client.get(f"{PARKING_SERVICE}/lots", params=request.query_params, headers=headers)
+    passthrough = {name: response.headers[name] for name in ("etag", "x-next-cursor") if name in response.headers}
+    if response.status_code == 304:
+        return Response(status_code=304, headers=passthrough)
+    return JSONResponse(response.json(), status_code=response.status_code, headers=passthrough)
 
 @app.get("/api/parking/lots/{lot_id}")
 async def get_lot(lot_id: int):
@@ -115,6 +134,14 @@ async def create_reservation(request: Request):
         response = await client.post(f"{RESERVATIONS_SERVICE}/reservations", json=body)
         return response.json()
 
+@app.post("/api/reservations/bulk")
+async def create_reservation_series(request: Request):
+    """Proxy to reservations service"""
+    async with httpx.AsyncClient() as client:
+        body = await request.json()
+        response = await client.post(f"{RESERVATIONS_SERVICE}/reservations/bulk", json=body)
+        return JSONResponse(response.json(), status_code=response.status_code)
+
 @app.get("/api/reservations/student/{student_id}")
 async def get_student_reservations(student_id: int):
     """Proxy to reservations service"""
@@ -129,11 +156,30 @@ async def get_reservation(reservation_id: int):
         response = await client.get(f"{RESERVATIONS_SERVICE}/reservations/{reservation_id}")
         return response.json()
 
+@app.get("/api/reservations/{reservation_id}/qr.png")
+async def get_reservation_qr(reservation_id: int, request: Request):
+    """Proxy to reservations service"""
+    headers = {}
+    if "if-none-match" in request.headers:
+        headers["If-None-Match"] = request.headers["if-none-match"]
+    async with httpx.AsyncClient() as client:
+        response = await client.get(f"{RESERVATIONS_SERVICE}/reservations/{reservation_id}/qr.png", headers=headers)
+    passthrough = {name: response.headers[name] for name in ("etag", "cache-control") if name in response.headers}
+    return Response(
+        content=response.content,
+        status_code=response.status_code,
+        media_type=response.headers.get("content-type"),
+        headers=passthrough,
+    )
+
 @app.post("/api/reservations/{reservation_id}/checkin")
-async def check_in(reservation_id: int):
+async def check_in(reservation_id: int, request: Request):
     """Proxy to reservations service"""
     async with httpx.AsyncClient() as client:
-        response = await client.post(f"{RESERVATIONS_SERVICE}/reservations/{reservation_id}/checkin")
+        response = await client.post(
+            f"{RESERVATIONS_SERVICE}/reservations/{reservation_id}/checkin",
+            params=request.query_params,
+        )
         return response.json()
 
 @app.post("/api/reservations/{reservation_id}/cancel")
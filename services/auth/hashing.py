@@ -0,0 +1,110 @@
+"""
+Password hashing offloaded to a bounded process pool.
+
+bcrypt is CPU-bound, so running it on the request threads lets a login burst
+starve every other endpoint. Hashes are computed in worker processes instead,
+and the number of in-flight jobs is capped: once the queue is full new jobs are
+rejected straight away rather than parking more request threads behind it.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from passlib.context import CryptContext
+import asyncio
+import os
+import threading
+
+# bcrypt work factor. Pinning min/max to the same value makes any change to it
+# flag existing hashes for a rehash on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 2)))
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", str(HASH_WORKERS * 4)))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+class HashPoolBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+# These run inside the worker processes
+def _hash(password):
+    return pwd_context.hash(password)
+
+
+def _hash_many(passwords):
+    return [pwd_context.hash(password) for password in passwords]
+
+
+def _verify_and_update(password, hashed_password):
+    return pwd_context.verify_and_update(password, hashed_password)
+
+
+class HashPool:
+    """Bounded process pool for bcrypt hashing and verification."""
+
+    def __init__(self, workers=HASH_WORKERS, queue_limit=HASH_QUEUE_LIMIT):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(queue_limit)
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, fn, *args, wait=False):
+        if not self._slots.acquire(blocking=wait):
+            raise HashPoolBusy()
+        try:
+            self.start()
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _f: self._slots.release())
+        return future
+
+    async def hash(self, password):
+        """Hash a password with the configured work factor."""
+        return await asyncio.wrap_future(self.submit(_hash, password))
+
+    async def hash_many(self, passwords):
+        """
+        Hash a batch of passwords across all workers.
+
+        The batch is split into one job per worker, so it never holds more than
+        ``workers`` queue slots and interactive logins keep getting through.
+        Waits for free slots instead of raising ``HashPoolBusy``.
+        """
+        passwords = list(passwords)
+        if not passwords:
+            return []
+        size = -(-len(passwords) // self.workers)
+        futures = [
+            # Waiting for a slot blocks, so do it off the event loop
+            asyncio.wrap_future(await asyncio.to_thread(self.submit, _hash_many, passwords[i:i + size], wait=True))
+            for i in range(0, len(passwords), size)
+        ]
+        return [hashed for chunk in await asyncio.gather(*futures) for hashed in chunk]
+
+    async def verify_and_update(self, password, hashed_password):
+        """
+        Verify a password against its hash.
+
+        Returns ``(valid, new_hash)``; ``new_hash`` is set when the stored hash
+        was made with different parameters and should be replaced.
+        """
+        return await asyncio.wrap_future(self.submit(_verify_and_update, password, hashed_password))
+
+
+hash_pool = HashPool()
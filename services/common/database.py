@@ -0,0 +1,62 @@
+"""
+Async SQLAlchemy engine setup shared by the FastAPI services.
+
+DATABASE_URL keeps its plain form (``postgresql://`` or ``sqlite://``); the
+async driver is picked here: asyncpg for Postgres and aiosqlite for local
+SQLite runs. Pool sizing and timeouts come from the environment:
+
+    DB_POOL_SIZE            connections kept open per process (default 10)
+    DB_MAX_OVERFLOW         extra connections allowed under burst (default 5)
+    DB_POOL_TIMEOUT         seconds to wait for a free connection (default 5)
+    DB_POOL_RECYCLE         seconds before a connection is replaced (default 1800)
+    DB_STATEMENT_TIMEOUT_MS server-side statement timeout (default 5000)
+"""
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import os
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url: str):
+    """Swap the sync driver in a database URL for its async counterpart"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS and url.drivername != ASYNC_DRIVERS[backend]:
+        url = url.set(drivername=ASYNC_DRIVERS[backend])
+    return url
+
+
+def create_engine_from_env(database_url: str):
+    url = async_database_url(database_url)
+    statement_timeout_ms = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+
+    if url.get_backend_name() == "sqlite":
+        # No server-side timeout; the busy timeout is the closest equivalent
+        return create_async_engine(
+            url,
+            pool_pre_ping=True,
+            connect_args={"timeout": statement_timeout_ms / 1000},
+        )
+
+    return create_async_engine(
+        url,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "5")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        pool_pre_ping=True,
+        connect_args={
+            "server_settings": {"statement_timeout": str(statement_timeout_ms)},
+            # Client-side guard in case the server never answers
+            "command_timeout": statement_timeout_ms / 1000 + 1,
+        },
+    )
+
+
+def make_sessionmaker(engine):
+    # expire_on_commit=False so committed rows can be serialised without a reload
+    return async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
@@ -0,0 +1,25 @@
+"""
+License plate formatting shared by the Django app (parking/utils/plates.py)
+and the parking service, so both accept and store the same plates.
+
+normalize_plate gives the stored form, "B 123456". plate_key gives the
+lookup form, uppercase letters and digits only, so "b 123456", "B123456"
+and "B-123 456" are the same plate.
+"""
+import re
+from typing import Optional
+
+# Lebanese plates: one letter and 2-8 digits, written "B 123456"
+PLATE_PATTERN = re.compile(r"([A-Z])(\d{2,8})")
+WHITESPACE = re.compile(r"\s+")
+NON_ALPHANUMERIC = re.compile(r"[^0-9A-Z]")
+
+
+def normalize_plate(plate: str) -> Optional[str]:
+    """``" b 12 3456"`` -> ``"B 123456"``; None if it isn't a valid plate"""
+    match = PLATE_PATTERN.fullmatch(WHITESPACE.sub("", (plate or "").upper()))
+    return f"{match.group(1)} {match.group(2)}" if match else None
+
+
+def plate_key(plate: str) -> str:
+    return NON_ALPHANUMERIC.sub("", (plate or "").upper())
@@ -0,0 +1,195 @@
+"""
+Monthly range partitions of a table on Postgres, shared by the Django app
+(parking/utils/partitions.py) and the reservations service
+(services/reservations/partitions.py).
+
+Every function takes ``run(sql, params=None)``, which executes one statement
+with ``%(name)s`` binds and returns its rows (empty for statements without
+any), so the same DDL runs through a Django cursor and a SQLAlchemy
+connection. Each side wraps its own cursor or connection; see ``runner`` in
+the two modules above.
+
+A partitioned table gets one partition per month, named
+``<table>_pYYYY_MM``, and ``<table>_default`` for anything outside them.
+
+Postgres needs the partition column in the primary key, so (id, start_time)
+alone would let two rows share an id. The id column is therefore made a
+GENERATED ALWAYS identity: ids only ever come from its sequence and an
+INSERT that names one is rejected. unpartition_table turns it back into a
+plain table with a primary key on id.
+"""
+from datetime import date
+import re
+
+MONTH_SUFFIX = re.compile(r"_p(\d{4})_(\d{2})$")
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def quote(name: str) -> str:
+    return '"%s"' % name.replace('"', '""')
+
+
+def _bound(month: date) -> str:
+    # UTC month boundaries; the offset is ignored by timestamp columns without a time zone
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def is_partitioned(run, table: str) -> bool:
+    (partitioned,), = run("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%(table)s))",
+                          {"table": table})
+    return partitioned
+
+
+def partitions(run, table: str) -> dict:
+    """The table's monthly partitions by first day of the month"""
+    names = run(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(%(table)s)",
+        {"table": table},
+    )
+    months = {}
+    for name, in names:
+        match = MONTH_SUFFIX.search(name)
+        if match:
+            months[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return months
+
+
+def create_partitions(run, table: str, column: str, first: date, last: date) -> list:
+    """Partitions for every month from ``first`` through ``last`` that doesn't have one yet"""
+    existing = partitions(run, table)
+    default = f"{table}_default"
+    created = []
+    month = first.replace(day=1)
+    while month <= last:
+        if month not in existing:
+            name = f"{table}_p{month:%Y_%m}"
+            lower, upper = _bound(month), _bound(add_months(month, 1))
+            in_month = f"{quote(column)} >= {lower} AND {quote(column)} < {upper}"
+            (occupied,), = run(f"SELECT EXISTS (SELECT 1 FROM {quote(default)} WHERE {in_month})")
+            if occupied:
+                # Rows that landed in the default partition move into the new month first
+                run(f"CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+                run(f"WITH moved AS (DELETE FROM {quote(default)} WHERE {in_month} RETURNING *) "
+                    f"INSERT INTO {quote(name)} SELECT * FROM moved")
+                run(f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} FOR VALUES FROM ({lower}) TO ({upper})")
+            else:
+                run(f"CREATE TABLE {quote(name)} PARTITION OF {quote(table)} FOR VALUES FROM ({lower}) TO ({upper})")
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def detach_partitions(run, table: str, before: date) -> list:
+    """Detach the monthly partitions that end on or before ``before``"""
+    detached = []
+    for month, name in sorted(partitions(run, table).items()):
+        if add_months(month, 1) <= before:
+            run(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+            detached.append(name)
+    return detached
+
+
+def _primary_key(run, table: str, column: str):
+    """(name, is identity, sequence) of the primary key column other than ``column``"""
+    (pk, identity, sequence), = run(
+        "SELECT a.attname, a.attidentity <> '', pg_get_serial_sequence(%(table)s, a.attname) FROM pg_index i "
+        "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+        "WHERE i.indrelid = to_regclass(%(table)s) AND i.indisprimary AND a.attname <> %(column)s",
+        {"table": table, "column": column},
+    )
+    return pk, identity, sequence
+
+
+def _indexes(run, table: str):
+    """(name, definition) of the table's indexes other than its primary key"""
+    return run(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %(table)s "
+        "AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%(table)s) AND contype = 'p')",
+        {"table": table},
+    )
+
+
+def _foreign_keys(run, table: str):
+    return run(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%(table)s) AND contype = 'f'",
+        {"table": table},
+    )
+
+
+def _restore(run, table: str, pk: str, key: str, indexes, foreign_keys):
+    """Name the identity sequence after ``table`` and add the primary key, indexes and foreign keys"""
+    (sequence,), = run("SELECT pg_get_serial_sequence(%(table)s, %(pk)s)", {"table": table, "pk": pk})
+    if sequence:
+        run(f"ALTER SEQUENCE {sequence} RENAME TO {quote(f'{table}_{pk}_seq')}")
+    run(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(table + '_pkey')} PRIMARY KEY ({key})")
+    # The old table's index and constraint names are free again. Indexes built on the parent are built on
+    # every partition, after the copy rather than during it
+    for _name, definition in indexes:
+        run(definition.replace(" ON ONLY ", " ON ", 1))
+    for name, definition in foreign_keys:
+        run(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
+    run(f"ANALYZE {quote(table)}")
+
+
+def partition_table(run, table: str, column: str, months_ahead: int, today: date):
+    """Rebuild ``table`` as a table partitioned by month of ``column``, keeping its rows, indexes and foreign keys"""
+    old = f"{table}_unpartitioned"
+    pk, identity, sequence = _primary_key(run, table, column)
+    indexes = _indexes(run, table)
+    unique = [name for name, definition in indexes if definition.startswith("CREATE UNIQUE") and column not in definition]
+    if unique:
+        raise ValueError(f"Unique indexes without {column} can't be kept on a partitioned table: {', '.join(unique)}")
+    foreign_keys = _foreign_keys(run, table)
+    (first, last), = run(f"SELECT min({quote(column)}), max({quote(column)}) FROM {quote(table)}")
+
+    run(f"ALTER TABLE {quote(table)} RENAME TO {quote(old)}")
+    run(f"CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING IDENTITY "
+        f"INCLUDING CONSTRAINTS INCLUDING STORAGE) PARTITION BY RANGE ({quote(column)})")
+    run(f"CREATE TABLE {quote(table + '_default')} PARTITION OF {quote(table)} DEFAULT")
+    first = min(first.date(), today) if first else today
+    last = max(last.date(), add_months(today, months_ahead)) if last else add_months(today, months_ahead)
+    create_partitions(run, table, column, first, last)
+    run(f"INSERT INTO {quote(table)} SELECT * FROM {quote(old)}")
+
+    # Sequence-only ids keep them unique now that the primary key includes the partition column
+    (next_id,), = run(f"SELECT coalesce(max({quote(pk)}), 0) + 1 FROM {quote(table)}")
+    if identity:
+        # LIKE gave the new table its own identity sequence; carry on from the old one
+        run("SELECT setval(pg_get_serial_sequence(%(table)s, %(pk)s), %(next)s, false)",
+            {"table": table, "pk": pk, "next": next_id})
+        run(f"ALTER TABLE {quote(table)} ALTER COLUMN {quote(pk)} SET GENERATED ALWAYS")
+    elif sequence:
+        # The serial column's sequence goes with the old table
+        run(f"ALTER TABLE {quote(table)} ALTER COLUMN {quote(pk)} DROP DEFAULT")
+        run(f"ALTER TABLE {quote(table)} ALTER COLUMN {quote(pk)} ADD GENERATED ALWAYS AS IDENTITY (START WITH {int(next_id)})")
+    run(f"DROP TABLE {quote(old)}")
+    _restore(run, table, pk, f"{quote(pk)}, {quote(column)}", indexes, foreign_keys)
+
+
+def unpartition_table(run, table: str, column: str):
+    """
+    Rebuild the partitioned ``table`` as a plain one with its rows, indexes
+    and foreign keys and a primary key on id again. Detached partitions are
+    left as they are.
+    """
+    old = f"{table}_partitioned"
+    pk, identity, _sequence = _primary_key(run, table, column)
+    indexes = _indexes(run, table)
+    foreign_keys = _foreign_keys(run, table)
+
+    run(f"ALTER TABLE {quote(table)} RENAME TO {quote(old)}")
+    run(f"CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING IDENTITY "
+        f"INCLUDING CONSTRAINTS INCLUDING STORAGE)")
+    run(f"INSERT INTO {quote(table)} OVERRIDING SYSTEM VALUE SELECT * FROM {quote(old)}")
+    if identity:
+        (next_id,), = run(f"SELECT coalesce(max({quote(pk)}), 0) + 1 FROM {quote(table)}")
+        run("SELECT setval(pg_get_serial_sequence(%(table)s, %(pk)s), %(next)s, false)",
+            {"table": table, "pk": pk, "next": next_id})
+        run(f"ALTER TABLE {quote(table)} ALTER COLUMN {quote(pk)} SET GENERATED BY DEFAULT")
+    # Drops the partitions with it
+    run(f"DROP TABLE {quote(old)}")
+    _restore(run, table, pk, quote(pk), indexes, foreign_keys)
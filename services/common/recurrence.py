@@ -0,0 +1,57 @@
+"""
+Weekly recurrence rules for series bookings, shared by the Django reserve
+flow (parking/utils/recurrence.py) and the reservations service so both
+expand the same rule into the same occurrences.
+
+A rule repeats the first reservation window on the given weekdays every
+``interval_weeks`` weeks up to and including ``until``. Occurrences keep the
+first window's time of day and duration.
+"""
+from datetime import date, datetime, timedelta
+from typing import Iterable
+
+# Upper bound on occurrences per series, a semester of daily bookings with room to spare
+MAX_OCCURRENCES = 120
+
+
+class RecurrenceError(ValueError):
+    """Raised when a rule cannot be expanded into a valid series."""
+
+
+def weekly_occurrences(start: datetime, end: datetime, weekdays: Iterable[int], until: date,
+                       interval_weeks: int = 1, limit: int = MAX_OCCURRENCES):
+    """
+    Expand a weekly rule into sorted (start, end) pairs.
+
+    ``weekdays`` uses Monday=0. The first occurrence is never earlier than
+    ``start``; days in the first week that fall before it are skipped. Pass
+    wall-clock (naive local) datetimes so every occurrence keeps the same
+    local time across DST changes.
+    """
+    days = sorted(set(weekdays))
+    if end <= start:
+        raise RecurrenceError("End time must be after start time")
+    if not days or any(day not in range(7) for day in days):
+        raise RecurrenceError("Weekdays must be between 0 (Monday) and 6 (Sunday)")
+    if interval_weeks < 1:
+        raise RecurrenceError("Interval must be at least one week")
+    if until < start.date():
+        raise RecurrenceError("Repeat-until date is before the first reservation")
+
+    duration = end - start
+    gaps = [b - a for a, b in zip(days, days[1:] + [days[0] + 7])]
+    if duration > timedelta(days=7 * interval_weeks) or (len(days) > 1 and duration > timedelta(days=min(gaps))):
+        raise RecurrenceError("Occurrences of this series would overlap each other")
+
+    occurrences = []
+    week_start = start - timedelta(days=start.weekday())
+    while week_start.date() <= until:
+        for day in days:
+            occurrence = week_start + timedelta(days=day)
+            if occurrence < start or occurrence.date() > until:
+                continue
+            if len(occurrences) == limit:
+                raise RecurrenceError(f"A series can have at most {limit} occurrences")
+            occurrences.append((occurrence, occurrence + duration))
+        week_start += timedelta(weeks=interval_weeks)
+    return occurrences
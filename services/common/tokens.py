@@ -0,0 +1,146 @@
+"""
+Local JWT verification shared by the gateway and the services.
+
+The auth service signs access tokens that carry the user claims most handlers
+need (id, username, email, names, active flag), so any component holding the
+shared secret can authenticate a request without calling the auth service or
+touching its database. For the few callers that still need a fresh user row,
+UserCache keeps a small TTL/LRU store of user records.
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from jose import JWTError, jwt
+import os
+import threading
+import time
+
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+# Claims copied from the user record into the token
+USER_CLAIMS = ("id", "username", "email", "first_name", "last_name", "is_active")
+
+
+class InvalidToken(Exception):
+    """Raised when a token is malformed, expired or badly signed."""
+
+
+def user_claims(user) -> dict:
+    """Extract the token claims from a user object or dict"""
+    get = user.get if isinstance(user, dict) else lambda name: getattr(user, name)
+    return {name: get(name) for name in USER_CLAIMS}
+
+
+def create_access_token(data: dict, expires_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES, secret: str = SECRET_KEY) -> str:
+    to_encode = data.copy()
+    expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
+    to_encode.update({"exp": expire})
+    return jwt.encode(to_encode, secret, algorithm=ALGORITHM)
+
+
+def has_user_claims(claims: dict) -> bool:
+    """Tokens issued before claims were embedded only carry ``sub``"""
+    return all(name in claims for name in USER_CLAIMS)
+
+
+class TokenVerifier:
+    """
+    Verifies access tokens locally.
+
+    Decoded claims are memoised per token string until the token expires, so a
+    client reusing the same token pays for signature verification once.
+    """
+
+    def __init__(self, secret: str = SECRET_KEY, algorithm: str = ALGORITHM, max_entries: int = 4096):
+        self.secret = secret
+        self.algorithm = algorithm
+        self._cache = LRUCache(max_entries)
+
+    def verify(self, token: str) -> dict:
+        now = time.time()
+        cached = self._cache.get(token)
+        if cached is not None and cached["exp"] > now:
+            return cached
+        try:
+            claims = jwt.decode(token, self.secret, algorithms=[self.algorithm])
+        except JWTError as exc:
+            raise InvalidToken(str(exc)) from exc
+        if not claims.get("sub") or "exp" not in claims:
+            raise InvalidToken("Token is missing required claims")
+        self._cache.set(token, claims)
+        return claims
+
+    def verify_header(self, authorization: str) -> dict:
+        """Verify an ``Authorization: Bearer <token>`` header value"""
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            raise InvalidToken("Missing bearer token")
+        return self.verify(token.strip())
+
+
+class LRUCache:
+    """Thread-safe LRU map with an optional per-entry TTL."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class UserCache(LRUCache):
+    """
+    Short-lived cache of user records keyed by username.
+
+    Values are plain dicts (see ``user_claims``), never ORM instances, so they
+    can be shared safely across sessions and threads.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0):
+        super().__init__(max_entries=max_entries, ttl=ttl)
+
+    async def get_or_load(self, username: str, loader):
+        """``loader`` is an async callable returning the user record or None"""
+        user = self.get(username)
+        if user is None:
+            record = await loader(username)
+            if record is None:
+                return None
+            user = user_claims(record)
+            self.set(username, user)
+        return user
+
+
+verifier = TokenVerifier()
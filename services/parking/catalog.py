@@ -0,0 +1,154 @@
+"""
+In-memory snapshot of the active lot catalog.
+
+The catalog is small and changes rarely compared with how often it is read,
+so each process keeps every active lot as a compact slotted record and serves
+lot reads from memory. A background task polls the catalog_version row and
+rebuilds the snapshot when it moves. ``available_spots`` changes far more
+often than the rest of a lot, so it is not part of the snapshot: it lives in
+AvailabilityCounters and is overlaid when a lot is serialised.
+"""
+from bisect import bisect_right
+from math import asin, cos, radians, sin, sqrt
+from sqlalchemy import select
+import asyncio
+import logging
+import zlib
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371
+
+
+class LotRecord:
+    __slots__ = (
+        "id", "name", "owner_id", "address", "latitude", "longitude",
+        "hourly_rate", "daily_rate", "monthly_rate", "total_spots",
+        "opening_time", "closing_time", "features", "is_active",
+        "lat_rad", "lng_rad", "cos_lat",
+    )
+
+    def __init__(self, lot):
+        self.id = lot.id
+        self.name = lot.name
+        self.owner_id = lot.owner_id
+        self.address = lot.address
+        self.latitude = float(lot.latitude)
+        self.longitude = float(lot.longitude)
+        self.hourly_rate = float(lot.hourly_rate)
+        self.daily_rate = float(lot.daily_rate)
+        self.monthly_rate = float(lot.monthly_rate)
+        self.total_spots = lot.total_spots
+        self.opening_time = lot.opening_time.strftime("%H:%M")
+        self.closing_time = lot.closing_time.strftime("%H:%M")
+        self.features = lot.features
+        self.is_active = lot.is_active
+        # Precomputed for the haversine in nearby searches
+        self.lat_rad = radians(self.latitude)
+        self.lng_rad = radians(self.longitude)
+        self.cos_lat = cos(self.lat_rad)
+
+    def as_response(self, available_spots):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "address": self.address,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "hourly_rate": self.hourly_rate,
+            "daily_rate": self.daily_rate,
+            "monthly_rate": self.monthly_rate,
+            "total_spots": self.total_spots,
+            "available_spots": available_spots,
+            "opening_time": self.opening_time,
+            "closing_time": self.closing_time,
+            "features": self.features,
+            "is_active": self.is_active,
+        }
+
+    def distance_km(self, lat_rad, lng_rad, cos_lat):
+        dlat = self.lat_rad - lat_rad
+        dlng = self.lng_rad - lng_rad
+        a = sin(dlat / 2) ** 2 + cos_lat * self.cos_lat * sin(dlng / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+class AvailabilityCounters:
+    """Latest available_spots per lot, updated independently of the catalog."""
+
+    def __init__(self):
+        self._spots = {}
+
+    def get(self, lot_id, default=0):
+        return self._spots.get(lot_id, default)
+
+    def set(self, lot_id, spots):
+        self._spots[lot_id] = spots
+
+    def replace(self, spots):
+        self._spots = dict(spots)
+
+
+class LotCatalog:
+    def __init__(self, lot_model, version_model):
+        self.lot_model = lot_model
+        self.version_model = version_model
+        self.version = None
+        self.counters = AvailabilityCounters()
+        self._lots = {}
+        self._ids = []
+
+    @property
+    def ready(self):
+        return self.version is not None
+
+    async def refresh(self, db, force=False):
+        """Rebuild the snapshot if the catalog version moved; always resync the counters"""
+        version = await db.scalar(select(self.version_model.version).where(self.version_model.id == 1)) or 0
+        if force or version != self.version:
+            lots = (await db.scalars(
+                select(self.lot_model).where(self.lot_model.is_active == True).order_by(self.lot_model.id)
+            )).all()
+            records = {lot.id: LotRecord(lot) for lot in lots}
+            # Swap in one step so readers never see a half-built snapshot
+            self._lots, self._ids, self.version = records, list(records), version
+            logger.info("Lot catalog rebuilt at version %s (%s lots)", version, len(records))
+        rows = await db.execute(
+            select(self.lot_model.id, self.lot_model.available_spots).where(self.lot_model.is_active == True)
+        )
+        self.counters.replace(rows.all())
+
+    async def poll(self, sessionmaker, interval):
+        while True:
+            try:
+                async with sessionmaker() as db:
+                    await self.refresh(db)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Lot catalog refresh failed")
+            await asyncio.sleep(interval)
+
+    def get(self, lot_id):
+        record = self._lots.get(lot_id)
+        return record and record.as_response(self.counters.get(lot_id))
+
+    def page(self, after_id, limit):
+        """Active lots with id > after_id, in id order"""
+        lots, ids = self._lots, self._ids
+        start = bisect_right(ids, after_id)
+        return [lots[lot_id].as_response(self.counters.get(lot_id)) for lot_id in ids[start:start + limit]]
+
+    def nearby(self, latitude, longitude, radius_km):
+        lat_rad, lng_rad = radians(latitude), radians(longitude)
+        cos_lat = cos(lat_rad)
+        return [
+            record.as_response(self.counters.get(record.id))
+            for record in self._lots.values()
+            if record.distance_km(lat_rad, lng_rad, cos_lat) <= radius_km
+        ]
+
+    def page_etag(self, page, after_id, limit):
+        """Changes with the catalog version and with the availability of the lots on the page"""
+        spots = zlib.crc32(",".join(f"{lot['id']}:{lot['available_spots']}" for lot in page).encode())
+        return f'W/"lots-{self.version}-{after_id}-{limit}-{spots:08x}"'
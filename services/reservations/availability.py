@@ -0,0 +1,193 @@
+"""
+Per-lot occupancy index used to enforce lot capacity.
+
+Every open reservation (pending, confirmed or active, not yet ended) is kept
+in a per-lot segment tree over fixed time slots, so "how many reservations
+overlap [start, end) at the busiest moment" costs O(log n) instead of an
+overlap query per booking. Reservation windows are widened to whole slots
+(start rounded down, end rounded up), which can only over-count.
+
+The index is a cache of the reservations table. The booking path catches up
+on rows other replicas inserted for the lot before it checks capacity, and a
+periodic rebuild drops cancelled and finished reservations. The rebuild reads
+the high-water ids before the rows, so a booking that commits in between is
+above them and the catch-up after the swap adds it.
+"""
+from datetime import datetime
+import asyncio
+import time
+
+EPOCH = datetime(1970, 1, 1)
+
+# 2**24 five-minute slots reach well past 2100
+SLOT_BITS = 24
+
+
+class OccupancyTree:
+    """
+    Range add / range max over slot indexes, with nodes created on demand.
+
+    Adds are kept on the node that covers the range (no push-down), so a
+    node's peak is its own add plus the larger peak of its children.
+    """
+
+    __slots__ = ("size", "peak", "add", "left", "right")
+
+    def __init__(self, bits: int = SLOT_BITS):
+        self.size = 1 << bits
+        # Node 0 is the root; child index 0 means the child was never created
+        self.peak = [0]
+        self.add = [0]
+        self.left = [0]
+        self.right = [0]
+
+    def _child(self, node, right):
+        children = self.right if right else self.left
+        child = children[node]
+        if not child:
+            child = len(self.peak)
+            self.peak.append(0)
+            self.add.append(0)
+            self.left.append(0)
+            self.right.append(0)
+            children[node] = child
+        return child
+
+    def update(self, start: int, end: int, delta: int):
+        """Add ``delta`` to every slot in [start, end)"""
+        self._update(0, 0, self.size, start, end, delta)
+
+    def _update(self, node, lo, hi, start, end, delta):
+        if start <= lo and hi <= end:
+            self.add[node] += delta
+            self.peak[node] += delta
+            return
+        mid = (lo + hi) // 2
+        if start < mid:
+            self._update(self._child(node, False), lo, mid, start, end, delta)
+        if end > mid:
+            self._update(self._child(node, True), mid, hi, start, end, delta)
+        left, right = self.left[node], self.right[node]
+        self.peak[node] = self.add[node] + max(
+            self.peak[left] if left else 0,
+            self.peak[right] if right else 0,
+        )
+
+    def max(self, start: int, end: int) -> int:
+        """Highest slot value in [start, end)"""
+        return self._max(0, 0, self.size, start, end)
+
+    def _max(self, node, lo, hi, start, end):
+        if start <= lo and hi <= end:
+            return self.peak[node]
+        mid = (lo + hi) // 2
+        left, right = self.left[node], self.right[node]
+        best = None
+        if start < mid:
+            best = self._max(left, lo, mid, start, end) if left else 0
+        if end > mid:
+            right_best = self._max(right, mid, hi, start, end) if right else 0
+            best = right_best if best is None else max(best, right_best)
+        return self.add[node] + best
+
+
+class LotAvailability:
+    def __init__(self, slot_minutes: int = 5):
+        self.slot_seconds = slot_minutes * 60
+        # Bumped on every rebuild so in-flight catch-ups can tell their snapshot was replaced
+        self.generation = 0
+        self._trees = {}
+        self._intervals = {}
+        self._high_water = {}
+        self._locks = {}
+
+    def slots(self, start: datetime, end: datetime):
+        start_seconds = (start - EPOCH).total_seconds()
+        end_seconds = (end - EPOCH).total_seconds()
+        return int(start_seconds // self.slot_seconds), -int(-end_seconds // self.slot_seconds)
+
+    def lock(self, lot_id: int) -> asyncio.Lock:
+        """Serialises check-and-insert for a lot within this process"""
+        lock = self._locks.get(lot_id)
+        if lock is None:
+            lock = self._locks[lot_id] = asyncio.Lock()
+        return lock
+
+    def lots(self) -> set:
+        """Lots the index holds reservations or a high-water id for"""
+        return self._trees.keys() | self._high_water.keys()
+
+    def high_water(self, lot_id: int) -> int:
+        """Highest reservation id seen for the lot"""
+        return self._high_water.get(lot_id, 0)
+
+    def seen(self, lot_id: int, reservation_id: int):
+        if reservation_id > self._high_water.get(lot_id, 0):
+            self._high_water[lot_id] = reservation_id
+
+    def add(self, reservation_id: int, lot_id: int, start: datetime, end: datetime):
+        self.seen(lot_id, reservation_id)
+        if reservation_id in self._intervals:
+            return
+        first, last = self.slots(start, end)
+        tree = self._trees.get(lot_id)
+        if tree is None:
+            tree = self._trees[lot_id] = OccupancyTree()
+        tree.update(first, last, 1)
+        self._intervals[reservation_id] = (lot_id, first, last)
+
+    def remove(self, reservation_id: int):
+        interval = self._intervals.pop(reservation_id, None)
+        if interval is not None:
+            lot_id, first, last = interval
+            self._trees[lot_id].update(first, last, -1)
+
+    def peak(self, lot_id: int, start: datetime, end: datetime) -> int:
+        """Most reservations overlapping at any moment of [start, end)"""
+        tree = self._trees.get(lot_id)
+        if tree is None:
+            return 0
+        return tree.max(*self.slots(start, end))
+
+    def fits(self, lot_id: int, start: datetime, end: datetime, capacity: int) -> bool:
+        return self.peak(lot_id, start, end) < capacity
+
+    def load(self, rows, high_water):
+        """
+        Replace the index with ``rows`` of (id, lot_id, start, end) and per-lot
+        high-water ids. Call with the lock of every lot in either index held,
+        so no booking checks or adds against the index being replaced.
+        """
+        fresh = LotAvailability(self.slot_seconds // 60)
+        for row in rows:
+            fresh.add(*row)
+        for lot_id, reservation_id in high_water:
+            fresh.seen(lot_id, reservation_id)
+        self._trees, self._intervals, self._high_water = fresh._trees, fresh._intervals, fresh._high_water
+        self.generation += 1
+
+
+class LotCapacities:
+    """total_spots per lot, fetched from the parking service and cached for ``ttl`` seconds"""
+
+    def __init__(self, parking_service_url: str, ttl: float = 300):
+        self.parking_service_url = parking_service_url
+        self.ttl = ttl
+        self.client = None
+        self._capacities = {}
+
+    def set(self, lot_id: int, capacity: int):
+        self._capacities[lot_id] = (capacity, time.monotonic() + self.ttl)
+
+    async def get(self, lot_id: int):
+        """The lot's capacity, or None if the parking service does not know the lot"""
+        cached = self._capacities.get(lot_id)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        response = await self.client.get(f"{self.parking_service_url}/lots/{lot_id}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        capacity = response.json()["total_spots"]
+        self.set(lot_id, capacity)
+        return capacity
@@ -0,0 +1,96 @@
+"""
+Relay for the transactional outbox.
+
+Handlers that change bookings write an outbox row in the same transaction as
+the booking itself, so an event exists if and only if the change committed.
+OutboxRelay publishes unpublished rows to the parking service in id order and
+in batches, marks them published once the batch is acknowledged, and retries
+with backoff otherwise. Delivery is at-least-once; the parking service skips
+event ids it has already applied.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select, update
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    def __init__(self, sessionmaker, event_model, url, api_key=None, batch_size=100,
+                 interval=5.0, retention_hours=24):
+        self.sessionmaker = sessionmaker
+        self.event_model = event_model
+        self.url = url
+        self.api_key = api_key
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retention = timedelta(hours=retention_hours)
+        self.client = None
+        self._wake = asyncio.Event()
+
+    def notify(self):
+        """Call after committing new events so they go out without waiting for the next poll"""
+        self._wake.set()
+
+    def message(self, event):
+        return {"event_id": f"reservations:{event.id}", "type": event.event_type, **json.loads(event.payload)}
+
+    async def publish_batch(self) -> int:
+        """Publish the oldest unpublished events; returns how many were acknowledged"""
+        Event = self.event_model
+        async with self.sessionmaker() as db:
+            query = select(Event).where(Event.published_at.is_(None)).order_by(Event.id).limit(self.batch_size)
+            if db.bind.dialect.name == "postgresql":
+                # Lets several replicas relay side by side without sending the same rows
+                query = query.with_for_update(skip_locked=True)
+            events = (await db.scalars(query)).all()
+            if not events:
+                return 0
+            headers = {"X-Events-Key": self.api_key} if self.api_key else {}
+            response = await self.client.post(
+                self.url, json={"events": [self.message(event) for event in events]}, headers=headers
+            )
+            response.raise_for_status()
+            await db.execute(
+                update(Event)
+                .where(Event.id.in_([event.id for event in events]))
+                .values(published_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            return len(events)
+
+    async def prune(self):
+        Event = self.event_model
+        async with self.sessionmaker() as db:
+            await db.execute(delete(Event).where(Event.published_at < datetime.utcnow() - self.retention))
+            await db.commit()
+
+    async def run(self):
+        backoff = 1.0
+        last_prune = datetime.min
+        while True:
+            # Cleared before reading so a notify() during the batch isn't lost
+            self._wake.clear()
+            try:
+                published = await self.publish_batch()
+                if datetime.utcnow() - last_prune > timedelta(hours=1):
+                    await self.prune()
+                    last_prune = datetime.utcnow()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning("Outbox relay failed, retrying in %.0fs: %s", backoff, exc)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+                continue
+            backoff = 1.0
+            if published == self.batch_size:
+                # More are probably waiting
+                continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,72 @@
+"""
+Monthly range partitions of the reservations table on Postgres.
+
+With PARTITION_RESERVATIONS=1 (off by default), at startup, after
+create_all, the plain table create_all made is rebuilt as one partitioned by
+month of start_time: same columns, defaults and indexes, a primary key of
+(id, start_time) as Postgres requires with ids from the sequence only so they
+stay unique, one partition per
+month of existing data and RESERVATION_PARTITION_MONTHS_AHEAD months after
+the current one, and a default partition for anything outside them. Rows are
+copied, so converting a large existing table holds up startup of the replica
+that gets the lock; the others wait for it and then find the table done.
+
+partition_maintenance then tops up the months ahead every
+PARTITION_MAINTENANCE_SECONDS and, when RESERVATION_PARTITION_RETAIN_MONTHS
+is set, detaches partitions that ended longer ago than that, keeping each as
+a plain table to dump or drop.
+
+The DDL itself is shared with the Django app in range_partitions
+(services/common). Queries prune partitions only with a condition on
+start_time, which the handlers add when RESERVATION_MAX_DAYS is set.
+
+All functions take a sync Connection; call them through run_sync.
+"""
+from sqlalchemy import text
+import re
+
+import range_partitions
+
+# Held by conversion and maintenance so replicas take turns. Two-key advisory locks don't share a key space
+# with the single-key ones lock_lot takes per lot
+CONVERSION_LOCK = (5050, 1)
+
+PYFORMAT_BIND = re.compile(r"%\((\w+)\)s")
+
+
+def runner(conn):
+    """``conn`` as the ``run`` callable range_partitions takes"""
+    def run(sql, params=None):
+        result = conn.execute(text(PYFORMAT_BIND.sub(r":\1", sql)), params or {})
+        return result.all() if result.returns_rows else []
+    return run
+
+
+def _lock(conn):
+    conn.execute(text("SELECT pg_advisory_xact_lock(:space, :key)"), dict(zip(("space", "key"), CONVERSION_LOCK)))
+
+
+def ensure_partitioned(conn, table: str, column: str, months_ahead: int, today) -> bool:
+    """Convert ``table`` unless it already is partitioned; returns whether this call converted it"""
+    run = runner(conn)
+    # One replica converts, the rest wait here and find it done
+    _lock(conn)
+    if range_partitions.is_partitioned(run, table):
+        return False
+    # The copy outlasts the per-statement timeout the engine sets
+    conn.execute(text("SET LOCAL statement_timeout = 0"))
+    range_partitions.partition_table(run, table, column, months_ahead, today)
+    return True
+
+
+def maintain(conn, table: str, column: str, months_ahead: int, retain_months: int, today):
+    """Add the months ahead and detach old partitions; returns (created, detached) partition names"""
+    run = runner(conn)
+    _lock(conn)
+    if not range_partitions.is_partitioned(run, table):
+        return [], []
+    month = today.replace(day=1)
+    add_months = range_partitions.add_months
+    created = range_partitions.create_partitions(run, table, column, month, add_months(month, months_ahead))
+    detached = range_partitions.detach_partitions(run, table, add_months(month, -retain_months)) if retain_months else []
+    return created, detached
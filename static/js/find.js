@@ -99,10 +99,42 @@ if (liveButton) {
       }
     }
 
+    syncLiveStream();
     submitFilters();
   });
 }
 
+// LIVE AVAILABILITY STREAM
+let liveSource = null;
+
+const applyAvailability = (changes) => {
+  changes.forEach(([lotId, open]) => {
+    const card = $(`.lot-card[data-lot-id="${lotId}"]`);
+    const label = card && $('.lot-open', card);
+    if (label) {
+      label.textContent = `${open} / ${card.dataset.capacity} open`;
+    }
+  });
+};
+
+const syncLiveStream = () => {
+  const enabled = liveButton && liveButton.getAttribute('aria-pressed') === 'true';
+  if (!enabled || !liveButton.dataset.liveUrl || !('EventSource' in window)) {
+    if (liveSource) {
+      liveSource.close();
+      liveSource = null;
+    }
+    return;
+  }
+  if (liveSource) return;
+  liveSource = new EventSource(liveButton.dataset.liveUrl);
+  ['snapshot', 'delta'].forEach((type) => {
+    liveSource.addEventListener(type, (event) => applyAvailability(JSON.parse(event.data).d || []));
+  });
+};
+
+syncLiveStream();
+
 // SORT DROPDOWN
 
 // MAP TOGGLE
@@ -118,6 +150,8 @@ if (mapButton && mapDrawer) {
       mapDrawer.hidden = false;
       mapDrawer.setAttribute('aria-hidden', 'false');
       document.body.classList.add('map-open');
+      // Leaflet measures its container on resize; it was hidden until now
+      window.dispatchEvent(new Event('resize'));
     }
   });
 }
@@ -1,7 +1,10 @@
 /* global Alpine, AOS, gsap, htmx, L, bodymovin */
 (() => {
   const prefersReducedMotion = window.matchMedia('(prefers-reduced-motion: reduce)');
-  const leafletState = { map: null, markers: {} };
+  // lots mirrors what the server last sent, so map:update deltas can be applied to it
+  const leafletState = { map: null, markers: {}, lots: {}, version: null, clusterSrc: null, clusterLayer: null };
+  // Past this many lots the map asks the server for clusters in the viewport instead of drawing every marker
+  const CLUSTER_THRESHOLD = 400;
 
   function initTheme() {
     const root = document.documentElement;
@@ -109,31 +112,132 @@
     });
   }
 
+  // Availability buckets from the map data: full, almost full, filling up, plenty of room
+  const BUCKET_COLORS = ['#EF4444', '#F97316', '#EAB308', '#22C55E'];
+
+  function markerColor(lot) {
+    return BUCKET_COLORS[lot.bucket] || BUCKET_COLORS[3];
+  }
+
   function createMarker(map, lot) {
+    const color = markerColor(lot);
     const marker = L.circleMarker([lot.latitude, lot.longitude], {
       radius: 9,
-      color: '#22C55E',
-      fillColor: '#22C55E',
+      color,
+      fillColor: color,
       fillOpacity: 0.85,
       weight: 2,
-    })
-      .addTo(map)
-      .bindPopup(`<strong>${lot.title}</strong><br>${lot.address}`);
+    }).addTo(map);
+    marker.on('click', () => {
+      const card = document.querySelector(`.lot-card[data-lot-id="${lot.id}"]`);
+      if (card) card.scrollIntoView({ behavior: 'smooth', block: 'center' });
+    });
     return marker;
   }
 
-  function updateLeafletLots(lots) {
+  // Map data comes as parallel columns (JSON) or packed typed arrays (?format=bin)
+  function rowsFromColumns({ id = [], lat = [], lng = [], b = [] }) {
+    return Array.from(id, (lotId, index) => ({
+      id: lotId,
+      latitude: lat[index],
+      longitude: lng[index],
+      bucket: b[index],
+    }));
+  }
+
+  function rowsFromBuffer(buffer) {
+    const count = new DataView(buffer).getUint32(0, true);
+    return rowsFromColumns({
+      id: new Uint32Array(buffer, 4, count),
+      lat: new Float32Array(buffer, 4 + count * 4, count),
+      lng: new Float32Array(buffer, 4 + count * 8, count),
+      b: new Uint8Array(buffer, 4 + count * 12, count),
+    });
+  }
+
+  function clustered() {
+    return Boolean(leafletState.clusterSrc) && Object.keys(leafletState.lots).length > CLUSTER_THRESHOLD;
+  }
+
+  function renderClusters(data) {
+    const { map, clusterLayer } = leafletState;
+    clusterLayer.clearLayers();
+    const { clusters } = data;
+    clusters.count.forEach((count, index) => {
+      const color = BUCKET_COLORS[clusters.b[index]] || BUCKET_COLORS[3];
+      L.circleMarker([clusters.lat[index], clusters.lng[index]], {
+        radius: Math.min(12 + Math.log2(count) * 3, 30),
+        color,
+        fillColor: color,
+        fillOpacity: 0.7,
+        weight: 2,
+      })
+        .bindTooltip(`${count} lots · ${clusters.available[index]} open`, { permanent: count > 9, direction: 'center' })
+        .on('click', () => map.setView([clusters.lat[index], clusters.lng[index]], data.zoom + 2))
+        .addTo(clusterLayer);
+    });
+    rowsFromColumns(data.points).forEach((lot) => clusterLayer.addLayer(createMarker(map, lot)));
+  }
+
+  function refreshClusters() {
+    const { map, clusterSrc } = leafletState;
+    if (!map || !clustered()) return;
+    const bounds = map.getBounds();
+    const bbox = [bounds.getWest(), bounds.getSouth(), bounds.getEast(), bounds.getNorth()].map((value) => value.toFixed(5));
+    fetch(`${clusterSrc}?bbox=${bbox.join(',')}&zoom=${map.getZoom()}`)
+      .then((response) => (response.ok ? response.json() : Promise.reject(response.status)))
+      .then((data) => {
+        if (clustered() && data.zoom === map.getZoom()) renderClusters(data);
+      })
+      .catch(() => {});
+  }
+
+  function renderLeafletLot(id) {
     if (!leafletState.map) return;
-    Object.values(leafletState.markers).forEach((marker) => leafletState.map.removeLayer(marker));
-    leafletState.markers = {};
+    const existing = leafletState.markers[id];
+    if (existing) {
+      leafletState.map.removeLayer(existing);
+      delete leafletState.markers[id];
+    }
+    const lot = leafletState.lots[id];
+    if (lot && !clustered()) {
+      leafletState.markers[id] = createMarker(leafletState.map, lot);
+    }
+  }
+
+  function updateLeafletLots(lots) {
+    const stale = Object.keys(leafletState.lots);
+    leafletState.lots = {};
     lots.forEach((lot) => {
-      const marker = createMarker(leafletState.map, lot);
-      leafletState.markers[lot.id] = marker;
+      leafletState.lots[lot.id] = lot;
     });
-    if (lots.length) {
+    stale.concat(Object.keys(leafletState.lots)).forEach(renderLeafletLot);
+    if (leafletState.map && lots.length) {
       const first = lots[0];
       leafletState.map.panTo([first.latitude, first.longitude]);
     }
+    syncClusterMode();
+  }
+
+  function syncClusterMode() {
+    if (!leafletState.clusterLayer) return;
+    if (clustered()) {
+      refreshClusters();
+    } else {
+      leafletState.clusterLayer.clearLayers();
+    }
+  }
+
+  function applyLeafletDelta({ changed = {}, removed = [] }) {
+    removed.forEach((id) => {
+      delete leafletState.lots[id];
+      renderLeafletLot(id);
+    });
+    rowsFromColumns(changed).forEach((lot) => {
+      leafletState.lots[lot.id] = lot;
+      renderLeafletLot(lot.id);
+    });
+    syncClusterMode();
   }
 
   function initLeaflet() {
@@ -141,9 +245,6 @@
     const wrapper = document.getElementById('parking-map');
     if (!wrapper) return;
 
-    const { lots } = wrapper.dataset;
-    const parsed = lots ? JSON.parse(lots) : [];
-
     const map = L.map('parking-map', {
       scrollWheelZoom: false,
       zoomControl: false,
@@ -154,13 +255,31 @@
       maxZoom: 19,
     }).addTo(map);
 
+    leafletState.map = map;
     leafletState.markers = {};
-    parsed.forEach((lot) => {
-      const marker = createMarker(map, lot);
-      leafletState.markers[lot.id] = marker;
-    });
 
-    leafletState.map = map;
+    const { mapSrc, clusterSrc } = wrapper.dataset;
+    if (clusterSrc) {
+      leafletState.clusterSrc = clusterSrc;
+      leafletState.clusterLayer = L.layerGroup().addTo(map);
+      map.on('moveend', refreshClusters);
+    }
+    if (mapSrc) {
+      // Versioned URL, so after the first visit this is served from the browser cache
+      fetch(mapSrc)
+        .then((response) => {
+          if (!response.ok) throw new Error(`map data: ${response.status}`);
+          const version = response.headers.get('X-Map-Version');
+          return response.arrayBuffer().then((buffer) => ({ version, buffer }));
+        })
+        .then(({ version, buffer }) => {
+          // An HTMX response may have brought newer data while this was in flight
+          if (leafletState.version) return;
+          updateLeafletLots(rowsFromBuffer(buffer));
+          leafletState.version = version;
+        })
+        .catch(() => {});
+    }
 
     document.addEventListener('lot-focus', (event) => {
       const { id } = event.detail;
@@ -174,7 +293,8 @@
       const { id } = event.detail;
       const marker = leafletState.markers[id];
       if (!marker) return;
-      marker.setStyle({ color: '#22C55E', fillColor: '#22C55E' });
+      const color = markerColor(leafletState.lots[id] || {});
+      marker.setStyle({ color, fillColor: color });
     });
   }
 
@@ -256,9 +376,26 @@
     initAccessibilityControls();
   });
 
+  // Tell the server which catalog version the map holds so it can answer with a delta
+  document.body.addEventListener('htmx:configRequest', (event) => {
+    if (leafletState.version) {
+      event.detail.headers['X-Map-Version'] = leafletState.version;
+    }
+  });
+
   document.body.addEventListener('map:update', (event) => {
-    if (!event.detail) return;
-    updateLeafletLots(event.detail.lots || []);
+    const update = event.detail;
+    if (!update) return;
+    if (update.cols) {
+      updateLeafletLots(rowsFromColumns(update.cols));
+    } else if (update.base === leafletState.version) {
+      applyLeafletDelta(update);
+    } else {
+      // Delta against a version we don't hold; the next request fetches everything again
+      leafletState.version = null;
+      return;
+    }
+    leafletState.version = update.v || null;
   });
 })();
 
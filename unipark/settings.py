@@ -175,4 +175,73 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # EMAIL_USE_TLS = True
 # EMAIL_HOST_USER = 'your-email@gmail.com'
 # EMAIL_HOST_PASSWORD = 'your-app-password'
-# DEFAULT_FROM_EMAIL = 'your-email@gmail.com'
\ No newline at end of file
+# DEFAULT_FROM_EMAIL = 'your-email@gmail.com'
+
+# Live availability stream (find page live mode)
+LIVE_AVAILABILITY_POLL_SECONDS = float(os.environ.get('LIVE_AVAILABILITY_POLL_SECONDS', '2'))
+LIVE_AVAILABILITY_HEARTBEAT_SECONDS = float(os.environ.get('LIVE_AVAILABILITY_HEARTBEAT_SECONDS', '15'))
+LIVE_AVAILABILITY_MAX_PENDING = int(os.environ.get('LIVE_AVAILABILITY_MAX_PENDING', '32'))
+
+# Find page map clustering: how stale the in-process cluster index may get
+MAP_CLUSTER_SYNC_SECONDS = float(os.environ.get('MAP_CLUSTER_SYNC_SECONDS', '5'))
+
+# Lot detail availability timeline: hours shown and cache lifetime of each 30-minute bucket
+AVAILABILITY_TIMELINE_HOURS = int(os.environ.get('AVAILABILITY_TIMELINE_HOURS', '12'))
+AVAILABILITY_TIMELINE_TTL = int(os.environ.get('AVAILABILITY_TIMELINE_TTL', '600'))
+
+# Occupancy forecasts (build_occupancy_forecast): how often workers reload the profiles
+OCCUPANCY_FORECAST_RELOAD_SECONDS = int(os.environ.get('OCCUPANCY_FORECAST_RELOAD_SECONDS', '600'))
+
+# Signed gate passes in reservation QR codes: "key_id:secret" pairs, comma separated.
+# Passes are signed with GATE_PASS_ACTIVE_KEY and accepted under any listed key, so keys can be rotated.
+GATE_PASS_KEYS = {
+    int(key_id): secret
+    for key_id, _, secret in (
+        item.strip().partition(':')
+        for item in os.environ.get('GATE_PASS_KEYS', f'1:{SECRET_KEY}:gate-pass').split(',')
+    )
+}
+GATE_PASS_ACTIVE_KEY = int(os.environ.get('GATE_PASS_ACTIVE_KEY', max(GATE_PASS_KEYS)))
+GATE_PASS_LEEWAY_SECONDS = int(os.environ.get('GATE_PASS_LEEWAY_SECONDS', '900'))
+
+# Gate controller endpoints (gate/scans/, gate/plates/) need X-Gate-Key: GATE_API_KEY and answer 503 while it is
+# unset. GATE_API_OPEN=True accepts any caller instead, for local development only (ignored unless DEBUG)
+GATE_API_KEY = os.environ.get('GATE_API_KEY', '')
+GATE_API_OPEN = DEBUG and os.environ.get('GATE_API_OPEN', 'False') == 'True'
+# Batched check-in ingestion (gate/scans/)
+GATE_SCAN_MAX_BATCH = int(os.environ.get('GATE_SCAN_MAX_BATCH', '500'))
+
+# Plate-reader gate lookups (gate/plates/): seconds a lot's in-memory plate map is reused, and edit distance tolerated
+GATE_PLATE_INDEX_TTL = float(os.environ.get('GATE_PLATE_INDEX_TTL', '30'))
+GATE_PLATE_MAX_DISTANCE = int(os.environ.get('GATE_PLATE_MAX_DISTANCE', '1'))
+
+# Admin changelists on PostgreSQL show the planner's row estimate instead of COUNT(*) from this many rows
+ADMIN_COUNT_ESTIMATE_THRESHOLD = int(os.environ.get('ADMIN_COUNT_ESTIMATE_THRESHOLD', '100000'))
+
+# Owner exports (exports/<kind>/): rows per database fetch, rows per Parquet row group, and where background
+# exports are written (outside MEDIA_ROOT, which is served publicly) and for how long they are kept
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '2000'))
+EXPORT_PARQUET_ROW_GROUP = int(os.environ.get('EXPORT_PARQUET_ROW_GROUP', '50000'))
+EXPORT_ROOT = os.environ.get('EXPORT_ROOT', str(BASE_DIR / 'exports'))
+EXPORT_RETENTION_HOURS = int(os.environ.get('EXPORT_RETENTION_HOURS', '24'))
+
+# Hot/cold split (archive_reservations): finished reservations move to the archive this many days after they end
+RESERVATION_ARCHIVE_AFTER_DAYS = int(os.environ.get('RESERVATION_ARCHIVE_AFTER_DAYS', '90'))
+RESERVATION_ARCHIVE_BATCH = int(os.environ.get('RESERVATION_ARCHIVE_BATCH', '1000'))
+RESERVATION_HISTORY_PAGE_SIZE = int(os.environ.get('RESERVATION_HISTORY_PAGE_SIZE', '24'))
+
+# Opt-in booking limits: when set, reservations last at most this many days and can't start more than an hour in
+# the past. Anything still open then started within it, which lets queries bound start_time and skip older
+# partitions. 0 (default) leaves bookings unlimited and those queries unbounded
+RESERVATION_MAX_DAYS = int(os.environ.get('RESERVATION_MAX_DAYS', '0'))
+
+# PostgreSQL, for large deployments: when True, migrate partitions parking_reservation by month of start_time
+# (migration 0011, see parking.utils.partitions); migrate parking 0010 turns it back into a plain table. Only
+# pays off with RESERVATION_MAX_DAYS set, which is what bounds start_time in queries
+RESERVATION_PARTITIONING = os.environ.get('RESERVATION_PARTITIONING', 'False') == 'True'
+# Once partitioned, migrate and
+# maintain_reservation_partitions keep this many months of partitions ahead and, once RETAIN_MONTHS is set,
+# detach (not drop) partitions that ended longer ago than that. Rows in a detached partition leave the app,
+# so set it to more than RESERVATION_ARCHIVE_AFTER_DAYS; 0 keeps every partition attached
+RESERVATION_PARTITION_MONTHS_AHEAD = int(os.environ.get('RESERVATION_PARTITION_MONTHS_AHEAD', '3'))
+RESERVATION_PARTITION_RETAIN_MONTHS = int(os.environ.get('RESERVATION_PARTITION_RETAIN_MONTHS', '0'))